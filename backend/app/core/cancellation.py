@@ -0,0 +1,39 @@
+from fastapi import Request
+from typing import Awaitable, TypeVar
+from app.core.config import settings
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class ClientDisconnectedError(Exception):
+    """응답을 기다리던 클라이언트가 연결을 끊음"""
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    클라이언트 연결이 유지되는 동안만 작업을 기다림
+    
+    스트리밍 응답은 Starlette가 연결 끊김 시 작업을 취소하지만 일반 응답은
+    핸들러가 끝날 때까지 실행되므로, 주기적으로 연결 상태를 확인해 끊기면 작업을
+    취소합니다. 실행 중인 asyncpg 쿼리는 취소되면 서버에 취소 요청을 보내므로
+    연결이 쿼리 종료를 기다리지 않고 풀로 돌아갑니다.
+    
+    Raises:
+        ClientDisconnectedError: 작업 완료 전에 클라이언트 연결이 끊김
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"클라이언트 연결 끊김, 실행 취소: {request.url.path}")
+                raise ClientDisconnectedError(request.url.path)
+    finally:
+        if not task.done():
+            task.cancel()
+            # 취소 처리(쿼리 취소 요청, 연결 반환)가 끝날 때까지 대기
+            await asyncio.gather(task, return_exceptions=True)
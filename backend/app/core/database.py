@@ -1,19 +1,51 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import MetaData
+from typing import Optional
 from app.core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-# 데이터베이스 엔진 생성
+# 분석 연결 서버 설정 (읽기 전용 트랜잭션, 쿼리 실행 시간 한도)
+ANALYTIC_SERVER_SETTINGS = {
+    "default_transaction_read_only": "on",
+    "statement_timeout": str(settings.MAX_QUERY_TIME * 1000)
+}
+
+def get_analytic_url() -> str:
+    """분석 쿼리용 DB URL (복제본이 지정되지 않으면 기본 DB)"""
+    return settings.ANALYTIC_DATABASE_URL or settings.DATABASE_URL
+
+# 쓰기 엔진 생성 (채팅 기록 등 소량 쓰기)
+# 체크아웃마다 ping하지 않고 PoolMonitor가 백그라운드에서 연결 상태를 확인
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    pool_pre_ping=True,
+    pool_size=settings.WRITE_POOL_SIZE,
+    max_overflow=settings.WRITE_POOL_MAX_OVERFLOW,
     pool_recycle=300
 )
 
+# 분석 세션 풀 크기: 생성 SQL을 asyncpg 분석 풀(query_engine)에서 실행하면
+# SQLAlchemy 분석 풀은 스키마 조회/EXPLAIN 대체 경로용으로만 작게 유지
+if settings.ANALYTIC_ENGINE_ENABLED:
+    ANALYTIC_SESSION_POOL_SIZE = settings.ANALYTIC_SESSION_POOL_SIZE
+    ANALYTIC_SESSION_MAX_OVERFLOW = settings.ANALYTIC_SESSION_POOL_MAX_OVERFLOW
+else:
+    ANALYTIC_SESSION_POOL_SIZE = settings.ANALYTIC_POOL_SIZE
+    ANALYTIC_SESSION_MAX_OVERFLOW = settings.ANALYTIC_POOL_MAX_OVERFLOW
+
+# 분석 엔진 생성 (읽기 전용, 스키마 조회, 분석 엔진 비활성 시 생성 SQL 실행)
+analytic_engine = create_async_engine(
+    get_analytic_url(),
+    echo=settings.DEBUG,
+    pool_size=ANALYTIC_SESSION_POOL_SIZE,
+    max_overflow=ANALYTIC_SESSION_MAX_OVERFLOW,
+    pool_recycle=300,
+    connect_args={"server_settings": ANALYTIC_SERVER_SETTINGS}
+)
+
 # 세션 팩토리 생성
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -21,6 +53,12 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+AnalyticSessionLocal = async_sessionmaker(
+    analytic_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 # 베이스 모델
 Base = declarative_base()
 
@@ -40,13 +78,26 @@ async def init_db():
         raise
 
 async def get_db() -> AsyncSession:
-    """데이터베이스 세션 의존성"""
+    """데이터베이스 세션 의존성 (쓰기 풀)"""
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
             await session.close()
 
+async def get_analytic_db() -> AsyncSession:
+    """분석용 읽기 전용 세션 의존성"""
+    async with AnalyticSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+def get_asyncpg_dsn(url: Optional[str] = None) -> str:
+    """SQLAlchemy URL을 asyncpg DSN으로 변환 (asyncpg 직접 연결용, 기본은 DATABASE_URL)"""
+    return (url or settings.DATABASE_URL).replace("postgresql+asyncpg://", "postgresql://", 1)
+
 async def close_db():
     """데이터베이스 연결 종료"""
     await engine.dispose()
+    await analytic_engine.dispose()
@@ -0,0 +1,18 @@
+from fastapi import Header, HTTPException
+from typing import Optional
+from app.core.config import settings
+import secrets
+
+def has_admin_token(token: Optional[str]) -> bool:
+    """관리 토큰(EXPORT_BULK_TOKEN) 일치 여부 (토큰이 비어 있으면 항상 거부)"""
+    if not settings.EXPORT_BULK_TOKEN or not token:
+        return False
+    return secrets.compare_digest(token.encode("utf-8"), settings.EXPORT_BULK_TOKEN.encode("utf-8"))
+
+async def require_admin_token(x_export_token: Optional[str] = Header(None)) -> None:
+    """관리 엔드포인트 의존성: X-Export-Token이 관리 토큰과 다르면 403"""
+    if not has_admin_token(x_export_token):
+        raise HTTPException(
+            status_code=403,
+            detail="관리 권한이 없습니다"
+        )
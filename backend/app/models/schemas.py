@@ -11,12 +11,18 @@ class ChartType(str, Enum):
     SCATTER = "scatter"
     TABLE = "table"
 
+class ResultFormat(str, Enum):
+    """결과 행 응답 형식"""
+    ROWS = "rows"  # 행별 dict 목록
+    COLUMNAR = "columnar"  # 컬럼별 배열 + 반복 문자열 사전 인코딩
+
 class ChatRequest(BaseModel):
     """채팅 요청 스키마"""
     question: str = Field(..., description="자연어 질문")
     wants_visualization: Optional[bool] = Field(False, description="시각화 요청 여부")
     chart_type: Optional[ChartType] = Field(None, description="차트 타입")
     session_id: Optional[str] = Field(None, description="세션 ID")
+    result_format: ResultFormat = Field(ResultFormat.ROWS, description="결과 형식 (rows, columnar)")
 
 class ChatResponse(BaseModel):
     """채팅 응답 스키마"""
@@ -24,10 +30,25 @@ class ChatResponse(BaseModel):
     sql: str = Field(..., description="실행된 SQL 쿼리")
     rows: List[Dict[str, Any]] = Field(..., description="쿼리 결과 행들")
     columns: List[str] = Field(..., description="컬럼명들")
-    row_count: int = Field(..., description="행 개수")
+    row_count: int = Field(..., description="행 개수 (현재 페이지)")
     chart_suggestion: Optional[ChartType] = Field(None, description="제안 차트 타입")
     execution_time: float = Field(..., description="실행 시간 (초)")
     cached: bool = Field(False, description="캐시 사용 여부")
+    result_id: Optional[str] = Field(None, description="결과 핸들 ID (다음 페이지 조회용)")
+    next_cursor: Optional[str] = Field(None, description="다음 페이지 커서 (마지막 페이지면 None)")
+    truncated: bool = Field(False, description="고비용 쿼리로 LIMIT이 축소되어 결과가 잘렸는지 여부")
+    row_limit: Optional[int] = Field(None, description="LIMIT이 축소되었을 때 적용된 행 한도")
+
+class ResultPageResponse(BaseModel):
+    """결과 페이지 응답 스키마"""
+    result_id: str = Field(..., description="결과 핸들 ID")
+    rows: List[Dict[str, Any]] = Field(..., description="쿼리 결과 행들")
+    columns: List[str] = Field(..., description="컬럼명들")
+    row_count: int = Field(..., description="행 개수 (현재 페이지)")
+    next_cursor: Optional[str] = Field(None, description="다음 페이지 커서 (마지막 페이지면 None)")
+    cached: bool = Field(False, description="캐시 사용 여부")
+    truncated: bool = Field(False, description="고비용 쿼리로 LIMIT이 축소되어 결과가 잘렸는지 여부")
+    row_limit: Optional[int] = Field(None, description="LIMIT이 축소되었을 때 적용된 행 한도")
 
 class SchemaResponse(BaseModel):
     """스키마 응답 스키마"""
@@ -50,7 +71,8 @@ class ColumnInfo(BaseModel):
 class DownloadRequest(BaseModel):
     """다운로드 요청 스키마"""
     sql: str = Field(..., description="다운로드할 SQL 쿼리")
-    format: str = Field("xlsx", description="다운로드 형식 (xlsx, csv)")
+    format: str = Field("xlsx", description="다운로드 형식 (xlsx, csv, parquet, arrow)")
+    bulk: bool = Field(False, description="대량 내보내기 여부 (MAX_QUERY_ROWS 초과 허용, X-Export-Token 필요)")
 
 class ErrorResponse(BaseModel):
     """에러 응답 스키마"""
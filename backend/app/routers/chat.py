@@ -1,117 +1,249 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional
+import json
 import time
 import logging
-import hashlib
-import json
 
-from app.core.database import get_db
-from app.models.schemas import ChatRequest, ChatResponse, ErrorResponse
+from app.core.cancellation import cancel_on_disconnect
+from app.core.database import get_analytic_db
+from app.core.security import require_admin_token
+from app.models.schemas import ChatRequest, ChatResponse, ErrorResponse, ResultFormat, ResultPageResponse
+from app.routers.errors import error_status
+from app.services.result_encoding import encode_columnar, rows_from_columns
 from app.services.text_to_sql import TextToSQLService
-from app.services.cache_service import CacheService
 from app.services.chat_history_service import ChatHistoryService
+from app.services.data_change_service import DataChangeDetector
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 text_to_sql_service = TextToSQLService()
-cache_service = CacheService()
+query_cache = text_to_sql_service.query_cache
+data_change_detector = DataChangeDetector(query_cache, text_to_sql_service.rollups)
 chat_history_service = ChatHistoryService()
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
-    session: AsyncSession = Depends(get_db)
+    http_request: Request,
+    session: AsyncSession = Depends(get_analytic_db)
 ):
     """
     자연어 질문을 SQL로 변환하고 실행하여 결과 반환
     """
     start_time = time.time()
     
-    try:
-        # 캐시 키 생성
-        cache_key = hashlib.md5(
-            json.dumps(request.dict(), sort_keys=True).encode()
-        ).hexdigest()
-        
-        # 캐시 확인
-        cached_result = await cache_service.get(cache_key)
-        if cached_result:
-            logger.info(f"캐시 히트: {cache_key}")
-            return ChatResponse(
-                **cached_result,
-                execution_time=time.time() - start_time,
-                cached=True
-            )
-        
+    # 1단계 캐시: 정규화된 질문 → SQL (세션/시각화 여부와 무관)
+    cached_sql = await query_cache.get_sql(request.question)
+    if cached_sql:
+        sql_query, explanation = cached_sql
+        logger.info("질문 캐시 히트")
+    else:
         # Text-to-SQL 변환
         sql_query, explanation = await text_to_sql_service.generate_sql(
             request.question, 
             session
         )
+    
+    # 첫 페이지만 실행 (2단계 캐시: 페이지 SQL 지문 → 결과, 만료 시 쿼리만 재실행)
+    # 클라이언트가 연결을 끊으면 실행 중인 쿼리 취소
+    columns, values, result_cached, next_cursor, row_limit = await cancel_on_disconnect(
+        http_request, text_to_sql_service.execute_page(sql_query, session)
+    )
+    if cached_sql is None:
+        # 실행에 성공한 SQL만 질문/유사 질문 캐시에 저장 (실패한 SQL은 다음 요청에서 다시 생성)
+        await query_cache.set_sql(request.question, sql_query, explanation)
+        text_to_sql_service.remember_sql(request.question, sql_query, explanation)
+    result_id = await query_cache.save_handle(sql_query)
+    row_count = len(values[0]) if values else 0
+    
+    cached = cached_sql is not None and result_cached
+    
+    # 차트 제안
+    chart_suggestion = _suggest_chart_type(request.question, columns, row_count)
+    
+    # 응답 생성
+    fields = dict(
+        answer_text=explanation,
+        sql=sql_query,
+        columns=columns,
+        row_count=row_count,
+        chart_suggestion=chart_suggestion,
+        execution_time=time.time() - start_time,
+        cached=cached,
+        result_id=result_id,
+        next_cursor=next_cursor,
+        truncated=row_limit is not None,
+        row_limit=row_limit
+    )
+    if request.result_format == ResultFormat.COLUMNAR:
+        # 행 데이터는 pydantic 검증 없이 orjson으로 바로 직렬화
+        response = ORJSONResponse({
+            **fields,
+            "result_format": ResultFormat.COLUMNAR.value,
+            "data": encode_columnar(columns, values)
+        })
+    else:
+        response = ChatResponse(rows=rows_from_columns(columns, values), **fields)
+    
+    # 채팅 기록 저장 (대기열에 넣고 백그라운드에서 일괄 기록)
+    session_id = request.session_id or "demo-session"
+    # 사용자 메시지 저장
+    chat_history_service.record_message(
+        session_id=session_id,
+        message_type="user",
+        content=request.question
+    )
+    # AI 응답 저장
+    chat_history_service.record_message(
+        session_id=session_id,
+        message_type="ai",
+        content=explanation,
+        sql_query=sql_query,
+        execution_time=time.time() - start_time,
+        cached=cached
+    )
+    
+    logger.info(f"채팅 처리 완료: {request.question[:50]}...")
+    return response
+
+@router.get("/chat/results/{result_id}", response_model=ResultPageResponse)
+async def get_result_page(
+    result_id: str,
+    http_request: Request,
+    cursor: str = Query(..., description="이전 응답의 next_cursor"),
+    format: ResultFormat = Query(ResultFormat.ROWS, description="결과 형식 (rows, columnar)"),
+    session: AsyncSession = Depends(get_analytic_db)
+):
+    """
+    결과 핸들의 다음 페이지 조회
+    """
+    sql_query = await query_cache.get_handle(result_id)
+    if sql_query is None:
+        raise HTTPException(status_code=404, detail="결과가 만료되었거나 존재하지 않습니다.")
+    
+    columns, values, cached, next_cursor, row_limit = await cancel_on_disconnect(
+        http_request, text_to_sql_service.execute_page(sql_query, session, cursor)
+    )
+    fields = dict(
+        result_id=result_id,
+        columns=columns,
+        row_count=len(values[0]) if values else 0,
+        next_cursor=next_cursor,
+        cached=cached,
+        truncated=row_limit is not None,
+        row_limit=row_limit
+    )
+    if format == ResultFormat.COLUMNAR:
+        return ORJSONResponse({
+            **fields,
+            "result_format": ResultFormat.COLUMNAR.value,
+            "data": encode_columnar(columns, values)
+        })
+    return ResultPageResponse(rows=rows_from_columns(columns, values), **fields)
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    session: AsyncSession = Depends(get_analytic_db)
+):
+    """
+    자연어 질문 처리 결과를 SSE(text/event-stream)로 단계별 전송
+    
+    이벤트 순서: explanation(토큰 단위) → sql → columns → rows(배치 반복) → summary
+    오류 발생 시 error 이벤트 후 스트림을 종료합니다.
+    """
+    return StreamingResponse(
+        _chat_event_stream(request, session),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _sse(event: str, data: Any) -> str:
+    """SSE 이벤트 프레임 생성"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def _chat_event_stream(request: ChatRequest, session: AsyncSession) -> AsyncIterator[str]:
+    start_time = time.time()
+    
+    try:
+        # 1단계 캐시: 정규화된 질문 → SQL
+        cached_sql = await query_cache.get_sql(request.question)
+        if cached_sql:
+            sql_query, explanation = cached_sql
+            logger.info("질문 캐시 히트")
+            yield _sse("explanation", {"delta": explanation})
+        else:
+            sql_query, explanation = None, ""
+            async for kind, payload in text_to_sql_service.generate_sql_stream(request.question, session):
+                if kind == "token":
+                    yield _sse("explanation", {"delta": payload})
+                else:
+                    sql_query, explanation = payload
         
-        # SQL 실행
-        rows, columns = await text_to_sql_service.execute_sql(sql_query, session)
-        
-        # 차트 제안
-        chart_suggestion = _suggest_chart_type(request.question, columns, rows)
-        
-        # 응답 생성
-        response = ChatResponse(
-            answer_text=explanation,
-            sql=sql_query,
-            rows=rows,
-            columns=columns,
-            row_count=len(rows),
-            chart_suggestion=chart_suggestion,
-            execution_time=time.time() - start_time,
-            cached=False
-        )
+        yield _sse("sql", {"sql": sql_query})
+        generation_time = time.time() - start_time
         
-        # 캐시 저장
-        await cache_service.set(cache_key, response.dict())
+        # SQL 실행 결과를 배치 단위로 전송
+        row_count = 0
+        columns: List[str] = []
+        result_cached = False
+        row_limit = None
+        async for kind, payload in text_to_sql_service.stream_sql_rows(sql_query, session):
+            if kind == "columns":
+                columns = payload["columns"]
+                result_cached = payload["cached"]
+                row_limit = payload["row_limit"]
+                yield _sse("columns", {"columns": columns})
+            else:
+                row_count += len(payload)
+                yield _sse("rows", {"rows": payload})
         
-        # 채팅 기록 저장
-        try:
-            session_id = request.session_id or "demo-session"
-            # 사용자 메시지 저장
-            await chat_history_service.save_message(
-                session_id=session_id,
-                message_type="user",
-                content=request.question,
-                db_session=session
-            )
-            # AI 응답 저장
-            await chat_history_service.save_message(
-                session_id=session_id,
-                message_type="ai",
-                content=explanation,
-                sql_query=sql_query,
-                execution_time=time.time() - start_time,
-                cached=False,
-                db_session=session
-            )
-        except Exception as e:
-            logger.warning(f"채팅 기록 저장 실패: {e}")
+        if cached_sql is None:
+            # 오류 없이 끝까지 실행된 SQL만 질문/유사 질문 캐시에 저장
+            await query_cache.set_sql(request.question, sql_query, explanation)
+            text_to_sql_service.remember_sql(request.question, sql_query, explanation)
         
-        logger.info(f"채팅 처리 완료: {request.question[:50]}...")
-        return response
+        cached = cached_sql is not None and result_cached
+        execution_time = time.time() - start_time
+        yield _sse("summary", {
+            "answer_text": explanation,
+            "row_count": row_count,
+            "chart_suggestion": _suggest_chart_type(request.question, columns, row_count),
+            "cached": cached,
+            "truncated": row_limit is not None,
+            "row_limit": row_limit,
+            "timings": {
+                "generation": generation_time,
+                "execution": execution_time - generation_time,
+                "total": execution_time
+            }
+        })
         
-    except ValueError as e:
-        logger.error(f"SQL 검증 실패: {e}")
-        raise HTTPException(
-            status_code=400,
-            detail=f"SQL 검증 실패: {str(e)}"
-        )
     except Exception as e:
-        logger.error(f"채팅 처리 실패: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"서버 오류: {str(e)}"
-        )
+        status_code, detail = error_status(e)
+        yield _sse("error", {"status": status_code, "detail": detail})
+        return
+    
+    # 채팅 기록 저장 (응답 전송 후, 백그라운드에서 일괄 기록)
+    session_id = request.session_id or "demo-session"
+    chat_history_service.record_message(
+        session_id=session_id,
+        message_type="user",
+        content=request.question
+    )
+    chat_history_service.record_message(
+        session_id=session_id,
+        message_type="ai",
+        content=explanation,
+        sql_query=sql_query,
+        execution_time=execution_time,
+        cached=cached
+    )
 
-def _suggest_chart_type(question: str, columns: List[str], rows: List[Dict[str, Any]]) -> str:
+def _suggest_chart_type(question: str, columns: List[str], row_count: int) -> str:
     """
     질문과 데이터를 기반으로 차트 타입 제안
     """
@@ -124,20 +256,44 @@ def _suggest_chart_type(question: str, columns: List[str], rows: List[Dict[str,
         return 'pie'
     elif any(word in question_lower for word in ['비교', '순위', 'top']):
         return 'bar'
-    elif len(columns) == 2 and len(rows) > 10:
+    elif len(columns) == 2 and row_count > 10:
         return 'scatter'
     else:
         return 'table'
 
+@router.get("/chat/cache/stats")
+async def get_cache_stats():
+    """질문/유사 질문/결과 캐시, L1/L2 저장소 히트, 준비된 문장 재사용 및 비용 점검 통계 조회"""
+    return {
+        **query_cache.get_stats(),
+        "storage": await query_cache.cache.get_stats(),
+        "engine": text_to_sql_service.query_engine.get_stats(),
+        "cost_gate": text_to_sql_service.cost_gate.get_stats(),
+        "rollups": text_to_sql_service.rollups.get_stats(),
+        "semantic": text_to_sql_service.semantic_cache.get_stats()
+    }
+
+@router.delete("/chat/cache/tables/{table_name}", dependencies=[Depends(require_admin_token)])
+async def invalidate_table_cache(table_name: str):
+    """특정 테이블을 읽은 결과 캐시 무효화 (X-Export-Token 관리 토큰 필요)"""
+    deleted = await query_cache.invalidate_tables([table_name])
+    return {"table": table_name, "deleted": deleted}
+
 @router.get("/chat/history/{session_id}")
 async def get_chat_history(
     session_id: str,
-    session: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor (더 오래된 메시지)"),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="페이지 크기")
 ):
-    """채팅 기록 조회"""
+    """채팅 기록 조회 (최근 메시지부터 페이지 단위)"""
     try:
-        messages = await chat_history_service.get_session_messages(session_id, session)
-        return {"session_id": session_id, "messages": messages}
+        messages, next_cursor = await chat_history_service.get_session_messages(session_id, cursor, limit)
+        return {"session_id": session_id, "messages": messages, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"채팅 기록 조회 실패: {e}")
         raise HTTPException(
@@ -146,13 +302,10 @@ async def get_chat_history(
         )
 
 @router.delete("/chat/history/{session_id}")
-async def clear_chat_history(
-    session_id: str,
-    session: AsyncSession = Depends(get_db)
-):
+async def clear_chat_history(session_id: str):
     """채팅 기록 삭제"""
     try:
-        await chat_history_service.clear_session(session_id, session)
+        await chat_history_service.clear_session(session_id)
         return {"message": "채팅 기록이 삭제되었습니다."}
     except Exception as e:
         logger.error(f"채팅 기록 삭제 실패: {e}")
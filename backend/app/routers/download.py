@@ -1,168 +1,175 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
-from typing import List, Dict, Any
-import pandas as pd
-import io
+from typing import Optional
+from datetime import datetime
 import logging
-import xlsxwriter
 
-from app.core.database import get_db
+from app.core.cancellation import cancel_on_disconnect
+from app.core.config import settings
+from app.core.database import get_analytic_db
+from app.core.security import has_admin_token
 from app.models.schemas import DownloadRequest
 from app.services.sql_guardrails import SQLGuardrails
+from app.services.export_service import (
+    ExportService,
+    XLSX_MEDIA_TYPE,
+    PARQUET_MEDIA_TYPE,
+    ARROW_STREAM_MEDIA_TYPE
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 guardrails = SQLGuardrails()
+export_service = ExportService()
+
+def _resolve_max_rows(request: DownloadRequest, export_token: Optional[str]) -> Optional[int]:
+    """대량 내보내기 권한 확인 후 최대 행 수 반환 (기본 한도면 None)"""
+    if not request.bulk:
+        return None
+    if not has_admin_token(export_token):
+        raise HTTPException(
+            status_code=403,
+            detail="대량 내보내기 권한이 없습니다"
+        )
+    return settings.EXPORT_MAX_ROWS
 
 @router.post("/download/xlsx")
 async def download_xlsx(
     request: DownloadRequest,
-    session: AsyncSession = Depends(get_db)
+    http_request: Request,
+    session: AsyncSession = Depends(get_analytic_db)
 ):
     """
     SQL 쿼리 결과를 XLSX 파일로 다운로드
     """
-    try:
-        # SQL 검증
-        validated_sql = await guardrails.validate_and_clean_sql(request.sql)
-        
-        # 쿼리 실행
-        result = await session.execute(text(validated_sql))
-        rows = [dict(row._mapping) for row in result.fetchall()]
-        columns = list(result.keys()) if result.keys() else []
-        
-        if not rows:
-            raise HTTPException(
-                status_code=404,
-                detail="다운로드할 데이터가 없습니다"
-            )
-        
-        # DataFrame 생성
-        df = pd.DataFrame(rows)
-        
-        # XLSX 파일 생성
-        output = io.BytesIO()
-        
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name='Data', index=False)
-            
-            # 워크시트 가져오기
-            worksheet = writer.sheets['Data']
-            workbook = writer.book
-            
-            # 헤더 스타일 설정
-            header_format = workbook.add_format({
-                'bold': True,
-                'text_wrap': True,
-                'valign': 'top',
-                'fg_color': '#D7E4BC',
-                'border': 1
-            })
-            
-            # 데이터 스타일 설정
-            data_format = workbook.add_format({
-                'text_wrap': True,
-                'valign': 'top',
-                'border': 1
-            })
-            
-            # 헤더에 스타일 적용
-            for col_num, value in enumerate(df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            # 데이터에 스타일 적용
-            for row_num in range(len(df)):
-                for col_num in range(len(df.columns)):
-                    worksheet.write(row_num + 1, col_num, df.iloc[row_num, col_num], data_format)
-            
-            # 컬럼 너비 자동 조정
-            for i, col in enumerate(df.columns):
-                max_len = max(
-                    df[col].astype(str).map(len).max(),
-                    len(str(col))
-                )
-                worksheet.set_column(i, i, min(max_len + 2, 50))
-        
-        output.seek(0)
-        
-        # 파일명 생성
-        filename = f"snop_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        
-        logger.info(f"XLSX 다운로드 완료: {filename}")
-        
-        return StreamingResponse(
-            io.BytesIO(output.getvalue()),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-        
-    except ValueError as e:
-        logger.error(f"SQL 검증 실패: {e}")
-        raise HTTPException(
-            status_code=400,
-            detail=f"SQL 검증 실패: {str(e)}"
-        )
-    except Exception as e:
-        logger.error(f"XLSX 다운로드 실패: {e}")
+    # SQL 검증
+    validated_sql = await guardrails.validate_and_clean_sql(request.sql)
+    
+    # 서버 사이드 커서로 청크 단위 기록 (메모리 사용량 일정)
+    output = await cancel_on_disconnect(http_request, export_service.build_xlsx(validated_sql, session))
+    
+    if output is None:
         raise HTTPException(
-            status_code=500,
-            detail=f"다운로드 실패: {str(e)}"
+            status_code=404,
+            detail="다운로드할 데이터가 없습니다"
         )
+    
+    # 파일명 생성
+    filename = f"snop_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    
+    logger.info(f"XLSX 다운로드 완료: {filename}")
+    
+    return StreamingResponse(
+        export_service.iter_file(output),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 @router.post("/download/csv")
 async def download_csv(
     request: DownloadRequest,
-    session: AsyncSession = Depends(get_db)
+    http_request: Request,
+    session: AsyncSession = Depends(get_analytic_db),
+    x_export_token: Optional[str] = Header(None)
 ):
     """
-    SQL 쿼리 결과를 CSV 파일로 다운로드
+    SQL 쿼리 결과를 CSV 파일로 스트리밍 다운로드
+    
+    bulk=true 이고 X-Export-Token이 EXPORT_BULK_TOKEN과 일치하면
+    MAX_QUERY_ROWS 대신 EXPORT_MAX_ROWS까지 내보냅니다.
     """
-    try:
-        # SQL 검증
-        validated_sql = await guardrails.validate_and_clean_sql(request.sql)
-        
-        # 쿼리 실행
-        result = await session.execute(text(validated_sql))
-        rows = [dict(row._mapping) for row in result.fetchall()]
-        columns = list(result.keys()) if result.keys() else []
-        
-        if not rows:
-            raise HTTPException(
-                status_code=404,
-                detail="다운로드할 데이터가 없습니다"
-            )
-        
-        # DataFrame 생성
-        df = pd.DataFrame(rows)
-        
-        # CSV 파일 생성
-        output = io.StringIO()
-        df.to_csv(output, index=False, encoding='utf-8-sig')
-        output.seek(0)
-        
-        # 파일명 생성
-        filename = f"snop_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
-        logger.info(f"CSV 다운로드 완료: {filename}")
-        
-        return StreamingResponse(
-            io.BytesIO(output.getvalue().encode('utf-8-sig')),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-        
-    except ValueError as e:
-        logger.error(f"SQL 검증 실패: {e}")
+    # SQL 검증
+    max_rows = _resolve_max_rows(request, x_export_token)
+    validated_sql = await guardrails.validate_and_clean_sql(request.sql, max_rows=max_rows)
+    
+    # 커서에서 청크 단위로 읽으며 바로 전송
+    stream = await cancel_on_disconnect(http_request, export_service.stream_csv(validated_sql, session))
+    
+    if stream is None:
         raise HTTPException(
-            status_code=400,
-            detail=f"SQL 검증 실패: {str(e)}"
+            status_code=404,
+            detail="다운로드할 데이터가 없습니다"
         )
-    except Exception as e:
-        logger.error(f"CSV 다운로드 실패: {e}")
+    
+    # 파일명 생성
+    filename = f"snop_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    
+    logger.info(f"CSV 다운로드 시작: {filename}")
+    
+    return StreamingResponse(
+        stream,
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+async def _download_columnar(
+    request: DownloadRequest,
+    http_request: Request,
+    session: AsyncSession,
+    x_export_token: Optional[str],
+    fmt: str,
+    media_type: str,
+    extension: str
+):
+    """Parquet/Arrow IPC 공통 다운로드 처리"""
+    # SQL 검증
+    max_rows = _resolve_max_rows(request, x_export_token)
+    validated_sql = await guardrails.validate_and_clean_sql(request.sql, max_rows=max_rows)
+    
+    # 커서 청크를 타입이 있는 RecordBatch로 변환하며 전송
+    stream = await cancel_on_disconnect(
+        http_request, export_service.stream_columnar(validated_sql, session, fmt)
+    )
+    
+    if stream is None:
         raise HTTPException(
-            status_code=500,
-            detail=f"다운로드 실패: {str(e)}"
+            status_code=404,
+            detail="다운로드할 데이터가 없습니다"
         )
+    
+    # 파일명 생성
+    filename = f"snop_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    
+    logger.info(f"{fmt} 다운로드 시작: {filename}")
+    
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@router.post("/download/parquet")
+async def download_parquet(
+    request: DownloadRequest,
+    http_request: Request,
+    session: AsyncSession = Depends(get_analytic_db),
+    x_export_token: Optional[str] = Header(None)
+):
+    """
+    SQL 쿼리 결과를 Parquet 파일로 다운로드 (컬럼 타입 OID 기준 스키마, zstd 압축)
+    """
+    return await _download_columnar(
+        request, http_request, session, x_export_token,
+        fmt="parquet",
+        media_type=PARQUET_MEDIA_TYPE,
+        extension="parquet"
+    )
+
+@router.post("/download/arrow")
+async def download_arrow(
+    request: DownloadRequest,
+    http_request: Request,
+    session: AsyncSession = Depends(get_analytic_db),
+    x_export_token: Optional[str] = Header(None)
+):
+    """
+    SQL 쿼리 결과를 Arrow IPC 스트림으로 다운로드 (pyarrow.ipc.open_stream으로 읽기)
+    """
+    return await _download_columnar(
+        request, http_request, session, x_export_token,
+        fmt="arrow",
+        media_type=ARROW_STREAM_MEDIA_TYPE,
+        extension="arrows"
+    )
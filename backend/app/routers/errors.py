@@ -0,0 +1,45 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from typing import Tuple
+import logging
+
+from app.core.cancellation import ClientDisconnectedError
+from app.services.cost_gate import QueryQueueTimeoutError
+from app.services.query_engine import QueryTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# 응답 전에 클라이언트가 연결을 끊음 (nginx 관례 상태 코드)
+CLIENT_CLOSED_REQUEST = 499
+
+def error_status(error: Exception) -> Tuple[int, str]:
+    """
+    질문/쿼리 처리 예외를 (상태 코드, 상세 메시지)로 변환하고 기록
+
+    예외 처리기와 /chat/stream의 error 이벤트가 같은 매핑을 사용합니다.
+    ValueError(SQL 검증, 잘못된 커서, 비용 한도 초과)는 400, 고비용 대기열 시간 초과는
+    503, 실행 시간 초과는 504, 클라이언트 연결 끊김은 499, 그 외는 500입니다.
+    """
+    if isinstance(error, ValueError):
+        logger.error(f"요청 검증 실패: {error}")
+        return 400, str(error)
+    if isinstance(error, QueryQueueTimeoutError):
+        logger.warning(f"고비용 쿼리 대기 시간 초과: {error}")
+        return 503, str(error)
+    if isinstance(error, QueryTimeoutError):
+        logger.warning(f"쿼리 실행 시간 초과: {error}")
+        return 504, str(error)
+    if isinstance(error, ClientDisconnectedError):
+        # 응답을 받을 클라이언트가 없으므로 상태 코드만 기록
+        return CLIENT_CLOSED_REQUEST, "클라이언트 연결 끊김"
+    logger.error(f"요청 처리 실패: {error}")
+    return 500, f"서버 오류: {str(error)}"
+
+async def _handle_error(request: Request, error: Exception) -> JSONResponse:
+    status_code, detail = error_status(error)
+    return JSONResponse(status_code=status_code, content={"detail": detail})
+
+def register_exception_handlers(app: FastAPI) -> None:
+    """라우터에서 처리하지 않은 예외를 error_status 매핑으로 응답"""
+    for error_type in (ValueError, QueryQueueTimeoutError, QueryTimeoutError, ClientDisconnectedError, Exception):
+        app.add_exception_handler(error_type, _handle_error)
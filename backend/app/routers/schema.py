@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_analytic_db
 from app.models.schemas import SchemaResponse
 from app.services.schema_service import SchemaService
 
@@ -13,7 +13,7 @@ router = APIRouter()
 schema_service = SchemaService()
 
 @router.get("/schema", response_model=SchemaResponse)
-async def get_schema(session: AsyncSession = Depends(get_db)):
+async def get_schema(session: AsyncSession = Depends(get_analytic_db)):
     """
     데이터베이스 스키마 정보 반환
     """
@@ -33,12 +33,12 @@ async def get_schema(session: AsyncSession = Depends(get_db)):
         )
 
 @router.get("/schema/tables")
-async def get_tables(session: AsyncSession = Depends(get_db)):
+async def get_tables(session: AsyncSession = Depends(get_analytic_db)):
     """
     테이블 목록 반환
     """
     try:
-        tables = await schema_service._get_tables(session)
+        tables = await schema_service.get_tables(session)
         return {"tables": tables}
         
     except Exception as e:
@@ -51,15 +51,22 @@ async def get_tables(session: AsyncSession = Depends(get_db)):
 @router.get("/schema/tables/{table_name}")
 async def get_table_info(
     table_name: str,
-    session: AsyncSession = Depends(get_db)
+    session: AsyncSession = Depends(get_analytic_db)
 ):
     """
     특정 테이블 정보 반환
     """
     try:
-        table_info = await schema_service._get_table_info(session, table_name)
+        table_info = await schema_service.get_table_info(session, table_name)
+        if table_info is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"테이블을 찾을 수 없습니다: {table_name}"
+            )
         return table_info
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"테이블 정보 조회 실패 ({table_name}): {e}")
         raise HTTPException(
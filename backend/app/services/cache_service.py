@@ -1,17 +1,88 @@
 import redis.asyncio as redis
+import asyncio
 import json
 import logging
-from typing import Optional, Any, Dict
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Any, Dict, List, Tuple
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+class LocalCache:
+    """
+    프로세스 내 L1 캐시
+    
+    역직렬화된 객체를 그대로 보관하며, 항목 수와 바이트(직렬화 크기 기준)
+    양쪽으로 제한하고 LRU/TTL 순서로 제거합니다.
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int, ttl: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """값 조회 (만료 시 제거)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any, size: int, ttl: Optional[int] = None) -> None:
+        """값 저장 (한도 초과 시 오래된 항목부터 제거)"""
+        self.delete(key)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        self._entries[key] = (value, time.monotonic() + ttl, size)
+        self.total_bytes += size
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+    
+    def delete(self, key: str) -> bool:
+        """값 삭제"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.total_bytes -= entry[2]
+        return True
+    
+    def clear(self) -> None:
+        """전체 삭제"""
+        self._entries.clear()
+        self.total_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
 class CacheService:
-    """Redis 캐시 서비스"""
+    """Redis 캐시 서비스 (프로세스 내 L1 + Redis L2)"""
+    
+    INVALIDATION_CHANNEL = "cache:invalidate"
+    TAG_KEY_PREFIX = "tag:"
+    BATCH_SIZE = 500
     
     def __init__(self):
         self.redis_client = None
         self.ttl = settings.REDIS_TTL
+        self.local = LocalCache(
+            max_entries=settings.CACHE_L1_MAX_ENTRIES,
+            max_bytes=settings.CACHE_L1_MAX_BYTES,
+            ttl=settings.CACHE_L1_TTL
+        )
+        self.instance_id = uuid.uuid4().hex
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+        self._invalidation_task: Optional[asyncio.Task] = None
     
     async def _get_client(self) -> redis.Redis:
         """Redis 클라이언트 반환"""
@@ -24,37 +95,81 @@ class CacheService:
                 # 연결 테스트
                 await self.redis_client.ping()
                 logger.info("Redis 연결 성공")
+                if settings.CACHE_PUBSUB_INVALIDATION:
+                    self._invalidation_task = asyncio.create_task(self._listen_invalidations())
             except Exception as e:
                 logger.error(f"Redis 연결 실패: {e}")
                 # Redis 연결 실패 시 None 반환하여 캐시 비활성화
                 return None
         return self.redis_client
     
+    async def _listen_invalidations(self) -> None:
+        """다른 워커의 무효화 메시지를 받아 L1에서 제거"""
+        try:
+            pubsub = self.redis_client.pubsub()
+            await pubsub.subscribe(self.INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                sender, _, key = message["data"].partition(":")
+                if sender == self.instance_id:
+                    continue
+                if key == "*":
+                    self.local.clear()
+                else:
+                    self.local.delete(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"캐시 무효화 구독 실패: {e}")
+    
+    async def _publish_invalidation(self, client: redis.Redis, key: str) -> None:
+        """다른 워커의 L1 무효화 요청 (비활성화 시 무시)"""
+        if not settings.CACHE_PUBSUB_INVALIDATION:
+            return
+        try:
+            await client.publish(self.INVALIDATION_CHANNEL, f"{self.instance_id}:{key}")
+        except Exception as e:
+            logger.warning(f"캐시 무효화 발행 실패: {e}")
+    
     async def get(self, key: str) -> Optional[Dict[str, Any]]:
         """
-        캐시에서 값 조회
+        캐시에서 값 조회 (L1 → Redis 순)
+        
+        반환값은 L1에 보관된 객체와 공유될 수 있으므로 수정하지 마세요.
         
         Args:
             key: 캐시 키
-            
+        
         Returns:
             캐시된 값 또는 None
         """
+        value = self.local.get(key)
+        if value is not None:
+            self.stats["l1_hits"] += 1
+            return value
+        
         try:
             client = await self._get_client()
             if client is None:
+                self.stats["misses"] += 1
                 return None
             
-            value = await client.get(key)
-            if value:
-                return json.loads(value)
+            raw = await client.get(key)
+            if raw:
+                value = json.loads(raw)
+                self.local.set(key, value, len(raw))
+                self.stats["l2_hits"] += 1
+                return value
+            self.stats["misses"] += 1
             return None
             
         except Exception as e:
             logger.error(f"캐시 조회 실패: {e}")
             return None
     
-    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None,
+                  tags: Optional[List[str]] = None) -> bool:
         """
         캐시에 값 저장
         
@@ -62,21 +177,30 @@ class CacheService:
             key: 캐시 키
             value: 저장할 값
             ttl: 만료 시간 (초)
-            
+            tags: 무효화 태그 (예: 조회한 테이블명). 태그별 Redis SET에 키를 기록
+        
         Returns:
             저장 성공 여부
         """
         try:
+            ttl = ttl or self.ttl
+            raw = json.dumps(value, ensure_ascii=False)
+            self.local.set(key, value, len(raw), ttl)
+            
             client = await self._get_client()
             if client is None:
                 return False
             
-            ttl = ttl or self.ttl
-            await client.setex(
-                key,
-                ttl,
-                json.dumps(value, ensure_ascii=False)
-            )
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.setex(key, ttl, raw)
+                for tag in tags or []:
+                    tag_key = f"{self.TAG_KEY_PREFIX}{tag}"
+                    pipe.sadd(tag_key, key)
+                    # 태그 SET은 가장 늦게 만료되는 멤버만큼 유지
+                    pipe.expire(tag_key, ttl, gt=True)
+                    pipe.expire(tag_key, ttl, nx=True)
+                await pipe.execute()
+            await self._publish_invalidation(client, key)
             return True
             
         except Exception as e:
@@ -89,16 +213,19 @@ class CacheService:
         
         Args:
             key: 캐시 키
-            
+        
         Returns:
             삭제 성공 여부
         """
         try:
+            self.local.delete(key)
+            
             client = await self._get_client()
             if client is None:
                 return False
             
             result = await client.delete(key)
+            await self._publish_invalidation(client, key)
             return result > 0
             
         except Exception as e:
@@ -111,26 +238,101 @@ class CacheService:
         
         Args:
             pattern: Redis 패턴 (예: "chat:*")
-            
+        
         Returns:
             삭제된 키 개수
         """
         try:
+            # L1은 패턴 매칭 없이 전체 비움
+            self.local.clear()
+            
             client = await self._get_client()
             if client is None:
                 return 0
             
-            keys = await client.keys(pattern)
-            if keys:
-                await client.delete(*keys)
-                logger.info(f"패턴 '{pattern}'에 맞는 {len(keys)}개 캐시 삭제")
-                return len(keys)
-            return 0
+            # KEYS 대신 SCAN으로 점진 조회하고 UNLINK로 배치 삭제
+            deleted = 0
+            batch = []
+            async for key in client.scan_iter(match=pattern, count=self.BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= self.BATCH_SIZE:
+                    deleted += await client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += await client.unlink(*batch)
+            
+            await self._publish_invalidation(client, "*")
+            if deleted:
+                logger.info(f"패턴 '{pattern}'에 맞는 {deleted}개 캐시 삭제")
+            return deleted
             
         except Exception as e:
             logger.error(f"패턴 캐시 삭제 실패: {e}")
             return 0
     
+    async def invalidate_tags(self, tags: List[str]) -> int:
+        """
+        태그에 기록된 캐시 키들 삭제
+        
+        태그 SET을 SSCAN으로 나눠 읽고 파이프라인 UNLINK로 배치 삭제하므로
+        전체 키 공간 크기와 무관하게 해당 태그의 멤버 수에만 비례합니다.
+        
+        Args:
+            tags: 무효화할 태그 목록 (예: ["fact_sales"])
+            
+        Returns:
+            삭제된 키 개수
+        """
+        try:
+            client = await self._get_client()
+            if client is None:
+                self.local.clear()
+                return 0
+            
+            deleted = 0
+            for tag in tags:
+                tag_key = f"{self.TAG_KEY_PREFIX}{tag}"
+                batch = []
+                async for key in client.sscan_iter(tag_key, count=self.BATCH_SIZE):
+                    batch.append(key)
+                    if len(batch) >= self.BATCH_SIZE:
+                        deleted += await self._unlink_batch(client, batch)
+                        batch = []
+                if batch:
+                    deleted += await self._unlink_batch(client, batch)
+                await client.unlink(tag_key)
+            
+            # L1 항목은 태그를 모르므로 전체 무효화 (다른 워커 포함)
+            self.local.clear()
+            await self._publish_invalidation(client, "*")
+            logger.info(f"태그 {tags}에 해당하는 {deleted}개 캐시 삭제")
+            return deleted
+            
+        except Exception as e:
+            logger.error(f"태그 캐시 삭제 실패: {e}")
+            return 0
+    
+    async def _unlink_batch(self, client: redis.Redis, keys: List[str]) -> int:
+        """키 배치를 Redis에서 삭제"""
+        return await client.unlink(*keys)
+    
+    def _get_local_stats(self) -> Dict[str, Any]:
+        """L1/L2 히트율 통계"""
+        l1_hits = self.stats["l1_hits"]
+        l2_hits = self.stats["l2_hits"]
+        misses = self.stats["misses"]
+        total = l1_hits + l2_hits + misses
+        l2_lookups = l2_hits + misses
+        return {
+            "l1_entries": len(self.local),
+            "l1_bytes": self.local.total_bytes,
+            "l1_hits": l1_hits,
+            "l2_hits": l2_hits,
+            "misses": misses,
+            "l1_hit_ratio": l1_hits / total if total else 0.0,
+            "l2_hit_ratio": l2_hits / l2_lookups if l2_lookups else 0.0
+        }
+    
     async def get_stats(self) -> Dict[str, Any]:
         """
         캐시 통계 정보 반환
@@ -138,10 +340,11 @@ class CacheService:
         Returns:
             캐시 통계 정보
         """
+        local_stats = self._get_local_stats()
         try:
             client = await self._get_client()
             if client is None:
-                return {"status": "disconnected"}
+                return {"status": "disconnected", **local_stats}
             
             info = await client.info()
             return {
@@ -150,15 +353,19 @@ class CacheService:
                 "connected_clients": info.get("connected_clients", 0),
                 "total_commands_processed": info.get("total_commands_processed", 0),
                 "keyspace_hits": info.get("keyspace_hits", 0),
-                "keyspace_misses": info.get("keyspace_misses", 0)
+                "keyspace_misses": info.get("keyspace_misses", 0),
+                **local_stats
             }
             
         except Exception as e:
             logger.error(f"캐시 통계 조회 실패: {e}")
-            return {"status": "error", "error": str(e)}
+            return {"status": "error", "error": str(e), **local_stats}
     
     async def close(self):
         """Redis 연결 종료"""
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            self._invalidation_task = None
         if self.redis_client:
             await self.redis_client.close()
             self.redis_client = None
@@ -1,80 +1,206 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple, Union
+import asyncio
+import base64
+import json
 import logging
 from datetime import datetime
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 
 logger = logging.getLogger(__name__)
 
+# 세션 upsert (배치 내 세션 ID는 중복 없이 전달)
+_UPSERT_SESSIONS = text("""
+    INSERT INTO chat_sessions (session_id, created_at, updated_at)
+    SELECT session_id, touched_at, touched_at
+    FROM unnest(CAST(:session_ids AS varchar[]), CAST(:touched_at AS timestamp[])) AS s(session_id, touched_at)
+    ON CONFLICT (session_id) DO UPDATE SET updated_at = EXCLUDED.updated_at
+""")
+
+# 메시지 다중 행 삽입 (컬럼별 배열을 unnest로 펼쳐 한 문장으로 실행)
+_INSERT_MESSAGES = text("""
+    INSERT INTO chat_messages
+    (session_id, message_type, content, sql_query, execution_time, cached, created_at)
+    SELECT * FROM unnest(
+        CAST(:session_ids AS varchar[]),
+        CAST(:message_types AS varchar[]),
+        CAST(:contents AS text[]),
+        CAST(:sql_queries AS text[]),
+        CAST(:execution_times AS float8[]),
+        CAST(:cached AS boolean[]),
+        CAST(:created_at AS timestamp[])
+    )
+""")
+
+class _MessageEvent(NamedTuple):
+    session_id: str
+    message_type: str
+    content: str
+    sql_query: Optional[str]
+    execution_time: Optional[float]
+    cached: bool
+    created_at: datetime
+
+class _ClearSession(NamedTuple):
+    session_id: str
+    done: asyncio.Future
+
+# 기록 루프 종료 신호
+_STOP = object()
+
 class ChatHistoryService:
-    """채팅 기록 서비스"""
+    """
+    채팅 기록 서비스
+    
+    메시지는 응답 경로에서 기다리지 않도록 프로세스 내 대기열에 넣고, 백그라운드
+    루프가 여러 요청의 메시지를 CHAT_HISTORY_FLUSH_INTERVAL_MS 또는
+    CHAT_HISTORY_BATCH_SIZE 단위로 모아 세션 upsert 한 번과 메시지 다중 행 삽입
+    한 번, 커밋 한 번으로 기록합니다 (write-behind). 대기열이 가득 차면 새 메시지는
+    버리고 dropped로 집계하며, 종료 시 남은 메시지를 모두 기록합니다.
+    
+    분석 쿼리와 연결을 다투지 않도록 쓰기 풀(AsyncSessionLocal)에서 직접 세션을 엽니다.
+    """
+    
+    SHUTDOWN_TIMEOUT = 10  # 종료 시 남은 기록을 기다리는 최대 시간 (초)
+    
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.CHAT_HISTORY_QUEUE_SIZE)
+        self._flush_task: Optional[asyncio.Task] = None
+        self.stats = {"recorded": 0, "written": 0, "batches": 0, "dropped": 0, "failed": 0}
+    
+    async def start(self) -> None:
+        """기록 루프 시작"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
     
-    async def save_session(self, session_id: str, db_session: AsyncSession) -> None:
-        """채팅 세션 저장/업데이트"""
+    async def stop(self) -> None:
+        """대기 중인 메시지를 모두 기록한 뒤 기록 루프 종료"""
+        if self._flush_task is None:
+            return
+        await self._queue.put(_STOP)
         try:
-            # 세션이 존재하는지 확인
-            check_query = text("SELECT session_id FROM chat_sessions WHERE session_id = :session_id")
-            result = await db_session.execute(check_query, {"session_id": session_id})
-            existing = result.fetchone()
-            
-            if existing:
-                # 세션 업데이트
-                update_query = text("""
-                    UPDATE chat_sessions 
-                    SET updated_at = CURRENT_TIMESTAMP 
-                    WHERE session_id = :session_id
-                """)
-                await db_session.execute(update_query, {"session_id": session_id})
-            else:
-                # 새 세션 생성
-                insert_query = text("""
-                    INSERT INTO chat_sessions (session_id, created_at, updated_at) 
-                    VALUES (:session_id, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                """)
-                await db_session.execute(insert_query, {"session_id": session_id})
-            
-            await db_session.commit()
-            
-        except Exception as e:
-            logger.error(f"세션 저장 실패: {e}")
-            await db_session.rollback()
-            raise
+            await asyncio.wait_for(self._flush_task, self.SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"채팅 기록 종료 대기 시간 초과: {self._queue.qsize()}개 미기록")
+        self._flush_task = None
     
-    async def save_message(self, session_id: str, message_type: str, content: str, 
-                          sql_query: Optional[str] = None, execution_time: Optional[float] = None,
-                          cached: bool = False, db_session: AsyncSession = None) -> None:
-        """채팅 메시지 저장"""
+    def record_message(self, session_id: str, message_type: str, content: str,
+                       sql_query: Optional[str] = None, execution_time: Optional[float] = None,
+                       cached: bool = False) -> None:
+        """채팅 메시지를 기록 대기열에 추가 (DB를 기다리지 않음)"""
+        event = _MessageEvent(
+            session_id, message_type, content, sql_query, execution_time, cached, datetime.now()
+        )
         try:
-            # 세션 저장
-            await self.save_session(session_id, db_session)
-            
-            # 메시지 저장
-            insert_query = text("""
-                INSERT INTO chat_messages 
-                (session_id, message_type, content, sql_query, execution_time, cached, created_at)
-                VALUES (:session_id, :message_type, :content, :sql_query, :execution_time, :cached, CURRENT_TIMESTAMP)
-            """)
-            
-            await db_session.execute(insert_query, {
-                "session_id": session_id,
-                "message_type": message_type,
-                "content": content,
-                "sql_query": sql_query,
-                "execution_time": execution_time,
-                "cached": cached
-            })
-            
-            await db_session.commit()
-            
+            self._queue.put_nowait(event)
+            self.stats["recorded"] += 1
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning(f"채팅 기록 대기열 가득 참, 메시지 버림: {session_id}")
+    
+    async def _flush_loop(self) -> None:
+        while True:
+            batch, control = await self._collect_batch()
+            if batch:
+                await self._write_batch(batch)
+            if control is _STOP:
+                return
+            if control is not None:
+                await self._run_clear(control)
+    
+    async def _collect_batch(self) -> Tuple[List[_MessageEvent], Union[_ClearSession, object, None]]:
+        """
+        첫 메시지부터 주기가 끝나거나 배치가 찰 때까지 메시지를 모음
+        
+        삭제 요청이나 종료 신호를 만나면 그 앞까지만 모아 함께 반환하므로
+        대기열 순서대로 처리됩니다.
+        """
+        loop = asyncio.get_running_loop()
+        batch: List[_MessageEvent] = []
+        event = await self._queue.get()
+        deadline = loop.time() + settings.CHAT_HISTORY_FLUSH_INTERVAL_MS / 1000
+        while isinstance(event, _MessageEvent):
+            batch.append(event)
+            if len(batch) >= settings.CHAT_HISTORY_BATCH_SIZE:
+                return batch, None
+            try:
+                event = await asyncio.wait_for(self._queue.get(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                return batch, None
+        return batch, event
+    
+    async def _write_batch(self, batch: List[_MessageEvent]) -> None:
+        """세션 upsert와 메시지 삽입을 한 트랜잭션으로 기록 (실패 시 배치를 버리고 집계)"""
+        # 세션별 마지막 메시지 시각 (같은 배치에서 한 행을 두 번 갱신할 수 없음)
+        touched = {event.session_id: event.created_at for event in batch}
+        async with AsyncSessionLocal() as db_session:
+            try:
+                await db_session.execute(_UPSERT_SESSIONS, {
+                    "session_ids": list(touched),
+                    "touched_at": list(touched.values())
+                })
+                await db_session.execute(_INSERT_MESSAGES, {
+                    "session_ids": [event.session_id for event in batch],
+                    "message_types": [event.message_type for event in batch],
+                    "contents": [event.content for event in batch],
+                    "sql_queries": [event.sql_query for event in batch],
+                    "execution_times": [event.execution_time for event in batch],
+                    "cached": [event.cached for event in batch],
+                    "created_at": [event.created_at for event in batch]
+                })
+                await db_session.commit()
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+            except Exception as e:
+                logger.error(f"채팅 기록 일괄 저장 실패 ({len(batch)}개): {e}")
+                await db_session.rollback()
+                self.stats["failed"] += len(batch)
+    
+    async def _run_clear(self, request: _ClearSession) -> None:
+        try:
+            await self._delete_session(request.session_id)
+            request.done.set_result(None)
         except Exception as e:
-            logger.error(f"메시지 저장 실패: {e}")
-            await db_session.rollback()
-            raise
+            request.done.set_exception(e)
     
-    async def get_session_messages(self, session_id: str, db_session: AsyncSession) -> List[Dict[str, Any]]:
-        """세션의 모든 메시지 조회"""
+    def get_stats(self) -> Dict[str, Any]:
+        """기록/버림/실패 건수와 대기열 길이"""
+        return {**self.stats, "pending": self._queue.qsize()}
+    
+    async def get_session_messages(self, session_id: str, cursor: Optional[str] = None,
+                                   limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        세션 메시지를 최근 것부터 한 페이지씩 조회 (대기열에 남은 최근 메시지는 다음 기록 주기 후 보임)
+        
+        (session_id, created_at, message_id) 복합 인덱스를 역순으로 읽는 keyset 페이지네이션이므로
+        오래된 페이지도 OFFSET 없이 같은 비용으로 읽습니다.
+        
+        Args:
+            session_id: 채팅 세션 ID
+            cursor: 이전 페이지에서 받은 커서 (첫 페이지는 None)
+            limit: 페이지 크기 (기본 CHAT_HISTORY_PAGE_SIZE)
+        
+        Returns:
+            (messages, next_cursor): messages는 시간 순, next_cursor는 더 오래된 메시지가 없으면 None
+        """
+        async with AsyncSessionLocal() as db_session:
+            return await self._get_session_messages(session_id, cursor, limit or settings.CHAT_HISTORY_PAGE_SIZE, db_session)
+    
+    async def _get_session_messages(self, session_id: str, cursor: Optional[str], limit: int,
+                                    db_session: AsyncSession) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        params = {"session_id": session_id, "limit": limit + 1}
+        if cursor:
+            before_at, before_id = self._decode_cursor(cursor)
+            params.update(before_at=before_at, before_id=before_id)
+            # created_at 조건은 더 최근 월 파티션을 제외하기 위한 것
+            keyset_filter = "AND created_at <= :before_at AND (created_at, message_id) < (:before_at, :before_id)"
+        else:
+            keyset_filter = ""
+        
         try:
-            query = text("""
+            query = text(f"""
                 SELECT 
                     message_id,
                     message_type,
@@ -85,32 +211,71 @@ class ChatHistoryService:
                     created_at
                 FROM chat_messages 
                 WHERE session_id = :session_id 
-                ORDER BY created_at ASC
+                {keyset_filter}
+                ORDER BY created_at DESC, message_id DESC
+                LIMIT :limit
             """)
             
-            result = await db_session.execute(query, {"session_id": session_id})
-            messages = []
-            
-            for row in result.fetchall():
-                message = {
-                    "message_id": row[0],
-                    "message_type": row[1],
-                    "content": row[2],
-                    "sql_query": row[3],
-                    "execution_time": float(row[4]) if row[4] else None,
-                    "cached": row[5],
-                    "created_at": row[6].isoformat() if row[6] else None
-                }
-                messages.append(message)
-            
-            return messages
+            result = await db_session.execute(query, params)
+            rows = result.fetchall()
             
         except Exception as e:
             logger.error(f"메시지 조회 실패: {e}")
             raise
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(rows[-1][6], rows[-1][0])
+        
+        messages = []
+        for row in reversed(rows):
+            message = {
+                "message_id": row[0],
+                "message_type": row[1],
+                "content": row[2],
+                "sql_query": row[3],
+                "execution_time": float(row[4]) if row[4] else None,
+                "cached": row[5],
+                "created_at": row[6].isoformat() if row[6] else None
+            }
+            messages.append(message)
+        
+        return messages, next_cursor
+    
+    def _encode_cursor(self, created_at: datetime, message_id: int) -> str:
+        """마지막으로 읽은 메시지 위치를 불투명한 커서 문자열로 인코딩"""
+        payload = json.dumps({"t": created_at.isoformat(), "i": message_id}, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+    
+    def _decode_cursor(self, cursor: str) -> Tuple[datetime, int]:
+        """커서 문자열을 (created_at, message_id)로 디코딩"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded))
+            return datetime.fromisoformat(payload["t"]), int(payload["i"])
+        except Exception:
+            raise ValueError("잘못된 기록 커서입니다")
+    
+    async def clear_session(self, session_id: str) -> None:
+        """
+        세션의 모든 메시지 삭제
+        
+        대기열에 남은 이 세션의 메시지가 삭제 뒤에 기록되지 않도록, 기록 루프가
+        실행 중이면 삭제도 대기열 순서대로 처리합니다.
+        """
+        if self._flush_task is None:
+            await self._delete_session(session_id)
+            return
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put(_ClearSession(session_id, done))
+        await done
+    
+    async def _delete_session(self, session_id: str) -> None:
+        async with AsyncSessionLocal() as db_session:
+            await self._clear_session(session_id, db_session)
     
-    async def clear_session(self, session_id: str, db_session: AsyncSession) -> None:
-        """세션의 모든 메시지 삭제"""
+    async def _clear_session(self, session_id: str, db_session: AsyncSession) -> None:
         try:
             delete_query = text("DELETE FROM chat_messages WHERE session_id = :session_id")
             await db_session.execute(delete_query, {"session_id": session_id})
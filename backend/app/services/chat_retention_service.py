@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+def _add_months(month: date, months: int) -> date:
+    """월 첫날에 개월 수를 더한 월 첫날"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+class ChatRetentionService:
+    """
+    채팅 기록 파티션 관리
+    
+    chat_messages는 created_at 기준 월별 파티션(chat_messages_pYYYYMM)으로 나뉘어 있습니다.
+    주기마다
+    - 다음 CHAT_PARTITION_PREMAKE_MONTHS개월 파티션을 미리 만들고 (그 달 행이 이미 기본
+      파티션에 들어와 있으면 새 파티션으로 옮김)
+    - CHAT_RETENTION_MONTHS가 지난 월 파티션을 행 단위 DELETE 없이 통째로 삭제하거나
+      (CHAT_RETENTION_ARCHIVE) 분리해 chat_archive 스키마로 옮기고, 기본 파티션에 남은
+      보존 기간이 지난 행도 같은 방식으로 삭제/보관하고
+    - 마지막 활동이 보존 기간보다 오래된 세션을 한 문장으로 정리합니다.
+    여러 프로세스가 동시에 실행해도 트랜잭션 advisory lock으로 한 곳에서만 수행됩니다.
+    """
+    
+    PARENT_TABLE = "chat_messages"
+    PARTITION_PREFIX = "chat_messages_p"
+    DEFAULT_PARTITION = "chat_messages_default"
+    ARCHIVE_SCHEMA = "chat_archive"
+    LOCK_KEY = 7_204_311  # 파티션 관리 advisory lock 키
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self) -> None:
+        """
+        파티션 관리 주기 작업 시작
+        
+        chat_messages가 파티션 테이블이 아니면(파티션 도입 이전 배포) 주기마다 실패하는
+        대신 시작 단계에서 마이그레이션 안내와 함께 중단합니다.
+        """
+        await self._ensure_partitioned()
+        if settings.CHAT_MAINTENANCE_INTERVAL > 0:
+            self._task = asyncio.create_task(self._maintenance_loop())
+    
+    async def stop(self) -> None:
+        """파티션 관리 주기 작업 종료"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+    
+    async def _ensure_partitioned(self) -> None:
+        async with AsyncSessionLocal() as session:
+            partitioned = await session.scalar(text("""
+                SELECT EXISTS (
+                    SELECT 1 FROM pg_partitioned_table
+                    WHERE partrelid = to_regclass(:parent)
+                )
+            """), {"parent": self.PARENT_TABLE})
+        if not partitioned:
+            raise RuntimeError(
+                f"{self.PARENT_TABLE} 테이블이 파티션 테이블이 아닙니다. "
+                "database/migrations/001_partition_chat_messages.sql을 실행한 뒤 다시 시작하세요"
+            )
+    
+    async def _maintenance_loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"채팅 기록 파티션 관리 실패: {e}")
+            await asyncio.sleep(settings.CHAT_MAINTENANCE_INTERVAL)
+    
+    async def run_once(self) -> Dict[str, List[str]]:
+        """
+        파티션 생성/만료 처리/세션 정리를 한 트랜잭션으로 수행
+        
+        Returns:
+            {"created": [...], "expired": [...]} (다른 프로세스가 수행 중이면 빈 dict)
+        """
+        this_month = date.today().replace(day=1)
+        async with AsyncSessionLocal() as session:
+            locked = await session.scalar(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": self.LOCK_KEY}
+            )
+            if not locked:
+                return {}
+            
+            existing = await self._list_partitions(session)
+            created = await self._create_partitions(session, existing, this_month)
+            expired: List[str] = []
+            if settings.CHAT_RETENTION_MONTHS > 0:
+                cutoff = _add_months(this_month, -settings.CHAT_RETENTION_MONTHS)
+                expired = await self._expire_partitions(session, existing, cutoff)
+                await self._expire_default_rows(session, cutoff)
+                await session.execute(
+                    text("DELETE FROM chat_sessions WHERE updated_at < :cutoff"),
+                    {"cutoff": datetime.combine(cutoff, datetime.min.time())}
+                )
+            await session.commit()
+        
+        if created or expired:
+            logger.info(f"채팅 기록 파티션 관리: 생성 {created}, 만료 {expired}")
+        return {"created": created, "expired": expired}
+    
+    async def _list_partitions(self, session: AsyncSession) -> Dict[date, str]:
+        """월별 파티션 이름 (기본 파티션 제외)"""
+        result = await session.execute(text("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:parent AS regclass)
+        """), {"parent": self.PARENT_TABLE})
+        pattern = re.compile(rf"^{self.PARTITION_PREFIX}(\d{{4}})(\d{{2}})$")
+        partitions = {}
+        for (name,) in result.fetchall():
+            match = pattern.match(name)
+            if match:
+                partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+        return partitions
+    
+    async def _create_partitions(self, session: AsyncSession, existing: Dict[date, str], this_month: date) -> List[str]:
+        created = []
+        for offset in range(settings.CHAT_PARTITION_PREMAKE_MONTHS + 1):
+            month = _add_months(this_month, offset)
+            if month in existing:
+                continue
+            name = f"{self.PARTITION_PREFIX}{month:%Y%m}"
+            next_month = _add_months(month, 1)
+            # 기본 파티션에 해당 월 행이 있으면 CREATE ... PARTITION OF가 실패하므로
+            # 일반 테이블로 만들어 그 달 행을 옮긴 뒤 파티션으로 연결
+            try:
+                async with session.begin_nested():
+                    await session.execute(text(
+                        f"CREATE TABLE {name} (LIKE {self.PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                    ))
+                    moved = await session.execute(text(f"""
+                        WITH moved AS (
+                            DELETE FROM {self.DEFAULT_PARTITION}
+                            WHERE created_at >= :start AND created_at < :end
+                            RETURNING *
+                        )
+                        INSERT INTO {name} SELECT * FROM moved
+                    """), {
+                        "start": datetime.combine(month, datetime.min.time()),
+                        "end": datetime.combine(next_month, datetime.min.time())
+                    })
+                    await session.execute(text(
+                        f"ALTER TABLE {self.PARENT_TABLE} ATTACH PARTITION {name} "
+                        f"FOR VALUES FROM ('{month}') TO ('{next_month}')"
+                    ))
+                created.append(name)
+                if moved.rowcount:
+                    logger.info(f"기본 파티션의 {month:%Y-%m} 행 {moved.rowcount}개를 {name}으로 이동")
+            except Exception as e:
+                logger.error(f"채팅 기록 파티션 생성 실패 ({name}): {e}")
+        return created
+    
+    async def _expire_partitions(self, session: AsyncSession, existing: Dict[date, str], cutoff: date) -> List[str]:
+        expired = [name for month, name in sorted(existing.items()) if month < cutoff]
+        if expired and settings.CHAT_RETENTION_ARCHIVE:
+            await session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {self.ARCHIVE_SCHEMA}"))
+        for name in expired:
+            if settings.CHAT_RETENTION_ARCHIVE:
+                await session.execute(text(f"ALTER TABLE {self.PARENT_TABLE} DETACH PARTITION {name}"))
+                await session.execute(text(f"ALTER TABLE {name} SET SCHEMA {self.ARCHIVE_SCHEMA}"))
+            else:
+                await session.execute(text(f"DROP TABLE {name}"))
+        return expired
+    
+    async def _expire_default_rows(self, session: AsyncSession, cutoff: date) -> None:
+        """월 파티션이 없어 기본 파티션에 들어간 행 중 보존 기간이 지난 행 삭제/보관"""
+        bounds = {"cutoff": datetime.combine(cutoff, datetime.min.time())}
+        if settings.CHAT_RETENTION_ARCHIVE:
+            archive = f"{self.ARCHIVE_SCHEMA}.{self.DEFAULT_PARTITION}"
+            await session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {self.ARCHIVE_SCHEMA}"))
+            await session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {archive} (LIKE {self.PARENT_TABLE})"
+            ))
+            result = await session.execute(text(f"""
+                WITH expired AS (
+                    DELETE FROM {self.DEFAULT_PARTITION} WHERE created_at < :cutoff RETURNING *
+                )
+                INSERT INTO {archive} SELECT * FROM expired
+            """), bounds)
+        else:
+            result = await session.execute(
+                text(f"DELETE FROM {self.DEFAULT_PARTITION} WHERE created_at < :cutoff"), bounds
+            )
+        if result.rowcount:
+            logger.info(f"기본 파티션에서 보존 기간이 지난 행 {result.rowcount}개 정리")
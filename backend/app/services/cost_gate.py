@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.services.cache_service import CacheService
+from app.services.query_engine import AnalyticQueryEngine
+from app.services.sql_guardrails import SQLGuardrails
+
+logger = logging.getLogger(__name__)
+
+# 고비용 쿼리 동시 실행 슬롯 (프로세스 전체 공유)
+_expensive_slots = asyncio.Semaphore(settings.QUERY_COST_QUEUE_CONCURRENCY)
+
+class QueryCostExceededError(ValueError):
+    """예상 비용이 거부 한도를 넘은 쿼리"""
+
+class QueryQueueTimeoutError(Exception):
+    """고비용 쿼리 대기열에서 실행 슬롯을 얻지 못함"""
+
+class QueryCostGate:
+    """
+    실행 전 EXPLAIN 비용 점검
+    
+    검증된 SQL을 EXPLAIN (FORMAT JSON)으로 계획만 세워 총 비용과 예상 행 수를
+    읽고, SQL 지문별로 캐시합니다. 설정된 한도에 따라
+    - 예상 행이 많고 비용이 QUERY_COST_DOWNGRADE를 넘으면 LIMIT을 줄여 다시 점검
+    - QUERY_COST_QUEUE를 넘으면 고비용 대기열(동시 실행 제한)에서 실행
+    - QUERY_COST_REJECT를 넘으면 실행하지 않고 거부
+    합니다. 결과 캐시에 있는 쿼리는 점검하지 않습니다.
+    """
+    
+    PLAN_KEY_PREFIX = "plan:"
+    
+    def __init__(self, query_engine: AnalyticQueryEngine, cache_service: Optional[CacheService] = None):
+        self.query_engine = query_engine
+        self.cache = cache_service or CacheService()
+        self.guardrails = SQLGuardrails()
+        self.stats = {"checked": 0, "downgraded": 0, "queued": 0, "rejected": 0}
+    
+    @asynccontextmanager
+    async def admit(self, sql: str, session: AsyncSession, allow_downgrade: bool = True) -> AsyncIterator[str]:
+        """
+        비용 점검을 통과한 SQL로 실행 구간 진입
+        
+        고비용 쿼리는 블록이 끝날 때까지 대기열 슬롯을 점유합니다.
+        내보내기처럼 결과를 잘라서는 안 되는 경우 allow_downgrade=False로 호출합니다.
+        
+        Yields:
+            실행할 SQL (LIMIT이 줄어들었으면 입력과 다르며, 그 외에는 입력 그대로)
+        
+        Raises:
+            QueryCostExceededError: 예상 비용이 거부 한도 초과
+            QueryQueueTimeoutError: 대기열 대기 시간 초과
+        """
+        if not settings.QUERY_COST_CHECK_ENABLED:
+            yield sql
+            return
+        
+        self.stats["checked"] += 1
+        plan = await self.get_plan(sql, session)
+        
+        if allow_downgrade and plan["cost"] > settings.QUERY_COST_DOWNGRADE and plan["rows"] > settings.QUERY_COST_DOWNGRADE_LIMIT:
+            downgraded_sql = self.guardrails.cap_limit(sql, settings.QUERY_COST_DOWNGRADE_LIMIT)
+            if downgraded_sql != sql:
+                self.stats["downgraded"] += 1
+                logger.warning(
+                    f"고비용 쿼리 LIMIT 축소: cost={plan['cost']:.0f}, rows={plan['rows']} "
+                    f"-> LIMIT {settings.QUERY_COST_DOWNGRADE_LIMIT}"
+                )
+                sql = downgraded_sql
+                plan = await self.get_plan(sql, session)
+        
+        if plan["cost"] > settings.QUERY_COST_REJECT:
+            self.stats["rejected"] += 1
+            raise QueryCostExceededError(
+                f"쿼리 예상 비용({plan['cost']:.0f})이 허용 한도({settings.QUERY_COST_REJECT:.0f})를 초과했습니다. "
+                "조건을 추가하거나 범위를 줄여 주세요."
+            )
+        
+        if plan["cost"] <= settings.QUERY_COST_QUEUE:
+            yield sql
+            return
+        
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(_expensive_slots.acquire(), settings.QUERY_COST_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise QueryQueueTimeoutError("고비용 쿼리 대기열이 가득 찼습니다. 잠시 후 다시 시도해 주세요.")
+        try:
+            yield sql
+        finally:
+            _expensive_slots.release()
+    
+    async def get_plan(self, sql: str, session: AsyncSession) -> Dict[str, Any]:
+        """
+        EXPLAIN 결과 요약 조회 (지문별 캐시, 조회한 테이블을 무효화 태그로 기록)
+        
+        Returns:
+            {"cost": 총 비용, "rows": 예상 행 수}
+        """
+        key = f"{self.PLAN_KEY_PREFIX}{self.guardrails.fingerprint_sql(sql)}"
+        cached = await self.cache.get(key)
+        if cached:
+            return cached
+        
+        if settings.ANALYTIC_ENGINE_ENABLED:
+            plan = await self.query_engine.explain(sql)
+        else:
+            result = await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+            raw = result.scalar()
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+        
+        summary = {"cost": float(plan["Total Cost"]), "rows": int(plan["Plan Rows"])}
+        await self.cache.set(
+            key,
+            summary,
+            ttl=settings.QUERY_COST_CACHE_TTL,
+            tags=self.guardrails.referenced_tables(sql)
+        )
+        return summary
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """점검/축소/대기/거부 횟수"""
+        return dict(self.stats)
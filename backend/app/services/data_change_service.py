@@ -0,0 +1,146 @@
+import asyncio
+import asyncpg
+import logging
+from typing import Dict, List, Optional, Set
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_asyncpg_dsn
+from app.services.query_cache_service import QueryCacheService
+from app.services.rollup_service import RollupService
+
+logger = logging.getLogger(__name__)
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+class DataChangeDetector:
+    """
+    데이터 변경 감지 서비스
+    
+    테이블별 워터마크(pg_stat_user_tables 변경 카운터, 설정된 경우 max(컬럼))를
+    주기적으로 비교하거나 적재 작업의 NOTIFY를 받아, 바뀐 테이블을 읽은
+    결과 캐시만 무효화합니다. 데이터가 그대로면 결과 캐시는 TTL까지 유지됩니다.
+    롤업 서비스가 주어지면 바뀐 테이블을 읽는 롤업을 먼저 갱신한 뒤 무효화합니다.
+    
+    적재 작업 예시: NOTIFY cache_invalidate, 'fact_sales,dim_product';
+    (페이로드가 비어 있으면 허용 테이블 전체를 무효화)
+    """
+    
+    WATERMARK_CACHE_KEY = "watermarks"
+    WATERMARK_CACHE_TTL = 30 * 24 * 3600  # 30일
+    
+    def __init__(self, query_cache: QueryCacheService, rollups: Optional[RollupService] = None):
+        self.query_cache = query_cache
+        self.rollups = rollups
+        self.watermarks: Dict[str, str] = {}
+        self._poll_task: Optional[asyncio.Task] = None
+        self._listen_conn: Optional[asyncpg.Connection] = None
+        self._pending: Set[asyncio.Task] = set()
+    
+    async def start(self) -> None:
+        """워터마크 폴링 및 LISTEN 시작"""
+        if settings.CACHE_CHANGE_POLL_INTERVAL > 0:
+            # 재시작 사이의 변경도 감지하도록 마지막 워터마크를 캐시에서 복원
+            stored = await self.query_cache.cache.get(self.WATERMARK_CACHE_KEY)
+            self.watermarks = dict(stored or {})
+            self._poll_task = asyncio.create_task(self._poll_loop())
+        
+        if settings.CACHE_CHANGE_NOTIFY_CHANNEL:
+            try:
+                self._listen_conn = await asyncpg.connect(get_asyncpg_dsn(), timeout=10)
+                await self._listen_conn.add_listener(
+                    settings.CACHE_CHANGE_NOTIFY_CHANNEL,
+                    self._on_notify
+                )
+                logger.info(f"데이터 변경 알림 수신 시작: {settings.CACHE_CHANGE_NOTIFY_CHANNEL}")
+            except Exception as e:
+                logger.warning(f"데이터 변경 알림 수신 실패: {e}")
+                self._listen_conn = None
+    
+    async def stop(self) -> None:
+        """폴링 및 LISTEN 종료"""
+        if self._poll_task:
+            self._poll_task.cancel()
+            self._poll_task = None
+        if self._listen_conn:
+            try:
+                await self._listen_conn.close()
+            except Exception as e:
+                logger.warning(f"데이터 변경 알림 연결 종료 실패: {e}")
+            self._listen_conn = None
+    
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                await self.check_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"데이터 변경 확인 실패: {e}")
+            await asyncio.sleep(settings.CACHE_CHANGE_POLL_INTERVAL)
+    
+    async def check_once(self) -> List[str]:
+        """
+        워터마크를 한 번 비교하고 바뀐 테이블의 결과 캐시 무효화
+        
+        Returns:
+            변경이 감지된 테이블 목록
+        """
+        async with AsyncSessionLocal() as session:
+            current = await self._read_watermarks(session)
+        
+        changed = [table for table, mark in current.items() if self.watermarks.get(table) != mark]
+        if changed:
+            deleted = await self._apply_change(changed)
+            logger.info(f"데이터 변경 감지: {changed} (결과 캐시 {deleted}개 삭제)")
+        
+        self.watermarks = current
+        await self.query_cache.cache.set(
+            self.WATERMARK_CACHE_KEY,
+            current,
+            ttl=self.WATERMARK_CACHE_TTL
+        )
+        return changed
+    
+    async def _apply_change(self, tables: List[str]) -> int:
+        """롤업 갱신 후 바뀐 테이블(과 갱신된 롤업)을 읽은 캐시 무효화"""
+        if self.rollups is not None:
+            tables = tables + await self.rollups.refresh_for(tables)
+        return await self.query_cache.invalidate_tables(tables)
+    
+    async def _read_watermarks(self, session) -> Dict[str, str]:
+        """허용 테이블의 워터마크를 한 번의 쿼리로 조회"""
+        tables = list(settings.ALLOWED_TABLES)
+        parts = ["""
+            SELECT relname::text AS table_name,
+                   (n_tup_ins + n_tup_upd + n_tup_del)::text AS mark
+            FROM pg_catalog.pg_stat_user_tables
+            WHERE schemaname = 'public'
+            AND relname = ANY(:tables)
+        """]
+        for table, column in settings.CACHE_WATERMARK_COLUMNS.items():
+            if table not in tables:
+                continue
+            parts.append(
+                f"SELECT {_quote_literal(table)} AS table_name, "
+                f"coalesce(max({_quote_identifier(column)})::text, '') AS mark "
+                f"FROM {_quote_identifier(table)}"
+            )
+        
+        result = await session.execute(text(" UNION ALL ".join(parts)), {"tables": tables})
+        marks: Dict[str, List[str]] = {}
+        for row in result.fetchall():
+            marks.setdefault(row[0], []).append(row[1] or "")
+        return {table: "|".join(sorted(values)) for table, values in marks.items()}
+    
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        """NOTIFY 수신 시 해당 테이블 롤업 갱신 및 결과 캐시 무효화"""
+        tables = [name.strip() for name in (payload or "").split(",") if name.strip()]
+        tables = tables or list(settings.ALLOWED_TABLES)
+        logger.info(f"데이터 변경 알림 수신: {tables}")
+        task = asyncio.create_task(self._apply_change(tables))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
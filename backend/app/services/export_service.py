@@ -0,0 +1,336 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, IO, Iterator, List, Optional, Tuple
+from datetime import date, datetime
+import asyncio
+import csv
+import io
+import logging
+import tempfile
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+from app.core.config import settings
+from app.services.query_engine import AnalyticQueryEngine, run_with_timeout
+from app.services.result_encoding import column_type_codes
+from app.services.cost_gate import QueryCostGate
+
+logger = logging.getLogger(__name__)
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# PostgreSQL 타입 OID → Arrow 타입 (없는 타입은 문자열로 기록)
+# numeric은 드라이버가 정밀도/scale(typmod)을 알려주지 않으므로 값을 잃지 않도록 10진 문자열
+_ARROW_TYPES = {
+    16: pa.bool_(),  # bool
+    20: pa.int64(),  # int8
+    21: pa.int16(),  # int2
+    23: pa.int32(),  # int4
+    700: pa.float32(),  # float4
+    701: pa.float64(),  # float8
+    1082: pa.date32(),  # date
+    1083: pa.time64("us"),  # time
+    1114: pa.timestamp("us"),  # timestamp
+    1184: pa.timestamp("us", tz="UTC")  # timestamptz
+}
+
+class _ByteSink:
+    """pyarrow 출력 바이트를 모아 두었다가 전송 단위로 꺼내는 버퍼"""
+    
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.closed = False
+    
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def close(self) -> None:
+        self.closed = True
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+class ExportService:
+    """쿼리 결과 내보내기 서비스 (서버 사이드 커서로 청크 단위 처리)"""
+    
+    FILE_CHUNK_SIZE = 64 * 1024
+    WIDTH_SAMPLE_ROWS = 200
+    MAX_COLUMN_WIDTH = 50
+    PARQUET_ROW_GROUP_SIZE = 64 * 1024
+    
+    def __init__(self):
+        self.chunk_size = settings.EXPORT_CHUNK_SIZE
+        # 연결 풀은 채팅과 공유, 커서 행은 Decimal/date 타입 유지 (XLSX 숫자/날짜 서식, Parquet/Arrow 타입)
+        self.query_engine = AnalyticQueryEngine()
+        self.cost_gate = QueryCostGate(self.query_engine)
+    
+    async def build_xlsx(self, sql: str, session: AsyncSession) -> Optional[IO[bytes]]:
+        """
+        검증된 SQL 결과를 XLSX 임시 파일로 작성
+        
+        서버 사이드 커서에서 청크 단위로 읽어 xlsxwriter constant_memory 모드로
+        바로 기록하므로, 행 수와 관계없이 메모리 사용량이 일정합니다.
+        XLSX(zip)는 마지막에 한 번에 조립되므로 완성된 파일을 반환합니다.
+        
+        Args:
+            sql: 검증된 SQL 쿼리
+            session: 데이터베이스 세션
+        
+        Returns:
+            처음 위치로 되감긴 임시 파일 (결과가 없으면 None)
+        """
+        cursor = await self._open_cursor(sql, session)
+        if cursor is None:
+            return None
+        resources, columns, _, partitions, first_chunk = cursor
+        
+        output = tempfile.TemporaryFile()
+        try:
+            workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+            worksheet = workbook.add_worksheet("Data")
+            formats = self._create_formats(workbook)
+            
+            # 헤더
+            for col_num, column in enumerate(columns):
+                worksheet.write(0, col_num, column, formats["header"])
+            
+            # 샘플 기준 컬럼 너비/서식 결정 (constant_memory 모드는 행 순서대로만 기록 가능)
+            sample = first_chunk[:self.WIDTH_SAMPLE_ROWS]
+            for col_num, width in enumerate(self._estimate_widths(columns, sample)):
+                worksheet.set_column(col_num, col_num, width)
+            cell_formats = self._resolve_cell_formats(len(columns), sample, formats)
+            
+            row_num = 1
+            chunk = first_chunk
+            while chunk:
+                for row in chunk:
+                    for col_num, value in enumerate(row):
+                        worksheet.write(row_num, col_num, value, cell_formats[col_num])
+                    row_num += 1
+                chunk = await run_with_timeout(anext(partitions, None))
+            
+            # zip 압축은 CPU 작업이므로 이벤트 루프 밖에서 수행
+            await asyncio.to_thread(workbook.close)
+            output.seek(0)
+            logger.info(f"XLSX 생성 완료: {row_num - 1}행")
+            return output
+            
+        except Exception:
+            output.close()
+            raise
+        finally:
+            await self._release(resources)
+    
+    async def stream_csv(self, sql: str, session: AsyncSession) -> Optional[AsyncIterator[bytes]]:
+        """
+        검증된 SQL 결과를 CSV 바이트 청크로 스트리밍
+        
+        첫 청크만 미리 읽어 빈 결과를 판별하고, 이후 청크는 클라이언트로
+        전송되는 동안 커서에서 계속 읽습니다. BOM은 맨 앞에 한 번만 붙입니다.
+        
+        Returns:
+            CSV 바이트 청크 이터레이터 (결과가 없으면 None)
+        """
+        cursor = await self._open_cursor(sql, session)
+        if cursor is None:
+            return None
+        resources, columns, _, partitions, first_chunk = cursor
+        return self._iter_csv(resources, columns, partitions, first_chunk)
+    
+    async def _iter_csv(self, resources: AsyncExitStack, columns: List[str], partitions, first_chunk) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        try:
+            writer.writerow(columns)
+            yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+            
+            row_count = 0
+            chunk = first_chunk
+            while chunk:
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(chunk)
+                yield buffer.getvalue().encode("utf-8")
+                row_count += len(chunk)
+                chunk = await run_with_timeout(anext(partitions, None))
+            logger.info(f"CSV 스트리밍 완료: {row_count}행")
+        finally:
+            await self._release(resources)
+    
+    async def stream_columnar(self, sql: str, session: AsyncSession, fmt: str) -> Optional[AsyncIterator[bytes]]:
+        """
+        검증된 SQL 결과를 Parquet 또는 Arrow IPC 스트림으로 스트리밍
+        
+        DB 청크를 타입이 지정된 RecordBatch로 바로 변환합니다. 스키마는 샘플 값이
+        아닌 커서의 컬럼 타입 OID로 정하므로 NULL만 있는 청크나 뒤쪽 행에 관계없이
+        같습니다. 정수/실수/bool/date/timestamp는 해당 Arrow 타입으로 유지되고,
+        numeric은 정밀도 손실 없이 10진 문자열로 기록됩니다.
+        
+        Args:
+            sql: 검증된 SQL 쿼리
+            session: 데이터베이스 세션
+            fmt: "parquet" 또는 "arrow"
+        
+        Returns:
+            바이트 청크 이터레이터 (결과가 없으면 None)
+        """
+        cursor = await self._open_cursor(sql, session)
+        if cursor is None:
+            return None
+        return self._iter_columnar(*cursor, fmt=fmt)
+    
+    async def _iter_columnar(self, resources: AsyncExitStack, columns: List[str], type_codes: List[Optional[int]],
+                             partitions, first_chunk, fmt: str) -> AsyncIterator[bytes]:
+        try:
+            schema = self._arrow_schema(columns, type_codes)
+            sink = _ByteSink()
+            output = pa.PythonFile(sink, mode="w")
+            if fmt == "parquet":
+                writer = pq.ParquetWriter(output, schema, compression="zstd")
+            else:
+                writer = pa.ipc.new_stream(output, schema)
+            
+            # Parquet는 행 그룹이 너무 작으면 압축 효율이 떨어지므로 모아서 기록
+            pending: List[pa.RecordBatch] = []
+            pending_rows = 0
+            row_count = 0
+            chunk = first_chunk
+            while chunk:
+                batch = self._to_record_batch(chunk, schema)
+                row_count += batch.num_rows
+                if fmt == "parquet":
+                    pending.append(batch)
+                    pending_rows += batch.num_rows
+                    if pending_rows >= self.PARQUET_ROW_GROUP_SIZE:
+                        writer.write_table(pa.Table.from_batches(pending, schema=schema))
+                        pending, pending_rows = [], 0
+                else:
+                    writer.write_batch(batch)
+                
+                data = sink.drain()
+                if data:
+                    yield data
+                chunk = await run_with_timeout(anext(partitions, None))
+            
+            if pending:
+                writer.write_table(pa.Table.from_batches(pending, schema=schema))
+            writer.close()
+            yield sink.drain()
+            logger.info(f"{fmt} 스트리밍 완료: {row_count}행")
+        finally:
+            await self._release(resources)
+    
+    def _arrow_schema(self, columns: List[str], type_codes: List[Optional[int]]) -> pa.Schema:
+        """컬럼 타입 OID로 Arrow 스키마 결정"""
+        return pa.schema([
+            pa.field(column, _ARROW_TYPES.get(type_codes[col_num] if col_num < len(type_codes) else None, pa.string()))
+            for col_num, column in enumerate(columns)
+        ])
+    
+    def _to_record_batch(self, chunk: List[Tuple[Any, ...]], schema: pa.Schema) -> pa.RecordBatch:
+        """행 청크를 컬럼 단위로 전치해 RecordBatch 생성"""
+        arrays = []
+        for field, values in zip(schema, zip(*chunk)):
+            if pa.types.is_string(field.type):
+                values = [v if v is None or isinstance(v, str) else str(v) for v in values]
+            arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+    
+    async def _open_cursor(self, sql: str, session: AsyncSession):
+        """
+        서버 사이드 커서를 열고 첫 청크를 읽음
+        
+        실행 전 비용 점검을 거치며, 내보내기 결과는 자르지 않고 대기열/거부만 적용합니다.
+        
+        Returns:
+            (resources, columns, type_codes, partitions, first_chunk) 또는 결과가 없으면 None.
+            _release(resources)로 커서와 대기열 슬롯을 함께 반환합니다.
+        """
+        resources = AsyncExitStack()
+        try:
+            run_sql = await resources.enter_async_context(
+                self.cost_gate.admit(sql, session, allow_downgrade=False)
+            )
+            if settings.ANALYTIC_ENGINE_ENABLED:
+                result = await run_with_timeout(self.query_engine.stream(run_sql))
+            else:
+                result = await run_with_timeout(session.stream(text(run_sql)))
+            resources.push_async_callback(result.close)
+            columns = list(result.keys())
+            type_codes = result.type_codes() if settings.ANALYTIC_ENGINE_ENABLED else column_type_codes(result)
+            partitions = result.partitions(self.chunk_size)
+            
+            # 청크(FETCH)마다 실행 시간 한도 적용
+            first_chunk = await run_with_timeout(anext(partitions, None))
+        except BaseException:
+            await self._release(resources)
+            raise
+        if not first_chunk:
+            await self._release(resources)
+            return None
+        return resources, columns, type_codes, partitions, first_chunk
+    
+    async def _release(self, resources: AsyncExitStack) -> None:
+        """커서와 대기열 슬롯 반환 (클라이언트 연결 끊김으로 취소된 작업에서도 끝까지 수행)"""
+        await asyncio.shield(resources.aclose())
+    
+    def iter_file(self, fileobj: IO[bytes]) -> Iterator[bytes]:
+        """임시 파일을 청크 단위로 읽어 반환하고 마지막에 닫음"""
+        try:
+            while True:
+                data = fileobj.read(self.FILE_CHUNK_SIZE)
+                if not data:
+                    break
+                yield data
+        finally:
+            fileobj.close()
+    
+    def _create_formats(self, workbook: xlsxwriter.Workbook) -> dict:
+        """셀 서식 (워크북당 한 번만 생성)"""
+        data_props = {
+            'text_wrap': True,
+            'valign': 'top',
+            'border': 1
+        }
+        return {
+            "header": workbook.add_format({
+                'bold': True,
+                'text_wrap': True,
+                'valign': 'top',
+                'fg_color': '#D7E4BC',
+                'border': 1
+            }),
+            "data": workbook.add_format(data_props),
+            "date": workbook.add_format({**data_props, 'num_format': 'yyyy-mm-dd'}),
+            "datetime": workbook.add_format({**data_props, 'num_format': 'yyyy-mm-dd hh:mm:ss'})
+        }
+    
+    def _resolve_cell_formats(self, column_count: int, sample: List[Tuple[Any, ...]], formats: dict) -> list:
+        """샘플의 첫 non-null 값 타입으로 컬럼별 서식 결정"""
+        cell_formats = [formats["data"]] * column_count
+        for col_num in range(column_count):
+            value = next((row[col_num] for row in sample if row[col_num] is not None), None)
+            if isinstance(value, datetime):
+                cell_formats[col_num] = formats["datetime"]
+            elif isinstance(value, date):
+                cell_formats[col_num] = formats["date"]
+        return cell_formats
+    
+    def _estimate_widths(self, columns: List[str], sample: List[Tuple[Any, ...]]) -> List[int]:
+        """샘플 행으로 컬럼 너비 추정"""
+        widths = []
+        for col_num, column in enumerate(columns):
+            max_len = max(
+                [len(str(row[col_num])) for row in sample if row[col_num] is not None] + [len(str(column))]
+            )
+            widths.append(min(max_len + 2, self.MAX_COLUMN_WIDTH))
+        return widths
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.core.config import settings
+from app.core.database import ANALYTIC_SESSION_MAX_OVERFLOW, ANALYTIC_SESSION_POOL_SIZE, analytic_engine, engine
+from app.services.query_engine import AnalyticQueryEngine
+
+logger = logging.getLogger(__name__)
+
+class PoolMonitor:
+    """
+    연결 풀 사전 연결 및 백그라운드 상태 확인
+    
+    시작 시 쓰기 풀과 분석 풀을 설정된 크기만큼 미리 연결해 첫 요청이 연결
+    수립 비용을 내지 않게 합니다. 체크아웃마다 ping(pool_pre_ping)하는 대신
+    POOL_HEALTH_CHECK_INTERVAL마다 풀별로 연결 하나를 확인하고, 실패하면
+    (DB 재시작 등) 풀의 연결을 모두 버려 다음 체크아웃에서 새로 연결합니다.
+    """
+    
+    def __init__(self, query_engines: List[AnalyticQueryEngine]):
+        self.query_engines = query_engines
+        self.engines: Dict[str, AsyncEngine] = {"write": engine, "analytic": analytic_engine}
+        self.pool_limits = {
+            "write": settings.WRITE_POOL_SIZE + settings.WRITE_POOL_MAX_OVERFLOW,
+            "analytic": ANALYTIC_SESSION_POOL_SIZE + ANALYTIC_SESSION_MAX_OVERFLOW
+        }
+        self.stats = {"checks": 0, "failures": 0}
+        self._check_task: Optional[asyncio.Task] = None
+    
+    async def start(self) -> None:
+        """풀 사전 연결 후 상태 확인 시작"""
+        try:
+            await self.warm_up()
+        except Exception as e:
+            # DB가 아직 준비되지 않아도 앱은 시작하고 첫 요청에서 연결
+            logger.warning(f"연결 풀 사전 연결 실패: {e}")
+        
+        if settings.POOL_HEALTH_CHECK_INTERVAL > 0:
+            self._check_task = asyncio.create_task(self._check_loop())
+    
+    async def stop(self) -> None:
+        """상태 확인 종료"""
+        if self._check_task:
+            self._check_task.cancel()
+            self._check_task = None
+    
+    async def warm_up(self) -> None:
+        """
+        풀별 기본 크기만큼 연결을 미리 수립
+        
+        분석 엔진이 켜져 있으면 생성 SQL은 엔진들이 공유하는 asyncpg 풀에서 실행되므로
+        SQLAlchemy 분석 풀(스키마 조회, EXPLAIN 대체 경로)은 필요할 때 연결합니다.
+        """
+        warm_targets = [self._warm_engine(engine, settings.WRITE_POOL_SIZE)]
+        if settings.ANALYTIC_ENGINE_ENABLED:
+            # 엔진들은 연결 풀 하나를 공유하므로 한 번만 연결
+            warm_targets += [query_engine.warm_up() for query_engine in self.query_engines[:1]]
+        else:
+            warm_targets.append(self._warm_engine(analytic_engine, ANALYTIC_SESSION_POOL_SIZE))
+        await asyncio.gather(*warm_targets)
+        logger.info("연결 풀 사전 연결 완료")
+    
+    async def _warm_engine(self, db_engine: AsyncEngine, count: int) -> None:
+        # 동시에 체크아웃해야 서로 다른 연결이 만들어짐
+        connections = await asyncio.gather(*(db_engine.connect() for _ in range(count)))
+        for connection in connections:
+            await connection.close()
+    
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.POOL_HEALTH_CHECK_INTERVAL)
+            try:
+                await self.check_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"연결 풀 상태 확인 실패: {e}")
+    
+    async def check_once(self) -> Dict[str, bool]:
+        """
+        풀별로 연결 하나를 확인
+        
+        QueuePool은 유휴 연결을 먼저 반환된 순서로 꺼내므로 주기마다 다른 연결이 확인됩니다.
+        
+        Returns:
+            풀 이름별 정상 여부
+        """
+        results = {}
+        for name, db_engine in self.engines.items():
+            # 유휴 연결이 없는 풀(모두 사용 중이거나 아직 연결 전)은 확인하지 않음
+            if db_engine.pool.checkedin() == 0:
+                continue
+            results[name] = await self._check_engine(name, db_engine)
+        if self.query_engines:
+            results["asyncpg"] = await self.query_engines[0].check_health()
+        
+        self.stats["checks"] += 1
+        self.stats["failures"] += sum(1 for healthy in results.values() if not healthy)
+        return results
+    
+    async def _check_engine(self, name: str, db_engine: AsyncEngine) -> bool:
+        try:
+            async with db_engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            logger.warning(f"{name} 연결 확인 실패, 풀 재생성: {e}")
+            await db_engine.dispose()
+            return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """풀별 사용률 통계"""
+        pools = {}
+        for name, db_engine in self.engines.items():
+            pool = db_engine.pool
+            pools[name] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "max": self.pool_limits[name],
+                "utilization": pool.checkedout() / self.pool_limits[name]
+            }
+        pools["asyncpg"] = [query_engine.get_stats() for query_engine in self.query_engines]
+        return {**self.stats, "pools": pools}
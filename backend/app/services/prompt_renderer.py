@@ -0,0 +1,159 @@
+import logging
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 한글/한자는 1자당 약 1토큰, 그 외 문자는 약 4자당 1토큰 (BPE 토크나이저 근사)
+_WIDE_CHAR_RE = re.compile(r"[\u1100-\u11ff\u3130-\u318f\uac00-\ud7af\u4e00-\u9fff]")
+
+# format_type 결과를 짧은 동의어로 (PostgreSQL에서 같은 타입)
+_TYPE_ALIASES = (
+    ("character varying", "varchar"),
+    ("timestamp without time zone", "timestamp"),
+    ("timestamp with time zone", "timestamptz"),
+    ("double precision", "float8")
+)
+
+_NO_DESCRIPTION = ("컬럼 설명 없음", "테이블 설명 없음")
+
+# 스키마 버전(질문별 선택 조합 포함) → 렌더링된 시스템 프롬프트
+_PREFIX_MEMO_SIZE = 64
+
+# 예산을 넘으면 위에서부터 차례로 덜 자세한 형태로 렌더링
+_DETAIL_LEVELS = (
+    {"samples": True, "examples": True, "descriptions": True},
+    {"samples": False, "examples": True, "descriptions": True},
+    {"samples": False, "examples": False, "descriptions": True},
+    {"samples": False, "examples": False, "descriptions": False}
+)
+
+SYSTEM_RULES = """당신은 PostgreSQL 데이터베이스 전문가입니다. 자연어 질문을 아래 스키마에 맞는 정확한 SQL 쿼리로 변환합니다.
+
+규칙:
+1. SELECT 문만 생성 (INSERT, UPDATE, DELETE 금지)
+2. LIMIT 절을 항상 포함 (기본값: 1000)
+3. 명확하고 읽기 쉬운 SQL 작성
+4. 적절한 JOIN 사용
+5. 집계 함수 사용 시 GROUP BY 포함
+6. 한국어로 설명 제공
+7. PostgreSQL INTERVAL 구문은 반드시 'INTERVAL ''3'' month' 형태 사용 (소문자, 작은따옴표 2개)
+8. 날짜 계산 시 CURRENT_DATE 사용
+9. INTERVAL 구문 예시: INTERVAL '3' month, INTERVAL '1' year, INTERVAL '7' day"""
+
+def estimate_tokens(text: str) -> int:
+    """프롬프트 토큰 수 추정"""
+    wide = len(_WIDE_CHAR_RE.findall(text))
+    return wide + (len(text) - wide + 3) // 4
+
+class SchemaPromptRenderer:
+    """
+    스키마 프롬프트 렌더러
+    
+    스키마를 컬럼당 한 줄 설명이 붙은 DDL 형태로 렌더링하고 규칙과 함께 시스템
+    프롬프트로 만듭니다. 시스템 프롬프트는 질문과 무관하게 스키마 버전별로 바이트
+    단위까지 같으므로 LLM 제공자의 프롬프트 캐시가 적용되며, 질문/응답 형식 같은
+    가변 부분은 사용자 메시지로 보냅니다. 스키마 부분이 SCHEMA_PROMPT_TOKEN_BUDGET을
+    넘으면 샘플 값, 예제 쿼리, 컬럼 설명 순으로 생략합니다.
+    """
+    
+    def __init__(self):
+        self.token_budget = settings.SCHEMA_PROMPT_TOKEN_BUDGET
+        self._prefix_memo: "OrderedDict[str, str]" = OrderedDict()
+    
+    def render_prefix(self, schema_info: Dict[str, Any]) -> str:
+        """스키마 버전별로 메모이즈된 시스템 프롬프트 (버전을 모르면 매번 렌더링)"""
+        version = schema_info.get("version")
+        if version and version in self._prefix_memo:
+            self._prefix_memo.move_to_end(version)
+            return self._prefix_memo[version]
+        
+        prefix = f"{SYSTEM_RULES}\n\n스키마:\n{self.render_schema(schema_info)}"
+        if version:
+            self._prefix_memo[version] = prefix
+            while len(self._prefix_memo) > _PREFIX_MEMO_SIZE:
+                self._prefix_memo.popitem(last=False)
+        return prefix
+    
+    def render_schema(self, schema_info: Dict[str, Any]) -> str:
+        """토큰 예산 안에서 가장 자세한 스키마 렌더링"""
+        for options in _DETAIL_LEVELS:
+            rendered = self._render(schema_info, **options)
+            tokens = estimate_tokens(rendered)
+            if tokens <= self.token_budget:
+                return rendered
+        logger.warning(f"스키마 프롬프트가 토큰 예산을 초과합니다: {tokens} > {self.token_budget}")
+        return rendered
+    
+    def _render(self, schema_info: Dict[str, Any], samples: bool, examples: bool, descriptions: bool) -> str:
+        blocks = [
+            self._render_table(table, samples, descriptions)
+            for _, table in sorted(schema_info["tables"].items())
+        ]
+        if examples and schema_info.get("examples"):
+            blocks.append(self._render_examples(schema_info["examples"]))
+        return "\n\n".join(blocks)
+    
+    def _render_table(self, table: Dict[str, Any], samples: bool, descriptions: bool) -> str:
+        sample_values = self._sample_values(table) if samples else {}
+        lines = []
+        description = table.get("description")
+        if descriptions and description and description not in _NO_DESCRIPTION:
+            lines.append(f"-- {description}")
+        lines.append(f"CREATE TABLE {table['name']} (")
+        
+        columns = table["columns"]
+        for index, column in enumerate(columns):
+            line = f"  {column['name']} {self._short_type(column['type'])}"
+            if column.get("primary_key"):
+                line += " PRIMARY KEY"
+            if column.get("foreign_key"):
+                target_table, target_column = column["foreign_key"].rsplit(".", 1)
+                line += f" REFERENCES {target_table}({target_column})"
+            if index < len(columns) - 1:
+                line += ","
+            
+            notes = []
+            if descriptions:
+                note = column.get("description")
+                if not note or note in _NO_DESCRIPTION:
+                    note = column.get("comment")
+                if note:
+                    notes.append(note)
+            if column["name"] in sample_values:
+                notes.append(f"예: {sample_values[column['name']]}")
+            if notes:
+                line += f" -- {' / '.join(notes)}"
+            lines.append(line)
+        
+        lines.append(");")
+        return "\n".join(lines)
+    
+    def _short_type(self, data_type: str) -> str:
+        for long_name, short_name in _TYPE_ALIASES:
+            data_type = data_type.replace(long_name, short_name)
+        return data_type
+    
+    def _sample_values(self, table: Dict[str, Any]) -> Dict[str, str]:
+        """문자열 컬럼의 샘플 값 (날짜/숫자는 타입으로 충분하므로 제외)"""
+        text_columns = {
+            column["name"] for column in table["columns"]
+            if column["type"].startswith(("character", "text"))
+        }
+        values: Dict[str, List[str]] = {}
+        for row in table.get("sample_data") or []:
+            for name, value in row.items():
+                if name in text_columns and isinstance(value, str):
+                    column_values = values.setdefault(name, [])
+                    if value not in column_values:
+                        column_values.append(value)
+        return {name: ", ".join(column_values) for name, column_values in values.items()}
+    
+    def _render_examples(self, examples: List[Dict[str, str]]) -> str:
+        lines = ["-- 예제"]
+        for example in examples:
+            lines.append(f"-- Q: {example['question']}")
+            lines.append(" ".join(example["sql"].split()) + ";")
+        return "\n".join(lines)
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import re
+import unicodedata
+from typing import Optional, Any, Dict, List, Tuple
+from app.core.config import settings
+from app.services.cache_service import CacheService
+from app.services.sql_guardrails import SQLGuardrails
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_question(question: str) -> str:
+    """
+    질문 정규화 (유니코드 NFKC, 대소문자, 공백)
+    
+    세션 ID나 시각화 여부처럼 SQL에 영향을 주지 않는 값은 포함하지 않습니다.
+    """
+    normalized = unicodedata.normalize("NFKC", question).casefold()
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+class QueryCacheService:
+    """
+    2단계 쿼리 캐시
+    
+    - 1단계: 정규화된 질문 → 검증된 SQL (LLM 호출 생략)
+    - 2단계: 정규화된 SQL AST 지문 → 결과 행 (DB 실행 생략)
+    """
+    
+    SQL_KEY_PREFIX = "q2s:"
+    RESULT_KEY_PREFIX = "s2r:"
+    HANDLE_KEY_PREFIX = "handle:"
+    HANDLE_ID_LENGTH = 32
+    
+    def __init__(self, cache_service: Optional[CacheService] = None):
+        self.cache = cache_service or CacheService()
+        self.guardrails = SQLGuardrails()
+        self.sql_ttl = settings.SQL_CACHE_TTL
+        self.result_ttl = settings.RESULT_CACHE_TTL
+        self.stats = {
+            "sql": {"hits": 0, "misses": 0},
+            "result": {"hits": 0, "misses": 0}
+        }
+    
+    def _sql_key(self, question: str) -> str:
+        digest = hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+        return f"{self.SQL_KEY_PREFIX}{digest}"
+    
+    def _result_key(self, sql: str) -> str:
+        return f"{self.RESULT_KEY_PREFIX}{self.guardrails.fingerprint_sql(sql)}"
+    
+    async def get_sql(self, question: str) -> Optional[Tuple[str, str]]:
+        """
+        질문에 대해 캐시된 SQL 조회
+        
+        Returns:
+            (sql, explanation) 또는 None
+        """
+        cached = await self.cache.get(self._sql_key(question))
+        if cached:
+            self.stats["sql"]["hits"] += 1
+            return cached["sql"], cached["explanation"]
+        self.stats["sql"]["misses"] += 1
+        return None
+    
+    async def set_sql(self, question: str, sql: str, explanation: str) -> bool:
+        """검증된 SQL 저장"""
+        return await self.cache.set(
+            self._sql_key(question),
+            {"sql": sql, "explanation": explanation},
+            ttl=self.sql_ttl
+        )
+    
+    async def get_result(self, sql: str) -> Optional[Tuple[List[str], List[List[Any]]]]:
+        """
+        SQL에 대해 캐시된 결과 조회
+        
+        Returns:
+            (columns, values) 또는 None (values는 컬럼별 배열)
+        """
+        cached = await self.cache.get(self._result_key(sql))
+        if cached and "values" in cached:
+            self.stats["result"]["hits"] += 1
+            return cached["columns"], cached["values"]
+        self.stats["result"]["misses"] += 1
+        return None
+    
+    async def set_result(self, sql: str, columns: List[str], values: List[List[Any]]) -> bool:
+        """쿼리 결과 저장 (컬럼별 배열로 보관, 조회한 테이블을 무효화 태그로 기록)"""
+        return await self.cache.set(
+            self._result_key(sql),
+            {"columns": columns, "values": values},
+            ttl=self.result_ttl,
+            tags=self.guardrails.referenced_tables(sql)
+        )
+    
+    async def save_handle(self, sql: str) -> str:
+        """
+        결과 핸들 저장 (행이 아니라 검증된 SQL만 보관)
+        
+        핸들 ID는 SQL 지문에서 만들어지므로 같은 SQL은 같은 핸들을 공유합니다.
+        
+        Returns:
+            결과 핸들 ID
+        """
+        result_id = self.guardrails.fingerprint_sql(sql)[:self.HANDLE_ID_LENGTH]
+        await self.cache.set(
+            f"{self.HANDLE_KEY_PREFIX}{result_id}",
+            {"sql": sql},
+            ttl=self.sql_ttl
+        )
+        return result_id
+    
+    async def get_handle(self, result_id: str) -> Optional[str]:
+        """결과 핸들의 SQL 조회 (만료되었거나 없으면 None)"""
+        cached = await self.cache.get(f"{self.HANDLE_KEY_PREFIX}{result_id}")
+        return cached["sql"] if cached else None
+    
+    async def invalidate_tables(self, tables: List[str]) -> int:
+        """
+        테이블을 읽은 결과 캐시만 무효화 (데이터 적재 후 호출)
+        
+        질문→SQL 캐시는 데이터와 무관하므로 유지합니다.
+        """
+        return await self.cache.invalidate_tags([table.lower() for table in tables])
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """단계별 히트/미스 통계 반환"""
+        stats = {}
+        for layer, counters in self.stats.items():
+            total = counters["hits"] + counters["misses"]
+            stats[layer] = {
+                **counters,
+                "hit_ratio": counters["hits"] / total if total else 0.0
+            }
+        return stats
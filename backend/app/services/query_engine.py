@@ -0,0 +1,327 @@
+import asyncio
+import asyncpg
+import logging
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Awaitable, Dict, List, Optional, Tuple, TypeVar
+from app.core.config import settings
+from app.core.database import ANALYTIC_SERVER_SETTINGS, get_analytic_url, get_asyncpg_dsn
+from app.services.result_encoding import columns_from_rows, convert_columns, resolve_converters
+from app.services.sql_guardrails import SQLGuardrails
+
+logger = logging.getLogger(__name__)
+
+# 바인드 값 타입 맞춤용 파라미터 타입 분류
+_INT_TYPES = {"int2", "int4", "int8"}
+_FLOAT_TYPES = {"float4", "float8"}
+_TEXT_TYPES = {"text", "varchar", "bpchar", "name"}
+_TIMESTAMP_TYPES = {"timestamp", "timestamptz"}
+
+# statement_timeout 등으로 서버에서 취소된 쿼리의 SQLSTATE
+_QUERY_CANCELED_SQLSTATE = "57014"
+
+# 서버 statement_timeout이 먼저 동작하도록 asyncio 타임아웃에 두는 여유 (초)
+_TIMEOUT_GRACE = 2.0
+
+T = TypeVar("T")
+
+# 분석 쿼리 연결 풀 (프로세스의 모든 AnalyticQueryEngine이 공유, 첫 사용 시 생성)
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+class QueryTimeoutError(Exception):
+    """쿼리가 실행 시간 한도(MAX_QUERY_TIME)를 넘어 취소됨"""
+
+def _is_query_canceled(error: BaseException) -> bool:
+    """asyncpg 또는 SQLAlchemy로 감싼 쿼리 취소 오류인지 확인"""
+    for candidate in (error, getattr(error, "orig", None)):
+        if getattr(candidate, "sqlstate", None) == _QUERY_CANCELED_SQLSTATE:
+            return True
+    return False
+
+async def run_with_timeout(awaitable: Awaitable[T]) -> T:
+    """
+    쿼리 실행을 MAX_QUERY_TIME 안에서 기다림
+    
+    서버 statement_timeout에 의한 취소와 asyncio 타임아웃(연결 대기, 네트워크 지연)을
+    모두 QueryTimeoutError로 바꿉니다. asyncio 타임아웃으로 취소된 asyncpg 쿼리는
+    asyncpg가 서버에 취소 요청을 보내므로 연결이 쿼리 종료를 기다리지 않습니다.
+    """
+    try:
+        return await asyncio.wait_for(awaitable, settings.MAX_QUERY_TIME + _TIMEOUT_GRACE)
+    except asyncio.TimeoutError:
+        raise QueryTimeoutError(f"쿼리 실행 시간이 {settings.MAX_QUERY_TIME}초를 초과했습니다.")
+    except Exception as e:
+        if _is_query_canceled(e):
+            raise QueryTimeoutError(f"쿼리 실행 시간이 {settings.MAX_QUERY_TIME}초를 초과했습니다.") from e
+        raise
+
+def _coerce_param(type_name: str, value: Any) -> Any:
+    """리터럴 값을 준비된 문장이 추론한 파라미터 타입에 맞춤 (맞출 수 없으면 ValueError)"""
+    if type_name in _INT_TYPES:
+        if isinstance(value, Decimal) and value != value.to_integral_value():
+            raise ValueError(f"정수 파라미터에 소수 값: {value}")
+        return int(value)
+    if type_name in _FLOAT_TYPES:
+        return float(value)
+    if type_name in _TEXT_TYPES:
+        return str(value)
+    if type_name in _TIMESTAMP_TYPES and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+class _AnalyticConnection(asyncpg.Connection):
+    """SQL 지문별 준비된 문장 LRU를 가진 연결"""
+    
+    __slots__ = ("prepared",)
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: "OrderedDict[str, asyncpg.prepared_stmt.PreparedStatement]" = OrderedDict()
+
+async def _init_connection(connection: asyncpg.Connection) -> None:
+    """
+    numeric/date 코덱 등록 (문자열 리터럴을 그대로 바인드할 수 있도록 텍스트 형식)
+    
+    풀을 공유하는 모든 엔진이 같은 값을 받도록 Decimal/date 타입을 유지하며,
+    JSON 응답용 변환은 fetch_columns에서 컬럼 타입 OID 기준으로 합니다.
+    """
+    await connection.set_type_codec(
+        "numeric", schema="pg_catalog", encoder=str, decoder=Decimal, format="text"
+    )
+    await connection.set_type_codec(
+        "date", schema="pg_catalog", encoder=str, decoder=date.fromisoformat, format="text"
+    )
+
+async def get_analytic_pool() -> asyncpg.Pool:
+    """분석 쿼리 연결 풀 반환 (첫 사용 시 생성)"""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                # min_size만큼 미리 연결하고, 초과분은 유휴 시간이 지나면 닫힘
+                _pool = await asyncpg.create_pool(
+                    get_asyncpg_dsn(get_analytic_url()),
+                    min_size=settings.ANALYTIC_POOL_SIZE,
+                    max_size=settings.ANALYTIC_POOL_SIZE + settings.ANALYTIC_POOL_MAX_OVERFLOW,
+                    # asyncpg 내장 문장 캐시 대신 지문 기준 LRU 사용
+                    statement_cache_size=0,
+                    connection_class=_AnalyticConnection,
+                    # 분석 전용 연결이므로 쿼리마다 SET LOCAL 왕복 없이 연결 단위로 적용
+                    server_settings=ANALYTIC_SERVER_SETTINGS,
+                    init=_init_connection
+                )
+                logger.info("분석 쿼리 연결 풀 생성")
+    return _pool
+
+async def close_analytic_pool() -> None:
+    """분석 쿼리 연결 풀 종료"""
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+        logger.info("분석 쿼리 연결 풀 종료")
+
+class QueryCursor:
+    """
+    서버 사이드 커서 결과
+    
+    SQLAlchemy AsyncResult와 같은 방식(keys/partitions/close)으로 사용합니다.
+    close()에서 읽기 전용 트랜잭션을 끝내고 연결을 풀에 반환합니다.
+    """
+    
+    def __init__(self, pool: asyncpg.Pool, connection, transaction, statement, cursor):
+        self._pool = pool
+        self._connection = connection
+        self._transaction = transaction
+        self._statement = statement
+        self._cursor = cursor
+    
+    def keys(self) -> List[str]:
+        return [attribute.name for attribute in self._statement.get_attributes()]
+    
+    def type_codes(self) -> List[int]:
+        """컬럼별 타입 OID"""
+        return [attribute.type.oid for attribute in self._statement.get_attributes()]
+    
+    async def partitions(self, size: int):
+        while self._connection is not None:
+            rows = await self._cursor.fetch(size)
+            if rows:
+                yield rows
+            if len(rows) < size:
+                break
+    
+    async def close(self) -> None:
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        # 클라이언트 연결 끊김으로 취소된 작업에서도 연결이 풀로 돌아가도록 보호
+        await asyncio.shield(self._release(connection))
+    
+    async def _release(self, connection) -> None:
+        try:
+            await self._transaction.rollback()
+        finally:
+            await self._pool.release(connection)
+
+class AnalyticQueryEngine:
+    """
+    분석 쿼리 실행 엔진 (asyncpg 직접 연결)
+    
+    분석 DB(복제본 지정 가능)에 읽기 전용으로 연결하며, 연결마다
+    statement_timeout(MAX_QUERY_TIME)이 걸려 있어 느린 쿼리가 연결을 계속
+    점유하지 않습니다.
+    
+    SQLAlchemy 세션/Row 매핑을 거치지 않고 asyncpg 바이너리 프로토콜로 실행합니다.
+    검증된 SQL의 리터럴을 바인드 파라미터로 올린 뒤 지문을 키로 연결별 준비된
+    문장 LRU에 보관하므로, 값만 다른 같은 모양의 질문은 실행 계획을 재사용합니다.
+    
+    연결 풀은 채팅/내보내기 엔진이 공유하므로 워커당 분석 연결은 최대
+    ANALYTIC_POOL_SIZE + ANALYTIC_POOL_MAX_OVERFLOW개입니다. fetch_columns는 JSON으로
+    바로 직렬화할 값을, stream은 Decimal/date 타입을 유지한 행을 반환합니다.
+    """
+    
+    def __init__(self):
+        self.guardrails = SQLGuardrails()
+        self.cache_size = settings.PREPARED_STATEMENT_CACHE_SIZE
+        self.stats = {"prepared_hits": 0, "prepared_misses": 0, "unparameterized": 0}
+    
+    async def fetch_columns(self, sql: str) -> Tuple[List[str], List[List[Any]]]:
+        """
+        검증된 SQL 실행 후 JSON으로 바로 직렬화할 수 있는 컬럼별 배열 반환
+        
+        Returns:
+            (columns, values)
+        """
+        pool = await get_analytic_pool()
+        async with pool.acquire() as connection:
+            statement, params = await self._bind(connection, sql)
+            async with connection.transaction(readonly=True):
+                records = await statement.fetch(*params)
+        
+        attributes = statement.get_attributes()
+        columns = [attribute.name for attribute in attributes]
+        values = columns_from_rows(columns, records)
+        type_codes = [attribute.type.oid for attribute in attributes]
+        return columns, convert_columns(values, resolve_converters(values, type_codes))
+    
+    async def explain(self, sql: str) -> Dict[str, Any]:
+        """
+        실행하지 않고 계획만 조회 (EXPLAIN (FORMAT JSON), 실행과 같은 준비된 문장 사용)
+        
+        Returns:
+            최상위 계획 노드 ("Total Cost", "Plan Rows" 등)
+        """
+        pool = await get_analytic_pool()
+        async with pool.acquire() as connection:
+            statement, params = await self._bind(connection, sql)
+            plan = await statement.explain(*params)
+        return plan[0]["Plan"]
+    
+    async def stream(self, sql: str) -> QueryCursor:
+        """
+        검증된 SQL을 서버 사이드 커서로 열기
+        
+        반환된 커서는 다 읽은 뒤(또는 중단 시) 반드시 close()해야 합니다.
+        """
+        pool = await get_analytic_pool()
+        connection = await pool.acquire()
+        try:
+            statement, params = await self._bind(connection, sql)
+            transaction = connection.transaction(readonly=True)
+            await transaction.start()
+            try:
+                cursor = await statement.cursor(*params)
+            except Exception:
+                await transaction.rollback()
+                raise
+        except Exception:
+            await pool.release(connection)
+            raise
+        return QueryCursor(pool, connection, transaction, statement, cursor)
+    
+    async def _bind(self, connection, sql: str) -> Tuple[Any, List[Any]]:
+        """
+        파라미터화된 준비된 문장과 바인드 값 반환
+        
+        파라미터 타입을 추론할 수 없거나 리터럴 값을 맞출 수 없으면
+        원래 SQL을 그대로 준비합니다.
+        """
+        try:
+            sql_text, params = self.guardrails.parameterize_sql(sql)
+            if params:
+                statement = await self._prepare(connection, sql_text)
+                params = [
+                    _coerce_param(param_type.name, value)
+                    for param_type, value in zip(statement.get_parameters(), params)
+                ]
+                return statement, params
+        except (asyncpg.PostgresError, ValueError) as e:
+            logger.debug(f"파라미터화 실패, 원문 실행: {e}")
+            self.stats["unparameterized"] += 1
+        
+        return await self._prepare(connection, sql), []
+    
+    async def _prepare(self, connection, sql: str):
+        """연결별 LRU에서 준비된 문장 조회, 없으면 준비 후 보관"""
+        key = self.guardrails.fingerprint_sql(sql)
+        prepared = connection.prepared
+        statement = prepared.get(key)
+        if statement is not None:
+            prepared.move_to_end(key)
+            self.stats["prepared_hits"] += 1
+            return statement
+        
+        self.stats["prepared_misses"] += 1
+        statement = await connection.prepare(sql)
+        prepared[key] = statement
+        # 제거된 문장은 참조가 사라지면 asyncpg가 서버에서 해제
+        while len(prepared) > self.cache_size:
+            prepared.popitem(last=False)
+        return statement
+    
+    async def warm_up(self) -> None:
+        """연결 풀을 미리 생성 (ANALYTIC_POOL_SIZE만큼 연결)"""
+        await get_analytic_pool()
+    
+    async def check_health(self) -> bool:
+        """
+        유휴 연결 하나로 상태 확인
+        
+        실패하면(DB 재시작 등) 기존 연결을 모두 만료시켜 다음 사용 시 새로 연결합니다.
+        """
+        pool = _pool
+        if pool is None:
+            return True
+        try:
+            await pool.fetchval("SELECT 1", timeout=5)
+            return True
+        except Exception as e:
+            logger.warning(f"분석 쿼리 연결 확인 실패, 연결 재생성: {e}")
+            await pool.expire_connections()
+            return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """준비된 문장 재사용 및 연결 풀 사용률 통계"""
+        lookups = self.stats["prepared_hits"] + self.stats["prepared_misses"]
+        pool_stats = {}
+        pool = _pool
+        if pool is not None:
+            in_use = pool.get_size() - pool.get_idle_size()
+            pool_stats = {
+                "pool_size": pool.get_size(),
+                "pool_idle": pool.get_idle_size(),
+                "pool_max": pool.get_max_size(),
+                "pool_utilization": in_use / pool.get_max_size()
+            }
+        return {
+            **self.stats,
+            "prepared_hit_ratio": self.stats["prepared_hits"] / lookups if lookups else 0.0,
+            **pool_stats
+        }
+    
+    async def close(self) -> None:
+        """공유 연결 풀 종료 (다른 엔진이 이미 닫았으면 아무것도 하지 않음)"""
+        await close_analytic_pool()
@@ -0,0 +1,182 @@
+from typing import Any, Callable, Dict, List, Optional
+from datetime import date, datetime, time
+from decimal import Decimal
+import operator
+import numpy as np
+from app.core.config import settings
+
+# 사전 인코딩 조건: 고유 값 수가 행 수의 절반 이하이고 최소 행 수 이상
+DICTIONARY_MIN_ROWS = 8
+DICTIONARY_MAX_RATIO = 0.5
+
+# PostgreSQL 타입 OID별 변환 분류
+_PASSTHROUGH_OIDS = {16, 20, 21, 23, 25, 1042, 1043}  # bool, int2/4/8, text, char, varchar
+_FLOAT_OIDS = {700, 701}  # float4, float8
+_NUMERIC_OIDS = {1700}  # numeric
+_TEMPORAL_OIDS = {1082, 1083, 1114, 1184, 1266}  # date, time, timestamp(tz), timetz
+
+ColumnConverter = Optional[Callable[[List[Any]], List[Any]]]
+
+_isoformat = operator.methodcaller("isoformat")
+
+def _map_non_null(func: Callable[[Any], Any], column: List[Any]) -> List[Any]:
+    """NULL을 제외한 값에 변환 함수 적용 (NULL이 없으면 map으로 한 번에 처리)"""
+    if None in column:
+        return [None if value is None else func(value) for value in column]
+    return list(map(func, column))
+
+def _finite_floats(column: List[Any]) -> List[Any]:
+    """NaN/Infinity를 NULL로 치환 (JSON에 표현 불가, 유한성 검사는 NumPy로 일괄 처리)"""
+    finite = np.isfinite(np.array(column, dtype=np.float64))
+    if finite.all():
+        return column
+    return [value if ok else None for value, ok in zip(column, finite.tolist())]
+
+def _numeric_to_float(column: List[Any]) -> List[Any]:
+    return _finite_floats(_map_non_null(float, column))
+
+def _numeric_to_string(column: List[Any]) -> List[Any]:
+    return _map_non_null(str, column)
+
+def _temporal_to_iso(column: List[Any]) -> List[Any]:
+    return _map_non_null(_isoformat, column)
+
+def _serialize_value(value: Any) -> Any:
+    """타입을 알 수 없는 컬럼의 값별 변환"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return _numeric_to_float([value])[0] if settings.NUMERIC_RESULT_FORMAT == "float" else str(value)
+    return str(value)
+
+def _generic(column: List[Any]) -> List[Any]:
+    return [_serialize_value(value) for value in column]
+
+def _numeric_converter() -> ColumnConverter:
+    return _numeric_to_float if settings.NUMERIC_RESULT_FORMAT == "float" else _numeric_to_string
+
+def _converter_for_oid(oid: Optional[int]) -> ColumnConverter:
+    """타입 OID로 변환기 결정 (알 수 없는 OID면 None)"""
+    if oid in _PASSTHROUGH_OIDS:
+        return None
+    if oid in _FLOAT_OIDS:
+        return _finite_floats
+    if oid in _NUMERIC_OIDS:
+        return _numeric_converter()
+    if oid in _TEMPORAL_OIDS:
+        return _temporal_to_iso
+    return _generic
+
+def _converter_for_sample(column: List[Any]) -> ColumnConverter:
+    """첫 non-null 값의 타입으로 변환기 결정 (모두 NULL이면 값별 변환)"""
+    value = next((value for value in column if value is not None), None)
+    if value is None:
+        return _generic
+    if isinstance(value, (bool, int, str)):
+        return None
+    if isinstance(value, float):
+        return _finite_floats
+    if isinstance(value, Decimal):
+        return _numeric_converter()
+    if isinstance(value, (date, datetime, time)):
+        return _temporal_to_iso
+    return _generic
+
+def column_type_codes(result) -> List[Optional[int]]:
+    """커서 메타데이터에서 컬럼별 타입 OID 조회 (제공되지 않으면 빈 목록)"""
+    # AsyncResult(session.stream)는 내부 결과의 커서를 사용
+    result = getattr(result, "_real_result", result)
+    try:
+        return [column[1] for column in result.cursor.description]
+    except (AttributeError, TypeError):
+        return []
+
+def resolve_converters(values: List[List[Any]], type_codes: Optional[List[Optional[int]]] = None) -> List[ColumnConverter]:
+    """
+    결과마다 한 번 컬럼별 JSON 변환기 결정
+    
+    커서의 타입 OID를 우선 사용하고, OID가 없거나 모르는 타입이면 컬럼의
+    첫 non-null 값으로 판단합니다. int/text/bool 컬럼은 변환하지 않습니다.
+    numeric은 NUMERIC_RESULT_FORMAT에 따라 float 또는 10진 문자열이 됩니다.
+    """
+    converters = []
+    for index, column in enumerate(values):
+        oid = type_codes[index] if type_codes and index < len(type_codes) else None
+        converter = _converter_for_oid(oid) if oid is not None else _generic
+        if converter is _generic:
+            converter = _converter_for_sample(column)
+        converters.append(converter)
+    return converters
+
+def convert_columns(values: List[List[Any]], converters: List[ColumnConverter]) -> List[List[Any]]:
+    """컬럼 단위로 변환기 적용"""
+    return [
+        converter(column) if converter else column
+        for column, converter in zip(values, converters)
+    ]
+
+def rows_from_columns(columns: List[str], values: List[List[Any]]) -> List[Dict[str, Any]]:
+    """컬럼별 배열을 행별 dict 목록으로 변환"""
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+def columns_from_rows(columns: List[str], rows: List[Any]) -> List[List[Any]]:
+    """행 튜플 목록을 컬럼별 배열로 전치"""
+    if not rows:
+        return [[] for _ in columns]
+    return [list(column) for column in zip(*rows)]
+
+def _dictionary_encode(column: List[Any]) -> Optional[Dict[str, Any]]:
+    """
+    반복 문자열 컬럼을 (사전, 코드) 쌍으로 인코딩
+    
+    NULL은 코드도 null로 둡니다. 인코딩 이득이 없으면 None을 반환합니다.
+    """
+    if len(column) < DICTIONARY_MIN_ROWS:
+        return None
+    
+    codes_by_value: Dict[str, int] = {}
+    codes: List[Optional[int]] = []
+    max_size = int(len(column) * DICTIONARY_MAX_RATIO)
+    for value in column:
+        if value is None:
+            codes.append(None)
+            continue
+        if not isinstance(value, str):
+            return None
+        code = codes_by_value.get(value)
+        if code is None:
+            if len(codes_by_value) >= max_size:
+                return None
+            code = codes_by_value[value] = len(codes_by_value)
+        codes.append(code)
+    
+    if not codes_by_value:
+        return None
+    return {"dictionary": list(codes_by_value), "codes": codes}
+
+def encode_columnar(columns: List[str], values: List[List[Any]]) -> Dict[str, Any]:
+    """
+    컬럼형 응답 본문 생성
+    
+    컬럼명은 한 번만, 값은 컬럼별 배열로 담고 category/region처럼 반복되는
+    문자열 컬럼은 사전 인코딩합니다. 원래 값은 dictionaries[컬럼][코드]입니다.
+    
+    Returns:
+        {"columns": [...], "values": [[...], ...], "dictionaries": {컬럼: [...]}}
+    """
+    encoded_values = []
+    dictionaries = {}
+    for column, column_values in zip(columns, values):
+        encoded = _dictionary_encode(column_values)
+        if encoded is None:
+            encoded_values.append(column_values)
+        else:
+            dictionaries[column] = encoded["dictionary"]
+            encoded_values.append(encoded["codes"])
+    return {
+        "columns": columns,
+        "values": encoded_values,
+        "dictionaries": dictionaries
+    }
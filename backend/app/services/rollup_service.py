@@ -0,0 +1,434 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+from sqlglot import exp, parse_one
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+class _Dimension(NamedTuple):
+    key: str  # fact_sales 조인 키
+    alias: str
+    columns: Tuple[str, ...]
+
+class RollupSpec(NamedTuple):
+    name: str
+    columns: Tuple[str, ...]  # 차원 컬럼 (롤업의 그룹 키)
+    
+    @property
+    def tables(self) -> Set[str]:
+        """롤업이 읽는 원본 테이블"""
+        return {_FACT_TABLE} | {_DIMENSION_OF[column] for column in self.columns}
+
+_FACT_TABLE = "fact_sales"
+_FACT_COLUMNS = {
+    "sales_id", "date_key", "product_id", "customer_id",
+    "quantity", "unit_price", "revenue", "currency", "created_at"
+}
+
+_DIMENSIONS = {
+    "dim_date": _Dimension("date_key", "d", ("date_key", "date", "year", "quarter", "month", "week", "dow")),
+    "dim_product": _Dimension("product_id", "p", ("product_id", "product_name", "category", "subcategory", "sku")),
+    "dim_customer": _Dimension("customer_id", "c", ("customer_id", "customer_name", "segment", "region"))
+}
+
+# 차원 컬럼 → 차원 테이블 (팩트의 조인 키 컬럼도 같은 이름의 차원 컬럼으로 취급)
+_DIMENSION_OF = {column: table for table, dim in _DIMENSIONS.items() for column in dim.columns}
+
+# 가산 측정값 → 재집계 결과 캐스팅 타입 (원본 SUM과 같은 타입 유지)
+_MEASURES = {"revenue": None, "quantity": "BIGINT"}
+_COUNT_COLUMN = "sales_count"
+
+# 작은 것부터 나열 (행 수 추정치가 없을 때 이 순서로 선택)
+ROLLUPS = [
+    RollupSpec("rollup_sales_monthly", (
+        "year", "quarter", "month", "category", "subcategory", "segment", "region"
+    )),
+    RollupSpec("rollup_sales_product_monthly", (
+        "year", "quarter", "month", "product_id", "product_name", "category", "subcategory"
+    )),
+    RollupSpec("rollup_sales_daily", (
+        "date", "year", "quarter", "month", "week", "dow", "category", "segment", "region"
+    ))
+]
+
+_ROLLUP_ALIAS = "r"
+
+# 원본 SQL → 재작성 SQL (대상이 아니면 None), 롤업 상태가 바뀌면 비움
+_REWRITE_MEMO_SIZE = 1024
+
+class _Ineligible(Exception):
+    """롤업으로 재작성할 수 없는 쿼리"""
+
+def _create_sql(spec: RollupSpec) -> str:
+    """롤업 구체화 뷰 생성 DDL"""
+    columns = ", ".join(f"{_DIMENSIONS[_DIMENSION_OF[column]].alias}.{column}" for column in spec.columns)
+    joins = " ".join(
+        f"JOIN {table} {dim.alias} ON f.{dim.key} = {dim.alias}.{dim.key}"
+        for table, dim in _DIMENSIONS.items()
+        if table in spec.tables
+    )
+    return (
+        f"CREATE MATERIALIZED VIEW IF NOT EXISTS {spec.name} AS "
+        f"SELECT {columns}, SUM(f.revenue) AS revenue, SUM(f.quantity) AS quantity, "
+        f"COUNT(*) AS {_COUNT_COLUMN} "
+        f"FROM {_FACT_TABLE} f {joins} GROUP BY {columns}"
+    )
+
+def _rollup_sum(column: str) -> exp.Expression:
+    return exp.func("SUM", exp.column(column, table=_ROLLUP_ALIAS))
+
+def _aggregate_output_name(projection: exp.Expression) -> Optional[str]:
+    """
+    별칭 없는 출력 컬럼 이름이 집계 함수에서 오면 그 이름
+    
+    PostgreSQL은 CAST(::)와 괄호를 거쳐 안쪽 함수 이름을 출력 이름으로 쓰므로
+    COUNT(*)::int도 count입니다. 재작성하면 집계가 SUM/나눗셈으로 바뀌어 이름이
+    달라지므로 원래 이름을 별칭으로 고정합니다. 그 밖의 식은 재작성 전후 이름이 같습니다.
+    """
+    node = projection
+    while isinstance(node, (exp.Cast, exp.Paren)):
+        node = node.this
+    return node.key if isinstance(node, exp.AggFunc) else None
+
+class RollupService:
+    """
+    집계 롤업 관리 및 집계 탐색(aggregate navigation) 재작성
+    
+    fact_sales를 몇 가지 그레인(월, 월×제품, 일)으로 미리 집계한 구체화 뷰를 유지하고,
+    검증된 SQL 중 롤업으로 같은 결과를 낼 수 있는 쿼리를 가장 작은 롤업을 읽도록
+    재작성합니다. 대상은 fact_sales와 차원 테이블의 조인 키 조인만 있고, 모든 컬럼이
+    롤업 차원이거나 가산 측정값(SUM/AVG(revenue, quantity), COUNT(*))인 집계 쿼리입니다.
+    
+    원본 테이블이 바뀌면 DataChangeDetector가 refresh_for를 호출해 해당 롤업을
+    CONCURRENTLY 갱신하며, 갱신이 끝날 때까지 그 롤업으로는 재작성하지 않습니다.
+    """
+    
+    def __init__(self):
+        self.row_estimates: Dict[str, float] = {}  # 존재하는 롤업별 행 수 추정치
+        self.stale: Set[str] = set()
+        self._dirty: Set[str] = set()
+        self._refresh_lock = asyncio.Lock()
+        self._memo: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self.stats = {"rewritten": 0, "skipped": 0, "refreshes": 0, "refresh_failures": 0}
+    
+    async def start(self) -> None:
+        """롤업 생성 확인 및 행 수 추정치 조회"""
+        if not settings.ROLLUP_ENABLED:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                await self.ensure_rollups(session)
+                await self._load_estimates(session)
+            logger.info(f"집계 롤업 사용 가능: {sorted(self.row_estimates)}")
+        except Exception as e:
+            # 롤업이 없어도 원본 테이블로 실행되므로 앱은 시작
+            logger.warning(f"집계 롤업 준비 실패: {e}")
+    
+    async def ensure_rollups(self, session: AsyncSession) -> None:
+        """롤업 구체화 뷰와 CONCURRENTLY 갱신용 유니크 인덱스 생성"""
+        for spec in ROLLUPS:
+            await session.execute(text(_create_sql(spec)))
+            await session.execute(text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {spec.name}_key "
+                f"ON {spec.name} ({', '.join(spec.columns)})"
+            ))
+            await session.execute(text(f"ANALYZE {spec.name}"))
+            await session.commit()
+    
+    async def _load_estimates(self, session: AsyncSession) -> None:
+        result = await session.execute(
+            text("""
+                SELECT relname::text, reltuples
+                FROM pg_catalog.pg_class
+                WHERE relkind = 'm' AND relname = ANY(:names)
+            """),
+            {"names": [spec.name for spec in ROLLUPS]}
+        )
+        self.row_estimates = {name: float(rows) for name, rows in result.fetchall()}
+        self._memo.clear()
+    
+    async def refresh_for(self, tables: List[str]) -> List[str]:
+        """
+        바뀐 원본 테이블을 읽는 롤업 갱신
+        
+        갱신 중 들어온 변경은 다시 stale로 남겨 이어서 갱신합니다.
+        
+        Returns:
+            갱신한 롤업 이름 목록
+        """
+        changed = set(tables)
+        names = {spec.name for spec in ROLLUPS if spec.name in self.row_estimates and spec.tables & changed}
+        if not names:
+            return []
+        
+        # 갱신이 끝날 때까지 재작성 중단 (원본 테이블로 실행)
+        self.stale |= names
+        self._dirty |= names
+        self._memo.clear()
+        
+        async with self._refresh_lock:
+            names, self._dirty = self._dirty, set()
+            if not names:
+                return []
+            try:
+                async with AsyncSessionLocal() as session:
+                    for name in sorted(names):
+                        await session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+                        await session.execute(text(f"ANALYZE {name}"))
+                        await session.commit()
+                    await self._load_estimates(session)
+            except Exception as e:
+                self._dirty |= names
+                self.stats["refresh_failures"] += 1
+                logger.error(f"집계 롤업 갱신 실패, 원본 테이블로 실행: {e}")
+                return []
+            
+            self.stale -= names - self._dirty
+            self._memo.clear()
+            self.stats["refreshes"] += 1
+            logger.info(f"집계 롤업 갱신: {sorted(names)}")
+            return sorted(names)
+    
+    def rewrite(self, sql: str) -> str:
+        """
+        검증된 SQL을 가장 작은 적합 롤업을 읽도록 재작성
+        
+        Returns:
+            재작성된 SQL (대상이 아니면 원문)
+        """
+        if not settings.ROLLUP_ENABLED or not self.row_estimates:
+            return sql
+        
+        if sql in self._memo:
+            rewritten = self._memo[sql]
+            self._memo.move_to_end(sql)
+        else:
+            try:
+                rewritten = self._rewrite(parse_one(sql, dialect="postgres"))
+            except _Ineligible:
+                rewritten = None
+            except Exception as e:
+                logger.warning(f"롤업 재작성 실패, 원문 실행: {e}")
+                rewritten = None
+            self._memo[sql] = rewritten
+            while len(self._memo) > _REWRITE_MEMO_SIZE:
+                self._memo.popitem(last=False)
+        
+        if rewritten is None:
+            self.stats["skipped"] += 1
+            return sql
+        self.stats["rewritten"] += 1
+        return rewritten
+    
+    def _rewrite(self, parsed: exp.Expression) -> Optional[str]:
+        if not isinstance(parsed, exp.Select):
+            raise _Ineligible()
+        aliases = self._resolve_tables(parsed)
+        needed = self._required_columns(parsed, aliases)
+        spec = self._choose(needed)
+        if spec is None:
+            return None
+        return self._to_rollup(parsed, aliases, spec).sql(dialect="postgres")
+    
+    def _resolve_tables(self, parsed: exp.Select) -> Dict[str, str]:
+        """fact_sales와 조인 키로 조인된 차원 테이블만 허용, 별칭 → 테이블"""
+        if (
+            len(list(parsed.find_all(exp.Select))) > 1
+            or parsed.find(exp.With, exp.Union, exp.Subquery, exp.Window, exp.Filter, exp.Lateral)
+        ):
+            raise _Ineligible()
+        distinct = parsed.args.get("distinct")
+        if distinct is not None and distinct.args.get("on") is not None:
+            raise _Ineligible()
+        
+        from_ = parsed.args.get("from")
+        fact = from_.this if from_ is not None else None
+        if not self._is_table(fact, _FACT_TABLE):
+            raise _Ineligible()
+        aliases = {fact.alias_or_name: _FACT_TABLE}
+        
+        for join in parsed.args.get("joins") or []:
+            table = join.this
+            if not isinstance(table, exp.Table) or table.name not in _DIMENSIONS or not self._is_table(table, table.name):
+                raise _Ineligible()
+            # 차원 FK는 NOT NULL이므로 LEFT JOIN도 INNER JOIN과 같은 행을 만듦
+            if join.side not in ("", "LEFT") or join.kind not in ("", "INNER") or join.args.get("using"):
+                raise _Ineligible()
+            if table.name in aliases.values():
+                raise _Ineligible()
+            
+            key = _DIMENSIONS[table.name].key
+            on = join.args.get("on")
+            if not isinstance(on, exp.EQ):
+                raise _Ineligible()
+            sides = {
+                (aliases.get(column.table) if column.table != table.alias_or_name else table.name, column.name)
+                for column in (on.this, on.expression)
+                if isinstance(column, exp.Column) and column.table
+            }
+            if sides != {(_FACT_TABLE, key), (table.name, key)}:
+                raise _Ineligible()
+            aliases[table.alias_or_name] = table.name
+        
+        if len(list(parsed.find_all(exp.Table))) != len(aliases):
+            raise _Ineligible()
+        return aliases
+    
+    def _is_table(self, node: Optional[exp.Expression], name: str) -> bool:
+        return (
+            isinstance(node, exp.Table)
+            and node.name == name
+            and not node.args.get("catalog")
+            and node.db in ("", "public")
+        )
+    
+    def _resolve_column(self, column: exp.Column, aliases: Dict[str, str], select_aliases: Set[str]) -> Optional[Tuple[str, str]]:
+        """
+        컬럼을 (테이블, 컬럼명)으로 해석
+        
+        ORDER BY 항목으로 바로 쓰인 출력 별칭이면 None (PostgreSQL과 같은 우선순위)
+        """
+        name = column.name
+        if column.table:
+            table = aliases.get(column.table)
+            if table is None or name not in self._columns_of(table):
+                raise _Ineligible()
+            return table, name
+        
+        if name in select_aliases and isinstance(column.parent, exp.Ordered):
+            return None
+        owners = [table for table in aliases.values() if name in self._columns_of(table)]
+        if not owners:
+            raise _Ineligible()
+        dimensions = [table for table in owners if table != _FACT_TABLE]
+        return (dimensions[0] if dimensions else _FACT_TABLE), name
+    
+    def _columns_of(self, table: str) -> Set[str]:
+        return _FACT_COLUMNS if table == _FACT_TABLE else set(_DIMENSIONS[table].columns)
+    
+    def _required_columns(self, parsed: exp.Select, aliases: Dict[str, str]) -> Set[str]:
+        """집계가 롤업으로 재현 가능한지 확인하고 필요한 롤업 차원 컬럼 반환"""
+        select_aliases = {projection.alias for projection in parsed.expressions if isinstance(projection, exp.Alias)}
+        
+        def resolve(column):
+            return self._resolve_column(column, aliases, select_aliases)
+        
+        has_aggregate = False
+        for aggregate in parsed.find_all(exp.AggFunc):
+            has_aggregate = True
+            argument = aggregate.this
+            if isinstance(aggregate, exp.Count):
+                if isinstance(argument, exp.Distinct):
+                    if len(argument.expressions) != 1 or not isinstance(argument.expressions[0], exp.Column):
+                        raise _Ineligible()
+                elif not (
+                    isinstance(argument, exp.Star)
+                    or (isinstance(argument, exp.Literal) and argument.is_int)
+                    or (isinstance(argument, exp.Column) and resolve(argument) == (_FACT_TABLE, "sales_id"))
+                ):
+                    raise _Ineligible()
+            elif isinstance(aggregate, (exp.Sum, exp.Avg)):
+                if not isinstance(argument, exp.Column):
+                    raise _Ineligible()
+                table, name = resolve(argument) or ("", "")
+                if table != _FACT_TABLE or name not in _MEASURES:
+                    raise _Ineligible()
+            elif isinstance(aggregate, (exp.Min, exp.Max)):
+                if not isinstance(argument, exp.Column):
+                    raise _Ineligible()
+            else:
+                raise _Ineligible()
+        
+        # 행 단위 조회는 롤업으로 재현할 수 없음
+        if not (has_aggregate or parsed.args.get("group") or parsed.args.get("distinct")):
+            raise _Ineligible()
+        
+        for star in parsed.find_all(exp.Star):
+            if not isinstance(star.parent, exp.Count):
+                raise _Ineligible()
+        
+        needed = set()
+        for column in parsed.find_all(exp.Column):
+            if column.find_ancestor(exp.Join):
+                continue
+            resolved = resolve(column)
+            if resolved is None:
+                continue
+            table, name = resolved
+            aggregate = column.find_ancestor(exp.AggFunc)
+            if table == _FACT_TABLE and name in _MEASURES:
+                # 측정값은 SUM/AVG의 인자로만
+                if not isinstance(aggregate, (exp.Sum, exp.Avg)) or aggregate.this is not column:
+                    raise _Ineligible()
+                continue
+            if table == _FACT_TABLE and name == "sales_id":
+                if not isinstance(aggregate, exp.Count) or aggregate.this is not column:
+                    raise _Ineligible()
+                continue
+            if name not in _DIMENSION_OF:
+                raise _Ineligible()
+            # 차원 컬럼은 그룹 키/필터 또는 MIN/MAX/COUNT(DISTINCT)로만
+            if aggregate is not None and not (
+                isinstance(aggregate, (exp.Min, exp.Max))
+                or (isinstance(aggregate, exp.Count) and isinstance(aggregate.this, exp.Distinct))
+            ):
+                raise _Ineligible()
+            needed.add(name)
+        return needed
+    
+    def _choose(self, needed: Set[str]) -> Optional[RollupSpec]:
+        """필요한 차원을 모두 가진 최신 롤업 중 행 수가 가장 적은 것"""
+        candidates = [
+            (self.row_estimates[spec.name] if self.row_estimates[spec.name] >= 0 else float("inf"), index, spec)
+            for index, spec in enumerate(ROLLUPS)
+            if spec.name in self.row_estimates
+            and spec.name not in self.stale
+            and needed <= set(spec.columns)
+        ]
+        return min(candidates)[2] if candidates else None
+    
+    def _to_rollup(self, parsed: exp.Select, aliases: Dict[str, str], spec: RollupSpec) -> exp.Select:
+        """FROM/JOIN을 롤업으로 바꾸고 컬럼과 집계를 롤업 기준으로 재작성"""
+        select_aliases = {projection.alias for projection in parsed.expressions if isinstance(projection, exp.Alias)}
+        rewritten = parsed.copy()
+        rewritten.set("joins", None)
+        rewritten.set("from", exp.From(this=exp.alias_(exp.to_table(spec.name), _ROLLUP_ALIAS, table=True)))
+        
+        # 별칭 없는 집계는 PostgreSQL 기본 출력 이름(sum, count, avg...)을 유지
+        rewritten.set("expressions", [
+            exp.alias_(projection, name) if (name := _aggregate_output_name(projection)) else projection
+            for projection in rewritten.expressions
+        ])
+        
+        def transform(node):
+            if isinstance(node, exp.Count) and not isinstance(node.this, exp.Distinct):
+                # 일치하는 행이 없으면 SUM은 NULL이지만 COUNT는 0
+                return exp.cast(exp.func("COALESCE", _rollup_sum(_COUNT_COLUMN), exp.Literal.number(0)), "BIGINT")
+            if isinstance(node, exp.Sum):
+                measure = node.this.name
+                total = _rollup_sum(measure)
+                return exp.cast(total, _MEASURES[measure]) if _MEASURES[measure] else total
+            if isinstance(node, exp.Avg):
+                return exp.Paren(this=exp.Div(
+                    this=exp.cast(_rollup_sum(node.this.name), "NUMERIC"),
+                    expression=exp.func("NULLIF", _rollup_sum(_COUNT_COLUMN), exp.Literal.number(0))
+                ))
+            if isinstance(node, exp.Column):
+                resolved = self._resolve_column(node, aliases, select_aliases)
+                if resolved is not None:
+                    return exp.column(resolved[1], table=_ROLLUP_ALIAS)
+            return node
+        
+        return rewritten.transform(transform)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """재작성/갱신 횟수와 롤업 상태"""
+        return {
+            **self.stats,
+            "rollups": {name: {"rows": rows, "stale": name in self.stale} for name, rows in self.row_estimates.items()}
+        }
@@ -0,0 +1,180 @@
+import math
+import re
+from collections import Counter, deque
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+from app.core.config import settings
+
+FACT_TABLE = "fact_sales"
+
+_TOKEN_RE = re.compile(r"[가-힣]+|[a-z0-9]+")
+_HANGUL_RE = re.compile(r"[가-힣]")
+
+# 날짜 타입 컬럼 문서에 덧붙이는 기간 표현 (질문에 컬럼명 대신 자주 쓰임)
+_TEMPORAL_TERMS = "날짜 기간 최근 지난 이번 올해 금년 작년 전년 어제 오늘 일별 주간 주별 월별 분기별 연도별 연간 추이 트렌드"
+_TEMPORAL_TYPES = ("date", "timestamp")
+
+# BM25 파라미터
+_K1 = 1.2
+_B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    """
+    한국어 n-gram 토큰화
+    
+    한글 어절은 음절 2-gram으로 나눠 조사/접미사가 붙어도 ("카테고리별" ↔ "카테고리")
+    매칭되게 하고 (한 음절 어절은 그대로), 영문/숫자는 단어 단위
+    (snake_case는 밑줄 기준으로 분리)로 씁니다.
+    """
+    terms = []
+    for word in _TOKEN_RE.findall(text.lower()):
+        if _HANGUL_RE.match(word) and len(word) > 1:
+            terms.extend(word[index:index + 2] for index in range(len(word) - 1))
+        else:
+            terms.append(word)
+    return terms
+
+class _Document(NamedTuple):
+    table: str
+    column: Optional[str]  # None이면 테이블 문서
+    length: int
+
+class SchemaIndex:
+    """
+    스키마 검색용 로컬 BM25 색인
+    
+    테이블 이름/설명과 컬럼별 이름/설명/주석/대표 값을 문서로 색인하고, 질문과
+    관련된 테이블과 컬럼만 남긴 스키마 정보를 만듭니다. 선택된 테이블에서
+    fact_sales까지의 외래 키 조인 경로 테이블은 항상 포함합니다.
+    """
+    
+    def __init__(self, schema_info: Dict[str, Any]):
+        self.schema_info = schema_info
+        self.documents: List[_Document] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.paths = self._fact_paths(schema_info)
+        
+        dimension_values = schema_info.get("dimension_values") or {}
+        for table_name, table in schema_info["tables"].items():
+            self._add(table_name, None, f"{table_name} {table.get('description') or ''}")
+            values = dimension_values.get(table_name, {})
+            for column in table["columns"]:
+                parts = [
+                    column["name"],
+                    column.get("description") or "",
+                    column.get("comment") or "",
+                    " ".join(values.get(column["name"], []))
+                ]
+                if column["type"].startswith(_TEMPORAL_TYPES):
+                    parts.append(_TEMPORAL_TERMS)
+                self._add(table_name, column["name"], " ".join(parts))
+        
+        self.average_length = sum(doc.length for doc in self.documents) / max(len(self.documents), 1)
+    
+    def _add(self, table: str, column: Optional[str], text: str) -> None:
+        terms = Counter(tokenize(text))
+        index = len(self.documents)
+        self.documents.append(_Document(table, column, sum(terms.values())))
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, []).append((index, frequency))
+    
+    def _fact_paths(self, schema_info: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """외래 키 그래프(방향 무시)에서 fact_sales까지의 경로 (테이블 → 다음 테이블)"""
+        neighbors: Dict[str, Set[str]] = {}
+        for relationship in schema_info.get("relationships", []):
+            neighbors.setdefault(relationship["from_table"], set()).add(relationship["to_table"])
+            neighbors.setdefault(relationship["to_table"], set()).add(relationship["from_table"])
+        
+        if FACT_TABLE not in schema_info["tables"]:
+            return {}
+        paths: Dict[str, Optional[str]] = {FACT_TABLE: None}
+        queue = deque([FACT_TABLE])
+        while queue:
+            table = queue.popleft()
+            for neighbor in sorted(neighbors.get(table, ())):
+                if neighbor not in paths:
+                    paths[neighbor] = table
+                    queue.append(neighbor)
+        return paths
+    
+    def score(self, question: str) -> Dict[Tuple[str, Optional[str]], float]:
+        """질문에 대한 (테이블, 컬럼)별 BM25 점수 (점수가 0인 문서 제외)"""
+        scores: Dict[int, float] = {}
+        count = len(self.documents)
+        for term in set(tokenize(question)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, frequency in postings:
+                length_norm = 1 - _B + _B * self.documents[index].length / self.average_length
+                scores[index] = scores.get(index, 0.0) + idf * frequency * (_K1 + 1) / (frequency + _K1 * length_norm)
+        return {
+            (self.documents[index].table, self.documents[index].column): value
+            for index, value in scores.items()
+        }
+    
+    def prune(self, question: str) -> Dict[str, Any]:
+        """
+        질문 관련 테이블/컬럼만 남긴 스키마 정보
+        
+        관련 문서가 없으면 전체 스키마를 그대로 반환합니다. 반환된 스키마의 version은
+        선택 결과를 포함하므로 프롬프트 렌더러가 선택 조합별로 메모이즈합니다.
+        """
+        scores = self.score(question)
+        if not scores:
+            return self.schema_info
+        
+        table_scores: Dict[str, float] = {}
+        for (table, _), value in scores.items():
+            table_scores[table] = max(table_scores.get(table, 0.0), value)
+        best = max(table_scores.values())
+        ranked = sorted(table_scores, key=lambda table: (-table_scores[table], table))
+        selected = [
+            table for table in ranked[:settings.SCHEMA_PRUNE_MAX_TABLES]
+            if table_scores[table] >= best * settings.SCHEMA_PRUNE_MIN_SCORE_RATIO
+        ]
+        
+        # 선택된 테이블에서 fact_sales까지의 조인 경로 추가
+        tables = set()
+        for table in selected:
+            while table is not None and table not in tables:
+                tables.add(table)
+                table = self.paths.get(table)
+        
+        return self._subset(tables, scores)
+    
+    def _subset(self, tables: Set[str], scores: Dict[Tuple[str, Optional[str]], float]) -> Dict[str, Any]:
+        schema_info = self.schema_info
+        subset_tables = {}
+        for table_name in sorted(tables):
+            table = schema_info["tables"][table_name]
+            columns = table["columns"]
+            # 넓은 테이블은 키와 관련 컬럼만
+            if len(columns) > settings.SCHEMA_PRUNE_WIDE_TABLE_COLUMNS:
+                columns = [
+                    column for column in columns
+                    if column.get("primary_key")
+                    or (column.get("foreign_key") and column["foreign_key"].split(".", 1)[0] in tables)
+                    or (table_name, column["name"]) in scores
+                ]
+            subset_tables[table_name] = {**table, "columns": columns}
+        
+        relationships = [
+            relationship for relationship in schema_info.get("relationships", [])
+            if relationship["from_table"] in tables and relationship["to_table"] in tables
+        ]
+        examples = [
+            example for example in schema_info.get("examples", [])
+            if set(re.findall(r"\b(?:from|join)\s+(\w+)", example["sql"].lower())) & set(schema_info["tables"]) <= tables
+        ]
+        signature = ";".join(
+            f"{name}:{','.join(column['name'] for column in table['columns'])}"
+            for name, table in subset_tables.items()
+        )
+        return {
+            **schema_info,
+            "tables": subset_tables,
+            "relationships": relationships,
+            "examples": examples,
+            "version": f"{schema_info['version']}|{signature}" if schema_info.get("version") else None
+        }
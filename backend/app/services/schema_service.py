@@ -1,8 +1,12 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text, inspect
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+import asyncio
+import json
 import logging
+import time
 from datetime import date, datetime
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -14,34 +18,170 @@ def _serialize_for_json(obj):
         return str(obj)
     return obj
 
+class SchemaSnapshot:
+    """프로세스 내 스키마 스냅샷 (버전 확인 주기 동안 DB 조회 없이 재사용)"""
+    
+    def __init__(self, refresh_interval: int):
+        self.refresh_interval = refresh_interval
+        self.schema_info: Optional[Dict[str, Any]] = None
+        self.version: Optional[str] = None
+        self.checked_at = 0.0
+        self.lock = asyncio.Lock()
+    
+    def is_fresh(self) -> bool:
+        """버전 확인 없이 그대로 사용할 수 있는지 여부"""
+        return (
+            self.schema_info is not None
+            and time.monotonic() - self.checked_at < self.refresh_interval
+        )
+    
+    def update(self, schema_info: Dict[str, Any], version: Optional[str]) -> None:
+        """스냅샷 교체"""
+        self.schema_info = schema_info
+        self.version = version
+        self.checked_at = time.monotonic()
+    
+    def touch(self) -> None:
+        """버전이 같을 때 확인 시각만 갱신"""
+        self.checked_at = time.monotonic()
+    
+    def invalidate(self) -> None:
+        """스냅샷 무효화"""
+        self.schema_info = None
+        self.version = None
+        self.checked_at = 0.0
+
+# 모든 SchemaService 인스턴스가 공유하는 스냅샷
+_schema_snapshot = SchemaSnapshot(settings.SCHEMA_CACHE_REFRESH_INTERVAL)
+
 class SchemaService:
     """데이터베이스 스키마 서비스"""
     
+    def __init__(self):
+        self.snapshot = _schema_snapshot
+    
     async def get_schema_info(self, session: AsyncSession) -> Dict[str, Any]:
         """
         데이터베이스 스키마 정보 반환
         
+        확인 주기 안에서는 스냅샷을 그대로 반환하고, 주기가 지나면
+        카탈로그 버전을 한 번 조회해 바뀐 경우에만 다시 수집합니다.
+        반환된 딕셔너리는 공유되므로 수정하지 마세요.
+        
         Args:
             session: 데이터베이스 세션
-            
+        
         Returns:
             스키마 정보 딕셔너리
         """
+        snapshot = self.snapshot
+        if snapshot.is_fresh():
+            return snapshot.schema_info
+        
+        async with snapshot.lock:
+            # 대기 중 다른 요청이 갱신했을 수 있음
+            if snapshot.is_fresh():
+                return snapshot.schema_info
+            
+            version = await self._get_schema_version(session)
+            if snapshot.schema_info is not None and version is not None and version == snapshot.version:
+                snapshot.touch()
+                return snapshot.schema_info
+            
+            schema_info = await self._build_schema_info(session)
+            # 프롬프트 렌더러가 버전별로 메모이즈
+            schema_info["version"] = version
+            snapshot.update(schema_info, version)
+            logger.info(f"스키마 스냅샷 갱신 (version={version})")
+            return schema_info
+    
+    def invalidate_schema_cache(self) -> None:
+        """스키마 스냅샷 무효화 (DDL 적용 후 호출)"""
+        self.snapshot.invalidate()
+    
+    async def _get_schema_version(self, session: AsyncSession) -> Optional[str]:
+        """
+        pg_class/pg_attribute/pg_constraint 체크섬으로 스키마 버전 조회
+        
+        조회에 실패하면 None을 반환하며, 이 경우 확인 주기마다 다시 수집합니다.
+        """
+        query = text("""
+            SELECT md5(
+                coalesce((
+                    SELECT string_agg(
+                        c.relname || '.' || a.attname || ':' || a.atttypid || ':' || a.atttypmod || ':' || a.attnotnull,
+                        ',' ORDER BY c.relname, a.attnum
+                    )
+                    FROM pg_catalog.pg_class c
+                    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+                    JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+                    WHERE n.nspname = 'public'
+                    AND c.relname = ANY(:tables)
+                    AND a.attnum > 0
+                    AND NOT a.attisdropped
+                ), '')
+                || '|' ||
+                coalesce((
+                    SELECT string_agg(con.conname || ':' || con.confrelid, ',' ORDER BY con.conname)
+                    FROM pg_catalog.pg_constraint con
+                    JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+                    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = 'public'
+                    AND c.relname = ANY(:tables)
+                    AND con.contype IN ('p', 'f')
+                ), '')
+            )
+        """)
+        
+        try:
+            result = await session.execute(query, {"tables": list(settings.ALLOWED_TABLES)})
+            return result.scalar()
+        except Exception as e:
+            logger.warning(f"스키마 버전 조회 실패: {e}")
+            return None
+    
+    async def _build_schema_info(self, session: AsyncSession) -> Dict[str, Any]:
+        """
+        카탈로그를 일괄 조회해 스키마 정보 수집
+        
+        허용 테이블 수와 관계없이 컬럼/관계/샘플 데이터/차원 값을 각각 한 번씩,
+        총 네 번의 쿼리로 조회한 뒤 메모리에서 조립합니다.
+        """
         try:
             schema_info = {
                 "tables": {},
                 "relationships": [],
+                "dimension_values": {},
                 "examples": []
             }
             
-            # 테이블 정보 수집
-            tables = await self._get_tables(session)
-            for table_name in tables:
-                table_info = await self._get_table_info(session, table_name)
-                schema_info["tables"][table_name] = table_info
+            # 컬럼 정보 일괄 조회
+            table_columns = await self._get_table_columns(session)
+            
+            # 관계 정보 일괄 조회
+            relationships = await self._get_relationships(session)
+            foreign_keys = {
+                (rel["from_table"], rel["from_column"]): f"{rel['to_table']}.{rel['to_column']}"
+                for rel in relationships
+            }
+            
+            # 샘플 데이터 일괄 조회
+            sample_data = await self._get_sample_data(session, list(table_columns.keys()))
+            
+            for table_name, columns in table_columns.items():
+                for column in columns:
+                    column["foreign_key"] = foreign_keys.get((table_name, column["name"]))
+                schema_info["tables"][table_name] = {
+                    "name": table_name,
+                    "description": self._get_table_description(table_name),
+                    "columns": columns,
+                    "sample_data": sample_data.get(table_name, [])
+                }
+            
+            schema_info["relationships"] = relationships
             
-            # 관계 정보 수집
-            schema_info["relationships"] = await self._get_relationships(session)
+            # 문자열 컬럼의 대표 값 (질문 관련 스키마 선택용)
+            schema_info["dimension_values"] = await self._get_dimension_values(session, table_columns)
             
             # 예제 쿼리 추가
             schema_info["examples"] = self._get_example_queries()
@@ -52,74 +192,84 @@ class SchemaService:
             logger.error(f"스키마 정보 조회 실패: {e}")
             raise
     
-    async def _get_tables(self, session: AsyncSession) -> List[str]:
-        """테이블 목록 조회"""
-        query = text("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_name IN ('dim_date', 'dim_product', 'dim_customer', 'fact_sales')
-            ORDER BY table_name
-        """)
-        
-        result = await session.execute(query)
-        return [row[0] for row in result.fetchall()]
+    async def get_tables(self, session: AsyncSession) -> List[str]:
+        """스냅샷 기준 테이블 목록 반환"""
+        schema_info = await self.get_schema_info(session)
+        return list(schema_info["tables"].keys())
+    
+    async def get_table_info(self, session: AsyncSession, table_name: str) -> Optional[Dict[str, Any]]:
+        """스냅샷 기준 테이블 상세 정보 반환 (없으면 None)"""
+        schema_info = await self.get_schema_info(session)
+        return schema_info["tables"].get(table_name)
     
-    async def _get_table_info(self, session: AsyncSession, table_name: str) -> Dict[str, Any]:
-        """테이블 상세 정보 조회"""
-        # 컬럼 정보 조회
-        columns_query = text("""
+    async def _get_table_columns(self, session: AsyncSession) -> Dict[str, List[Dict[str, Any]]]:
+        """허용 테이블 전체의 컬럼 정보를 한 번에 조회"""
+        query = text("""
             SELECT 
-                column_name,
-                data_type,
-                is_nullable,
-                column_default
-            FROM information_schema.columns 
-            WHERE table_name = :table_name 
-            AND table_schema = 'public'
-            ORDER BY ordinal_position
+                c.relname AS table_name,
+                a.attname AS column_name,
+                pg_catalog.format_type(a.atttypid, a.atttypmod) AS data_type,
+                NOT a.attnotnull AS nullable,
+                pg_catalog.pg_get_expr(ad.adbin, ad.adrelid) AS column_default,
+                pg_catalog.col_description(c.oid, a.attnum) AS comment,
+                coalesce(a.attnum = ANY(pk.conkey), false) AS primary_key
+            FROM pg_catalog.pg_class c
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+            LEFT JOIN pg_catalog.pg_attrdef ad 
+                ON ad.adrelid = c.oid AND ad.adnum = a.attnum
+            LEFT JOIN pg_catalog.pg_constraint pk 
+                ON pk.conrelid = c.oid AND pk.contype = 'p'
+            WHERE n.nspname = 'public'
+            AND c.relkind IN ('r', 'p', 'v', 'm')
+            AND c.relname = ANY(:tables)
+            AND a.attnum > 0
+            AND NOT a.attisdropped
+            ORDER BY c.relname, a.attnum
         """)
         
-        result = await session.execute(columns_query, {"table_name": table_name})
-        columns = []
+        result = await session.execute(query, {"tables": list(settings.ALLOWED_TABLES)})
+        tables: Dict[str, List[Dict[str, Any]]] = {}
         
         for row in result.fetchall():
-            column_info = {
-                "name": row[0],
-                "type": row[1],
-                "nullable": row[2] == "YES",
-                "default": row[3],
-                "description": self._get_column_description(table_name, row[0])
-            }
-            columns.append(column_info)
+            table_name, column_name = row[0], row[1]
+            tables.setdefault(table_name, []).append({
+                "name": column_name,
+                "type": row[2],
+                "nullable": row[3],
+                "default": row[4],
+                "primary_key": row[6],
+                "comment": row[5],
+                "description": self._get_column_description(table_name, column_name)
+            })
         
-        return {
-            "name": table_name,
-            "description": self._get_table_description(table_name),
-            "columns": columns,
-            "sample_data": await self._get_sample_data(session, table_name)
-        }
+        return tables
     
     async def _get_relationships(self, session: AsyncSession) -> List[Dict[str, Any]]:
-        """테이블 관계 정보 조회"""
+        """허용 테이블 간 외래 키 관계를 한 번에 조회"""
         query = text("""
             SELECT 
-                tc.table_name,
-                kcu.column_name,
-                ccu.table_name AS foreign_table_name,
-                ccu.column_name AS foreign_column_name
-            FROM information_schema.table_constraints AS tc
-            JOIN information_schema.key_column_usage AS kcu
-                ON tc.constraint_name = kcu.constraint_name
-                AND tc.table_schema = kcu.table_schema
-            JOIN information_schema.constraint_column_usage AS ccu
-                ON ccu.constraint_name = tc.constraint_name
-                AND ccu.table_schema = tc.table_schema
-            WHERE tc.constraint_type = 'FOREIGN KEY'
-            AND tc.table_schema = 'public'
+                src.relname AS table_name,
+                src_col.attname AS column_name,
+                dst.relname AS foreign_table_name,
+                dst_col.attname AS foreign_column_name
+            FROM pg_catalog.pg_constraint con
+            JOIN pg_catalog.pg_class src ON src.oid = con.conrelid
+            JOIN pg_catalog.pg_class dst ON dst.oid = con.confrelid
+            JOIN pg_catalog.pg_namespace n ON n.oid = src.relnamespace
+            CROSS JOIN LATERAL unnest(con.conkey, con.confkey) AS k(src_attnum, dst_attnum)
+            JOIN pg_catalog.pg_attribute src_col 
+                ON src_col.attrelid = con.conrelid AND src_col.attnum = k.src_attnum
+            JOIN pg_catalog.pg_attribute dst_col 
+                ON dst_col.attrelid = con.confrelid AND dst_col.attnum = k.dst_attnum
+            WHERE con.contype = 'f'
+            AND n.nspname = 'public'
+            AND src.relname = ANY(:tables)
+            AND dst.relname = ANY(:tables)
+            ORDER BY src.relname, con.conname
         """)
         
-        result = await session.execute(query)
+        result = await session.execute(query, {"tables": list(settings.ALLOWED_TABLES)})
         relationships = []
         
         for row in result.fetchall():
@@ -133,21 +283,66 @@ class SchemaService:
         
         return relationships
     
-    async def _get_sample_data(self, session: AsyncSession, table_name: str, limit: int = 3) -> List[Dict[str, Any]]:
-        """샘플 데이터 조회"""
+    async def _get_sample_data(self, session: AsyncSession, table_names: List[str], limit: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        여러 테이블의 샘플 데이터를 UNION ALL 한 번으로 조회
+        
+        테이블명은 카탈로그에서 확인된 허용 테이블만 사용하며 식별자로 인용합니다.
+        """
+        samples: Dict[str, List[Dict[str, Any]]] = {name: [] for name in table_names}
+        if not table_names:
+            return samples
+        
         try:
-            query = text(f"SELECT * FROM {table_name} LIMIT {limit}")
+            parts = []
+            for index, table_name in enumerate(table_names):
+                quoted = '"' + table_name.replace('"', '""') + '"'
+                parts.append(
+                    f"SELECT {index} AS table_index, row_to_json(t)::text AS row_json "
+                    f"FROM (SELECT * FROM {quoted} LIMIT {int(limit)}) t"
+                )
+            query = text(" UNION ALL ".join(parts))
             result = await session.execute(query)
-            rows = []
+            
             for row in result.fetchall():
-                row_dict = {}
-                for key, value in row._mapping.items():
-                    row_dict[key] = _serialize_for_json(value)
-                rows.append(row_dict)
-            return rows
+                samples[table_names[row[0]]].append(json.loads(row[1]))
+            return samples
+        except Exception as e:
+            logger.warning(f"샘플 데이터 조회 실패: {e}")
+            return samples
+    
+    async def _get_dimension_values(self, session: AsyncSession, table_columns: Dict[str, List[Dict[str, Any]]], limit: int = 50) -> Dict[str, Dict[str, List[str]]]:
+        """
+        문자열 컬럼의 대표 값을 pg_stats 최빈값에서 한 번에 조회
+        
+        테이블을 스캔하지 않으므로 차원 테이블이 커져도 비용이 일정합니다
+        (ANALYZE 전이면 비어 있음).
+        """
+        keys = [
+            f"{table_name}.{column['name']}"
+            for table_name, columns in table_columns.items()
+            for column in columns
+            if column["type"].startswith(("character", "text"))
+        ]
+        values: Dict[str, Dict[str, List[str]]] = {}
+        if not keys:
+            return values
+        
+        try:
+            query = text("""
+                SELECT tablename::text, attname::text, most_common_vals::text::text[]
+                FROM pg_catalog.pg_stats
+                WHERE schemaname = 'public'
+                AND tablename || '.' || attname = ANY(:keys)
+                AND most_common_vals IS NOT NULL
+            """)
+            result = await session.execute(query, {"keys": keys})
+            for table_name, column_name, common_values in result.fetchall():
+                values.setdefault(table_name, {})[column_name] = list(common_values)[:limit]
+            return values
         except Exception as e:
-            logger.warning(f"샘플 데이터 조회 실패 ({table_name}): {e}")
-            return []
+            logger.warning(f"차원 값 조회 실패: {e}")
+            return values
     
     def _get_table_description(self, table_name: str) -> str:
         """테이블 설명 반환"""
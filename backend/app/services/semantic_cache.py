@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import re
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.query_cache_service import normalize_question
+from app.services.sql_guardrails import SQLGuardrails
+
+logger = logging.getLogger(__name__)
+
+_VECTOR_DIM = 1024
+_NGRAM_SIZES = (2, 3)
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9_]*|[0-9]+|[가-힣]+")
+
+# 의미 없이 붙는 요청 표현과 띄어 쓴 접미사 (벡터화 전 제거)
+_FILLER_WORDS = {
+    "별", "보여줘", "보여주세요", "보여", "알려줘", "알려주세요", "알려", "주세요", "해줘", "해주세요",
+    "줘", "좀", "조회", "조회해줘", "뭐야", "어때", "합계", "총합", "총"
+}
+# 어절 끝 조사/접미사 ("카테고리별" ↔ "카테고리", "지역의" ↔ "지역")
+_PARTICLE_RE = re.compile(r"(?<=[가-힣])(?:으로|에서|별|의|을|를|은|는|이|가|과|와|에|로)$")
+
+# 질문별 마지막 AI 응답 SQL과 그 직전 사용자 질문 (최근 순)
+_SEED_PAIRS = text("""
+    SELECT q.content, a.sql_query, a.content
+    FROM chat_messages a
+    CROSS JOIN LATERAL (
+        SELECT u.content
+        FROM chat_messages u
+        WHERE u.session_id = a.session_id
+        AND u.message_type = 'user'
+        AND (u.created_at, u.message_id) < (a.created_at, a.message_id)
+        ORDER BY u.created_at DESC, u.message_id DESC
+        LIMIT 1
+    ) q
+    WHERE a.message_type = 'ai'
+    AND a.sql_query IS NOT NULL
+    ORDER BY a.created_at DESC, a.message_id DESC
+    LIMIT :limit
+""")
+
+class SemanticMatch(NamedTuple):
+    question: str
+    sql: str
+    explanation: str
+    score: float
+
+class SemanticQuestionCache:
+    """
+    유사 질문 캐시 (질문 → 검증된 SQL)
+    
+    질문을 문자 2/3-gram 해시 벡터로 만들어 NumPy 행렬에 보관하고 코사인 유사도로
+    가장 가까운 과거 질문을 찾습니다. "카테고리별 매출"과 "카테고리 별 매출 합계
+    보여줘"처럼 표현만 다른 질문은 SEMANTIC_CACHE_HIT_THRESHOLD 이상이면 LLM 없이
+    저장된 SQL을 쓰고, SEMANTIC_CACHE_EXAMPLE_THRESHOLD 이상이면 few-shot 예제로
+    프롬프트에 넣습니다. 영문 컬럼명은 스키마의 한국어 설명으로 바꿔 벡터화하므로
+    "category revenue"도 같은 질문으로 취급됩니다.
+    
+    SQL을 그대로 쓰려면 요청 표현/조사/띄어쓰기를 뺀 단어 집합(숫자, 차원 값, 월별/분기별
+    같은 집계 단위, 매출/판매량 같은 지표, 온라인/오프라인처럼 스키마에 없는 단어 포함)이
+    같아야 하며, 하나라도 다르면 점수와 관계없이 예제로만 사용합니다 ("2023년 매출"과
+    "2024년 매출", "월별 매출 추이"와 "분기별 매출 추이").
+    
+    시작 시 chat_messages의 최근 질문/SQL 쌍으로 채우고 이후 실행에 성공한 SQL을 더하며,
+    워커별 메모리에만 보관합니다.
+    """
+    
+    def __init__(self, guardrails: Optional[SQLGuardrails] = None):
+        self.guardrails = guardrails or SQLGuardrails()
+        self.max_entries = settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self.matrix = np.zeros((min(64, self.max_entries), _VECTOR_DIM), dtype=np.float32)  # 앞 len(entries)행만 유효
+        self.entries: List[Tuple[str, str, str]] = []  # (질문, SQL, 설명)
+        self.positions: Dict[str, int] = {}  # 정규화 질문 → 행
+        self._next_row = 0  # 가득 차면 가장 오래된 행부터 덮어씀
+        self.vocabulary: Dict[str, str] = {}  # 영문 컬럼명 → 한국어 설명
+        self.dimension_values: Set[str] = set()
+        self._schema_version: Optional[str] = None
+        self._seed_task: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "examples": 0, "misses": 0, "guarded": 0}
+    
+    async def start(self) -> None:
+        """chat_messages에서 최근 질문/SQL 쌍 불러오기 시작 (백그라운드)"""
+        if settings.SEMANTIC_CACHE_ENABLED and settings.SEMANTIC_CACHE_SEED_LIMIT > 0:
+            self._seed_task = asyncio.create_task(self._seed())
+    
+    async def stop(self) -> None:
+        """불러오기 중단"""
+        if self._seed_task:
+            self._seed_task.cancel()
+            self._seed_task = None
+    
+    async def _seed(self) -> None:
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(_SEED_PAIRS, {"limit": settings.SEMANTIC_CACHE_SEED_LIMIT})
+                pairs = result.fetchall()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"유사 질문 캐시 초기화 실패: {e}")
+            return
+        
+        # 오래된 것부터 넣어 최근 질문이 같은 질문의 SQL을 덮어쓰게 함
+        added = 0
+        for question, sql, explanation in reversed(pairs):
+            try:
+                # 그 사이 가드레일 규칙이 바뀌었을 수 있으므로 다시 검증
+                validated_sql = await self.guardrails.validate_and_clean_sql(sql)
+            except ValueError:
+                continue
+            self.add(question, validated_sql, explanation or "")
+            added += 1
+        logger.info(f"유사 질문 캐시 초기화: {added}개")
+    
+    def _words(self, question: str) -> List[str]:
+        """요청 표현을 빼고 영문 컬럼명은 한국어 설명으로 바꾼 뒤 조사/접미사를 뗀 단어 목록"""
+        return [
+            _PARTICLE_RE.sub("", self.vocabulary.get(word, word))
+            for word in _WORD_RE.findall(normalize_question(question))
+            if word not in _FILLER_WORDS
+        ]
+    
+    def _vectorize(self, question: str) -> np.ndarray:
+        """문자 n-gram 해시 벡터 (요청 표현/조사/공백 제거, 로그 빈도, L2 정규화)"""
+        compact = "".join(self._words(question))
+        vector = np.zeros(_VECTOR_DIM, dtype=np.float32)
+        for size in _NGRAM_SIZES:
+            for index in range(len(compact) - size + 1):
+                gram = compact[index:index + size].encode("utf-8")
+                vector[zlib.crc32(gram) % _VECTOR_DIM] += 1.0
+        np.log1p(vector, out=vector)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def _key_terms(self, question: str) -> Set[str]:
+        """
+        SQL 재사용 시 같아야 하는 단어 집합
+        
+        n-gram 점수는 "월별"과 "분기별", "온라인"과 "오프라인"처럼 긴 질문 속 한 단어 차이를
+        거의 반영하지 못하므로 요청 표현을 뺀 모든 단어(숫자, 집계 단위, 지표, 컬럼, 조건)와
+        질문에 포함된 차원 값을 비교합니다.
+        """
+        normalized = normalize_question(question)
+        terms = {word for word in self._words(question) if word}
+        terms.update(value for value in self.dimension_values if value in normalized)
+        return terms
+    
+    def _update_schema(self, schema_info: Dict[str, Any]) -> None:
+        """스키마 버전이 바뀌면 어휘/차원 값을 다시 만들고 저장된 질문을 재벡터화"""
+        version = schema_info.get("version")
+        if version is not None and version == self._schema_version:
+            return
+        vocabulary = {}
+        for table in schema_info["tables"].values():
+            for column in table["columns"]:
+                description = (column.get("description") or "").split(" (")[0]
+                if description and description != "컬럼 설명 없음":
+                    vocabulary[column["name"].lower()] = normalize_question(description).replace(" ", "")
+        dimension_values = {
+            normalize_question(value)
+            for columns in (schema_info.get("dimension_values") or {}).values()
+            for values in columns.values()
+            for value in values
+            if len(value) > 1
+        }
+        self.vocabulary = vocabulary
+        self.dimension_values = dimension_values
+        self._schema_version = version
+        for row, (question, _, _) in enumerate(self.entries):
+            self.matrix[row] = self._vectorize(question)
+    
+    def add(self, question: str, sql: str, explanation: str) -> None:
+        """검증된 질문/SQL 쌍 추가 (같은 정규화 질문은 교체)"""
+        if not settings.SEMANTIC_CACHE_ENABLED or self.max_entries <= 0:
+            return
+        key = normalize_question(question)
+        vector = self._vectorize(question)
+        row = self.positions.get(key)
+        if row is None:
+            if len(self.entries) < self.max_entries:
+                row = len(self.entries)
+                if row == len(self.matrix):
+                    # 용량을 두 배로 늘려 추가마다 행렬을 복사하지 않음
+                    grown = np.zeros((min(row * 2, self.max_entries), _VECTOR_DIM), dtype=np.float32)
+                    grown[:row] = self.matrix
+                    self.matrix = grown
+                self.entries.append((question, sql, explanation))
+                self.matrix[row] = vector
+                self.positions[key] = row
+                return
+            row = self._next_row
+            self._next_row = (row + 1) % self.max_entries
+            del self.positions[normalize_question(self.entries[row][0])]
+            self.positions[key] = row
+        self.entries[row] = (question, sql, explanation)
+        self.matrix[row] = vector
+    
+    def search(self, question: str, k: int) -> List[SemanticMatch]:
+        """코사인 유사도 상위 k개 (높은 순)"""
+        if not self.entries or k <= 0:
+            return []
+        scores = self.matrix[:len(self.entries)] @ self._vectorize(question)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [SemanticMatch(*self.entries[row], float(scores[row])) for row in top]
+    
+    def lookup(self, question: str, schema_info: Dict[str, Any]) -> Tuple[Optional[SemanticMatch], List[SemanticMatch]]:
+        """
+        유사 질문 조회
+        
+        Returns:
+            (SQL을 그대로 쓸 일치 항목 또는 None, few-shot 예제 목록)
+        """
+        if not settings.SEMANTIC_CACHE_ENABLED:
+            return None, []
+        self._update_schema(schema_info)
+        matches = [
+            match for match in self.search(question, settings.SEMANTIC_CACHE_EXAMPLES)
+            if match.score >= settings.SEMANTIC_CACHE_EXAMPLE_THRESHOLD
+        ]
+        if matches and matches[0].score >= settings.SEMANTIC_CACHE_HIT_THRESHOLD:
+            if self._key_terms(matches[0].question) == self._key_terms(question):
+                self.stats["hits"] += 1
+                return matches[0], []
+            self.stats["guarded"] += 1
+        self.stats["examples" if matches else "misses"] += 1
+        return None, matches
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """일치/예제/미스 횟수와 저장된 질문 수"""
+        total = self.stats["hits"] + self.stats["examples"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "hit_ratio": self.stats["hits"] / total if total else 0.0
+        }
@@ -1,118 +1,375 @@
 import sqlglot
 from sqlglot import parse_one, exp
-from typing import List, Optional
+from sqlglot.optimizer.normalize_identifiers import normalize_identifiers
+from collections import OrderedDict
+from typing import Any, List, Optional, Set, Tuple
+from decimal import Decimal
+import hashlib
 import logging
+import re
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# 검증된 SQL → (지문, 참조 테이블) (검증 시 이미 파싱한 트리로 계산해 재파싱을 생략)
+_ANALYSIS_MEMO_SIZE = 1024
+_analysis_memo: "OrderedDict[str, Tuple[str, List[str]]]" = OrderedDict()
+
+# (SQL 해시, 최대 행 수) → 검증된 SQL (원문과 검증 결과 모두 키로 기록)
+_VALIDATION_MEMO_SIZE = 1024
+_validation_memo: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+
+# INTERVAL '3' MONTHS -> INTERVAL '3 months' (MONTHS/YEARS/DAYS/WEEKS)
+_INTERVAL_UNIT_RE = re.compile(r"INTERVAL\s*'(\d+)'\s*(MONTH|YEAR|DAY|WEEK)S", re.IGNORECASE)
+
+# SELECT 외 문장과 행 잠금 (트리 어디에 있어도 거부, 파싱되지 않는 문장은 exp.Command)
+_FORBIDDEN_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Drop, exp.Create, exp.Alter,
+    exp.TruncateTable, exp.Grant, exp.Command, exp.Into, exp.Lock
+)
+
+# 검증된 SQL → (파라미터화된 SQL, 바인드 값)
+_PARAMETERIZE_MEMO_SIZE = 1024
+_parameterize_memo: "OrderedDict[str, Tuple[str, List[Any]]]" = OrderedDict()
+
+# 리터럴을 바인드 파라미터로 바꿔도 타입이 추론되는 위치
+_LIFTABLE_COMPARISONS = (exp.EQ, exp.NEQ, exp.GT, exp.GTE, exp.LT, exp.LTE, exp.Like, exp.ILike)
+_LIFTABLE_PARENTS = (exp.In, exp.Between, exp.Limit, exp.Offset)
+
+def _is_liftable(literal: exp.Literal) -> bool:
+    parent = literal.parent
+    if isinstance(parent, _LIFTABLE_COMPARISONS):
+        other = parent.right if literal is parent.left else parent.left
+        return not isinstance(other, exp.Literal)
+    return isinstance(parent, _LIFTABLE_PARENTS)
+
+def _literal_value(literal: exp.Literal) -> Any:
+    if literal.is_string:
+        return literal.this
+    if literal.is_int:
+        return int(literal.this)
+    return Decimal(literal.this)
+
+def _flatten_connector(node: exp.Expression, connector: type) -> List[exp.Expression]:
+    """같은 종류의 AND/OR 체인을 괄호까지 풀어서 피연산자 목록으로 변환"""
+    if isinstance(node, exp.Paren) and isinstance(node.this, connector):
+        return _flatten_connector(node.this, connector)
+    if isinstance(node, connector):
+        return _flatten_connector(node.left, connector) + _flatten_connector(node.right, connector)
+    return [node]
+
+def _sort_commutative(node: exp.Expression) -> exp.Expression:
+    """AND/OR 피연산자와 =, <> 양변을 정렬 (하위 노드부터)"""
+    for key, child in list(node.args.items()):
+        if isinstance(child, exp.Expression):
+            node.set(key, _sort_commutative(child))
+        elif isinstance(child, list):
+            node.set(key, [_sort_commutative(c) if isinstance(c, exp.Expression) else c for c in child])
+    
+    if isinstance(node, (exp.And, exp.Or)):
+        connector = type(node)
+        operands = sorted(_flatten_connector(node, connector), key=lambda e: e.sql(dialect="postgres"))
+        combine = exp.and_ if connector is exp.And else exp.or_
+        return combine(*operands, copy=False)
+    
+    if isinstance(node, (exp.EQ, exp.NEQ)):
+        left, right = node.left, node.right
+        if left.sql(dialect="postgres") > right.sql(dialect="postgres"):
+            node.set("this", right)
+            node.set("expression", left)
+    
+    return node
+
+def _normalize_table_aliases(tree: exp.Expression) -> None:
+    """
+    테이블 별칭을 테이블명 기반 정규 이름으로 치환
+    
+    별칭이 여러 스코프에서 재사용되거나 서브쿼리/CTE 별칭과 겹치는 등
+    일관된 치환이 보장되지 않으면 그대로 둡니다.
+    """
+    alias_map = {}
+    usage = {}
+    tables = list(tree.find_all(exp.Table))
+    for table in tables:
+        name = table.name
+        key = table.alias_or_name
+        if key in alias_map:
+            return
+        index = usage.get(name, 0)
+        usage[name] = index + 1
+        alias_map[key] = name if index == 0 else f"{name}_{index}"
+    
+    # 서브쿼리/CTE 별칭과 충돌하면 치환하지 않음
+    other_aliases = {
+        alias.name for alias in tree.find_all(exp.TableAlias)
+        if not isinstance(alias.parent, exp.Table)
+    }
+    if other_aliases & (set(alias_map) | set(alias_map.values())):
+        return
+    
+    for table in tables:
+        table.set("alias", exp.TableAlias(this=exp.to_identifier(alias_map[table.alias_or_name])))
+    for column in tree.find_all(exp.Column):
+        if column.table in alias_map:
+            column.set("table", exp.to_identifier(alias_map[column.table]))
+
+def canonicalize_sql(parsed: exp.Expression) -> str:
+    """
+    의미가 같은 SQL이 같은 문자열이 되도록 정규화
+    
+    식별자 대소문자, 테이블 별칭, 공백/키워드 표기, AND/OR 및 등호 피연산자
+    순서를 정규화합니다. 리터럴과 출력 컬럼 별칭은 결과에 영향을 주므로 유지합니다.
+    """
+    tree = normalize_identifiers(parsed.copy(), dialect="postgres")
+    _normalize_table_aliases(tree)
+    tree = _sort_commutative(tree)
+    return tree.sql(dialect="postgres")
+
+def _sql_hash(sql: str) -> str:
+    return hashlib.blake2b(sql.encode("utf-8"), digest_size=16).hexdigest()
+
+def _remember_validation(key: Tuple[str, int], cleaned_sql: str) -> None:
+    _validation_memo[key] = cleaned_sql
+    _validation_memo.move_to_end(key)
+    while len(_validation_memo) > _VALIDATION_MEMO_SIZE:
+        _validation_memo.popitem(last=False)
+
+def _remember_analysis(sql: str, analysis: Tuple[str, List[str]]) -> None:
+    _analysis_memo[sql] = analysis
+    _analysis_memo.move_to_end(sql)
+    while len(_analysis_memo) > _ANALYSIS_MEMO_SIZE:
+        _analysis_memo.popitem(last=False)
+
+class UnpageableQueryError(ValueError):
+    """페이지 간 행 순서를 정할 수 없는 SQL (결과 커서를 발급하지 않음)"""
+
 class SQLGuardrails:
     """SQL 보안 가드레일"""
     
     def __init__(self):
-        self.forbidden_keywords = [
-            'INSERT', 'UPDATE', 'DELETE', 'DROP', 'CREATE', 'ALTER', 
-            'TRUNCATE', 'GRANT', 'REVOKE', 'EXECUTE', 'EXEC'
-        ]
         self.allowed_tables = settings.ALLOWED_TABLES
+        self.allowed_table_set = {table.lower() for table in self.allowed_tables}
         self.max_rows = settings.MAX_QUERY_ROWS
     
-    async def validate_and_clean_sql(self, sql: str) -> str:
+    async def validate_and_clean_sql(self, sql: str, max_rows: Optional[int] = None) -> str:
         """
         SQL 검증 및 정리
         
+        문장 종류와 테이블 허용 목록을 트리 한 번 순회로 검사하고 LIMIT을 적용합니다.
+        결과는 SQL 해시 기준으로 메모이즈되며 정리된 SQL도 같은 결과로 기록되므로,
+        채팅에서 검증된 SQL을 다운로드에서 다시 검증할 때는 파싱하지 않습니다.
+        
         Args:
             sql: 원본 SQL 쿼리
-            
+            max_rows: 최대 행 수 (기본값: MAX_QUERY_ROWS, 승인된 대량 내보내기에서만 변경)
+        
         Returns:
             정리된 SQL 쿼리
         """
+        max_rows = max_rows or self.max_rows
+        key = (_sql_hash(sql), max_rows)
+        cleaned_sql = _validation_memo.get(key)
+        if cleaned_sql is not None:
+            _validation_memo.move_to_end(key)
+            return cleaned_sql
+        
         try:
             # INTERVAL 구문 수정
-            sql = self._fix_interval_syntax(sql)
+            fixed_sql = self._fix_interval_syntax(sql)
             
             # SQL 파싱
-            parsed = parse_one(sql, dialect="postgres")
-            
-            # 보안 검증
-            self._validate_security(parsed)
+            parsed = parse_one(fixed_sql, dialect="postgres")
             
-            # 테이블 허용 목록 검증
-            self._validate_tables(parsed)
+            # 문장 종류/테이블 허용 목록 검증 (한 번 순회)
+            tables = self._validate_tree(parsed)
             
             # LIMIT 추가/수정
-            cleaned_sql = self._add_limit(parsed)
+            cleaned_sql = self._add_limit(parsed, max_rows)
             
-            return cleaned_sql
+            # 결과 캐시 키/태그로 쓰일 지문과 참조 테이블을 파싱된 트리로 미리 계산
+            _remember_analysis(cleaned_sql, self._analyze_tree(parsed, tables))
             
         except Exception as e:
             logger.error(f"SQL 검증 실패: {e}")
             raise ValueError(f"SQL 검증 실패: {str(e)}")
+        
+        _remember_validation(key, cleaned_sql)
+        _remember_validation((_sql_hash(cleaned_sql), max_rows), cleaned_sql)
+        return cleaned_sql
     
     def _fix_interval_syntax(self, sql: str) -> str:
-        """INTERVAL 구문 수정"""
-        import re
+        """INTERVAL 구문 수정 (INTERVAL '3' MONTHS -> INTERVAL '3 months')"""
+        return _INTERVAL_UNIT_RE.sub(
+            lambda match: f"INTERVAL '{match.group(1)} {match.group(2).lower()}s'",
+            sql
+        )
+    
+    def _validate_tree(self, parsed_sql) -> Set[str]:
+        """
+        SELECT 문 여부와 테이블 허용 목록을 한 번의 순회로 검증
         
-        # INTERVAL '3' MONTHS -> INTERVAL '3 months'
-        sql = re.sub(r"INTERVAL\s+'(\d+)'\s+MONTHS", r"INTERVAL '\1 months'", sql, flags=re.IGNORECASE)
-        sql = re.sub(r"INTERVAL\s+'(\d+)'\s+YEARS", r"INTERVAL '\1 years'", sql, flags=re.IGNORECASE)
-        sql = re.sub(r"INTERVAL\s+'(\d+)'\s+DAYS", r"INTERVAL '\1 days'", sql, flags=re.IGNORECASE)
-        sql = re.sub(r"INTERVAL\s+'(\d+)'\s+WEEKS", r"INTERVAL '\1 weeks'", sql, flags=re.IGNORECASE)
+        Returns:
+            참조 테이블명 집합 (소문자)
+        """
+        if not isinstance(parsed_sql, exp.Select):
+            raise ValueError("SELECT 문만 허용됩니다")
         
-        # 디버깅을 위한 로그 추가
-        logger.info(f"INTERVAL 수정 전: {sql}")
+        tables = set()
+        for node in parsed_sql.walk():
+            if isinstance(node, exp.Table):
+                table = node.name.lower()
+                if table not in self.allowed_table_set:
+                    raise ValueError(f"허용되지 않은 테이블: {table}")
+                tables.add(table)
+            elif isinstance(node, _FORBIDDEN_NODES):
+                raise ValueError(f"금지된 구문 사용: {node.key.upper()}")
+        return tables
+    
+    def _add_limit(self, parsed_sql, max_rows: int) -> str:
+        """LIMIT 절 추가/수정 (기존 LIMIT이 더 작으면 유지)"""
+        limit_expr = parsed_sql.args.get("limit")
+        if limit_expr is not None:
+            value = limit_expr.expression
+            if isinstance(value, exp.Literal) and value.is_int:
+                max_rows = min(int(value.this), max_rows)
         
-        # 더 구체적인 패턴으로 수정
-        sql = re.sub(r"INTERVAL\s*'(\d+)'\s*MONTHS", r"INTERVAL '\1 months'", sql, flags=re.IGNORECASE)
-        sql = re.sub(r"INTERVAL\s*'(\d+)'\s*YEARS", r"INTERVAL '\1 years'", sql, flags=re.IGNORECASE)
-        sql = re.sub(r"INTERVAL\s*'(\d+)'\s*DAYS", r"INTERVAL '\1 days'", sql, flags=re.IGNORECASE)
-        sql = re.sub(r"INTERVAL\s*'(\d+)'\s*WEEKS", r"INTERVAL '\1 weeks'", sql, flags=re.IGNORECASE)
+        parsed_sql.limit(max_rows, copy=False)
         
-        logger.info(f"INTERVAL 수정 후: {sql}")
+        return parsed_sql.sql(dialect="postgres")
+    
+    def cap_limit(self, sql: str, max_rows: int) -> str:
+        """검증된 SQL의 LIMIT을 max_rows 이하로 축소"""
+        return self._add_limit(parse_one(sql, dialect="postgres"), max_rows)
+    
+    def paginate_sql(self, sql: str, offset: int, limit: int) -> Optional[str]:
+        """
+        검증된 SQL의 [offset, offset + limit) 구간만 읽는 SQL 생성
         
-        return sql
+        원래 LIMIT을 넘는 구간은 잘라내고, 기존 ORDER BY 뒤에 전체 순서를 정하는
+        정렬 키를 덧붙여 페이지 간 행이 중복되거나 빠지지 않도록 합니다.
+        
+        Returns:
+            페이지 SQL (원래 LIMIT 밖이면 None)
+        
+        Raises:
+            UnpageableQueryError: 전체 순서를 정할 수 없음 (_total_order_keys 참고)
+        """
+        parsed = parse_one(sql, dialect="postgres")
+        
+        limit_expr = parsed.args.get("limit")
+        if limit_expr is not None:
+            value = limit_expr.expression
+            if isinstance(value, exp.Literal) and value.is_int:
+                remaining = int(value.this) - offset
+                if remaining <= 0:
+                    return None
+                limit = min(limit, remaining)
+        
+        offset_expr = parsed.args.get("offset")
+        if offset_expr is not None:
+            value = offset_expr.expression
+            if not (isinstance(value, exp.Literal) and value.is_int):
+                raise ValueError("페이지 처리할 수 없는 OFFSET입니다")
+            offset += int(value.this)
+        
+        parsed.order_by(*self._total_order_keys(parsed), copy=False)
+        parsed.limit(limit, copy=False)
+        if offset:
+            parsed.offset(offset, copy=False)
+        return parsed.sql(dialect="postgres")
     
-    def _validate_security(self, parsed_sql):
-        """보안 검증"""
-        sql_str = parsed_sql.sql().upper()
+    def _total_order_keys(self, parsed: exp.Select) -> List[exp.Expression]:
+        """
+        기존 ORDER BY 뒤에 붙일 동순위 해소 키
         
-        # 금지된 키워드 검사
-        for keyword in self.forbidden_keywords:
-            if keyword in sql_str:
-                raise ValueError(f"금지된 키워드 사용: {keyword}")
+        출력 컬럼 전체(순번)로 정렬하면 값이 완전히 같은 행끼리만 순서가 남으므로
+        어느 페이지에 들어가도 결과가 같습니다. SELECT *는 출력 컬럼 수를 모르므로
+        FROM/JOIN 원천별 행 전체(ROW(alias.*))로 정렬하고, 이때 GROUP BY/DISTINCT가
+        있으면 원천 행으로 정렬할 수 없어 UnpageableQueryError를 발생시킵니다.
+        """
+        # * 또는 alias.*만 해당 (COUNT(*) 같은 집계 인자는 출력 컬럼 하나)
+        has_star = any(
+            isinstance(e, exp.Star) or (isinstance(e, exp.Column) and isinstance(e.this, exp.Star))
+            for e in parsed.expressions
+        )
+        if not has_star:
+            return [exp.Literal.number(i) for i in range(1, len(parsed.expressions) + 1)]
         
-        # SELECT 문만 허용
-        if not isinstance(parsed_sql, exp.Select):
-            raise ValueError("SELECT 문만 허용됩니다")
+        if parsed.args.get("group") is not None or parsed.args.get("distinct") is not None:
+            raise UnpageableQueryError("GROUP BY/DISTINCT와 *를 함께 쓴 결과는 페이지로 나눌 수 없습니다")
+        from_ = parsed.args.get("from")
+        sources = ([from_.this] if from_ is not None else []) + [join.this for join in parsed.args.get("joins") or []]
+        if not sources or not all(source.alias_or_name for source in sources):
+            raise UnpageableQueryError("행 순서를 정할 수 없는 결과는 페이지로 나눌 수 없습니다")
+        return [
+            exp.Anonymous(this="ROW", expressions=[exp.Column(this=exp.Star(), table=exp.to_identifier(source.alias_or_name))])
+            for source in sources
+        ]
     
-    def _validate_tables(self, parsed_sql):
-        """테이블 허용 목록 검증"""
-        tables = set()
+    def parameterize_sql(self, sql: str) -> Tuple[str, List[Any]]:
+        """
+        비교/IN/BETWEEN/LIMIT 위치의 리터럴을 $n 바인드 파라미터로 치환
+        
+        값만 다른 같은 모양의 질문이 하나의 준비된 문장(실행 계획)을 공유하도록
+        합니다. 타입을 추론할 수 없는 위치(SELECT 목록, ORDER BY 순번, INTERVAL,
+        CAST 등)의 리터럴은 그대로 둡니다.
         
-        # FROM 절의 테이블들
-        for from_expr in parsed_sql.find_all(exp.Table):
-            tables.add(from_expr.name.lower())
+        Returns:
+            (파라미터화된 SQL, 바인드 값 목록)
+        """
+        memo = _parameterize_memo.get(sql)
+        if memo is not None:
+            return memo
         
-        # JOIN 절의 테이블들
-        for join_expr in parsed_sql.find_all(exp.Join):
-            if hasattr(join_expr, 'this') and hasattr(join_expr.this, 'name'):
-                tables.add(join_expr.this.name.lower())
+        tree = parse_one(sql, dialect="postgres")
+        params = []
+        for literal in list(tree.find_all(exp.Literal)):
+            if not _is_liftable(literal):
+                continue
+            params.append(_literal_value(literal))
+            literal.replace(exp.Parameter(this=exp.Literal.number(len(params))))
         
-        # 허용되지 않은 테이블 검사
-        for table in tables:
-            if table not in [t.lower() for t in self.allowed_tables]:
-                raise ValueError(f"허용되지 않은 테이블: {table}")
+        memo = (tree.sql(dialect="postgres"), params)
+        _parameterize_memo[sql] = memo
+        while len(_parameterize_memo) > _PARAMETERIZE_MEMO_SIZE:
+            _parameterize_memo.popitem(last=False)
+        return memo
     
-    def _add_limit(self, parsed_sql) -> str:
-        """LIMIT 절 추가/수정"""
-        # 기존 LIMIT 제거
-        for limit_expr in parsed_sql.find_all(exp.Limit):
-            limit_expr.pop()
+    def fingerprint_sql(self, sql: str) -> str:
+        """
+        SQL 정규화 지문 반환 (결과 캐시 키)
+        
+        검증 단계에서 계산된 값이 있으면 재사용하고, 없으면 파싱해서 계산합니다.
+        파싱할 수 없으면 공백만 정규화한 문자열의 해시를 사용합니다.
+        """
+        return self._analyze(sql)[0]
+    
+    def referenced_tables(self, sql: str) -> List[str]:
+        """SQL이 읽는 테이블 목록 반환 (캐시 태그)"""
+        return self._analyze(sql)[1]
+    
+    def _analyze(self, sql: str) -> Tuple[str, List[str]]:
+        """메모이즈된 (지문, 참조 테이블) 조회"""
+        analysis = _analysis_memo.get(sql)
+        if analysis is not None:
+            return analysis
         
-        # 새로운 LIMIT 추가
-        parsed_sql.limit(self.max_rows)
+        try:
+            analysis = self._analyze_tree(parse_one(sql, dialect="postgres"))
+        except Exception as e:
+            logger.warning(f"SQL 정규화 실패, 원문 기준 지문 사용: {e}")
+            fingerprint = hashlib.sha256(" ".join(sql.split()).encode("utf-8")).hexdigest()
+            analysis = (fingerprint, [])
         
-        return parsed_sql.sql()
+        _remember_analysis(sql, analysis)
+        return analysis
+    
+    def _analyze_tree(self, parsed, tables: Optional[Set[str]] = None) -> Tuple[str, List[str]]:
+        """파싱된 트리의 정규화 지문과 참조 테이블 (검증 시 모은 테이블이 있으면 재사용)"""
+        fingerprint = hashlib.sha256(canonicalize_sql(parsed).encode("utf-8")).hexdigest()
+        if tables is None:
+            tables = {table.name.lower() for table in parsed.find_all(exp.Table)}
+        return fingerprint, sorted(tables)
     
     def estimate_query_cost(self, sql: str) -> dict:
         """쿼리 비용 추정"""
@@ -1,13 +1,24 @@
 import openai
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from typing import Dict, List, Any, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Any, Optional, Sequence, Tuple
+import asyncio
+import base64
 import json
 import logging
-from datetime import date, datetime
 from app.core.config import settings
-from app.services.sql_guardrails import SQLGuardrails
+from app.services.sql_guardrails import SQLGuardrails, UnpageableQueryError
 from app.services.schema_service import SchemaService
+from app.services.prompt_renderer import SchemaPromptRenderer
+from app.services.schema_index import SchemaIndex
+from app.services.semantic_cache import SemanticMatch, SemanticQuestionCache
+from app.services.query_cache_service import QueryCacheService
+from app.services.query_engine import AnalyticQueryEngine, run_with_timeout
+from app.services.cost_gate import QueryCostGate
+from app.services.rollup_service import RollupService
+from app.services.result_encoding import (
+    column_type_codes, columns_from_rows, convert_columns, resolve_converters, rows_from_columns
+)
 
 logger = logging.getLogger(__name__)
 
@@ -19,24 +30,35 @@ class TextToSQLService:
         self.openai_client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY) if self.has_openai else None
         self.guardrails = SQLGuardrails()
         self.schema_service = SchemaService()
+        self.prompt_renderer = SchemaPromptRenderer()
+        self.schema_index: Optional[SchemaIndex] = None
+        self.query_cache = QueryCacheService()
+        self.query_engine = AnalyticQueryEngine()
+        self.cost_gate = QueryCostGate(self.query_engine, self.query_cache.cache)
+        self.rollups = RollupService()
+        self.semantic_cache = SemanticQuestionCache(self.guardrails)
     
     async def generate_sql(self, question: str, session: AsyncSession) -> Tuple[str, str]:
         """
         자연어 질문을 SQL로 변환
+        
+        유사 질문 캐시에 충분히 가까운 질문이 있으면 LLM 없이 그 SQL을 쓰고,
+        덜 가까운 질문들은 few-shot 예제로 프롬프트에 넣습니다.
         """
         try:
             # 스키마 정보 가져오기
             schema_info = await self.schema_service.get_schema_info(session)
             
+            match, examples = self.semantic_cache.lookup(question, schema_info)
+            if match:
+                logger.info(f"유사 질문 캐시 히트 ({match.score:.3f}): {match.question[:50]}")
+                return await self.guardrails.validate_and_clean_sql(match.sql), match.explanation
+            
             # OpenAI 사용 가능하면 호출, 아니면 폴백 로직 사용
             if self.has_openai:
-                prompt = self._create_prompt(question, schema_info)
                 response = await self.openai_client.chat.completions.create(
                     model=settings.OPENAI_MODEL,
-                    messages=[
-                        {"role": "system", "content": self._get_system_prompt()},
-                        {"role": "user", "content": prompt}
-                    ],
+                    messages=self._build_messages(question, schema_info, examples=examples),
                     max_tokens=settings.OPENAI_MAX_TOKENS,
                     temperature=settings.OPENAI_TEMPERATURE
                 )
@@ -52,7 +74,90 @@ class TextToSQLService:
         except Exception as e:
             logger.error(f"SQL 생성 실패: {e}")
             raise
-
+    
+    def remember_sql(self, question: str, sql: str, explanation: str) -> None:
+        """
+        실행에 성공한 질문/SQL 쌍을 유사 질문 캐시에 추가
+        
+        실행 전에 넣으면 실행이 실패하는 SQL도 비슷한 질문의 캐시 히트가 되므로
+        라우터가 결과를 받은 뒤 호출합니다. 폴백 SQL은 학습하지 않습니다.
+        """
+        if self.has_openai:
+            self.semantic_cache.add(question, sql, explanation)
+    
+    async def generate_sql_stream(self, question: str, session: AsyncSession) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        자연어 질문을 SQL로 변환하며 설명 토큰을 스트리밍
+        
+        설명이 먼저 오도록 응답 형식을 바꿔 요청하고, LLM 응답이 도착하는 대로
+        설명 부분만 잘라서 내보냅니다.
+        
+        Yields:
+            ("token", 설명 조각) 반복 후 마지막에 ("done", (validated_sql, explanation))
+        """
+        try:
+            schema_info = await self.schema_service.get_schema_info(session)
+            
+            match, examples = self.semantic_cache.lookup(question, schema_info)
+            if match:
+                logger.info(f"유사 질문 캐시 히트 ({match.score:.3f}): {match.question[:50]}")
+                yield "token", match.explanation
+                yield "done", (await self.guardrails.validate_and_clean_sql(match.sql), match.explanation)
+                return
+            
+            if self.has_openai:
+                stream = await self.openai_client.chat.completions.create(
+                    model=settings.OPENAI_MODEL,
+                    messages=self._build_messages(question, schema_info, explanation_first=True, examples=examples),
+                    max_tokens=settings.OPENAI_MAX_TOKENS,
+                    temperature=settings.OPENAI_TEMPERATURE,
+                    stream=True
+                )
+                content = ""
+                emitted = 0
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    content += chunk.choices[0].delta.content or ""
+                    partial = self._partial_explanation(content)
+                    if len(partial) > emitted:
+                        yield "token", partial[emitted:]
+                        emitted = len(partial)
+                partial = self._partial_explanation(content, final=True)
+                if len(partial) > emitted:
+                    yield "token", partial[emitted:]
+                sql_query, explanation = self._parse_response(content)
+            else:
+                sql_query, explanation = self._fallback_sql(question)
+                yield "token", explanation
+            
+            validated_sql = await self.guardrails.validate_and_clean_sql(sql_query)
+            yield "done", (validated_sql, explanation)
+            
+        except Exception as e:
+            logger.error(f"SQL 생성 실패: {e}")
+            raise
+    
+    def _partial_explanation(self, content: str, final: bool = False) -> str:
+        """
+        스트리밍 중인 응답에서 지금까지 도착한 설명 부분 추출
+        
+        설명은 "설명:" 다음부터 "SQL:" 또는 코드 블록 시작 전까지입니다.
+        종료 표시가 아직 없으면 표시 일부가 섞이지 않도록 끝 몇 글자를 보류합니다.
+        """
+        start = content.find("설명:")
+        if start < 0:
+            return ""
+        start += len("설명:")
+        ends = [index for index in (content.find("SQL:", start), content.find("```", start)) if index >= 0]
+        if ends:
+            end = min(ends)
+        elif final:
+            end = len(content)
+        else:
+            end = max(start, len(content) - len("SQL:"))
+        return content[start:end].lstrip()
+    
     def _fallback_sql(self, question: str) -> Tuple[str, str]:
         """OpenAI 키가 없을 때의 안전한 폴백 SQL 생성"""
         q = question.lower()
@@ -95,41 +200,46 @@ class TextToSQLService:
             "ORDER BY d.date DESC"
         )
         return sql, "최근 매출 데이터를 요약해 보여드립니다."
-
-    def _get_system_prompt(self) -> str:
-        """시스템 프롬프트 반환"""
-        return """당신은 PostgreSQL 데이터베이스 전문가입니다. 
-        자연어 질문을 정확한 SQL 쿼리로 변환해야 합니다.
-        
-        규칙:
-        1. SELECT 문만 생성 (INSERT, UPDATE, DELETE 금지)
-        2. LIMIT 절을 항상 포함 (기본값: 1000)
-        3. 명확하고 읽기 쉬운 SQL 작성
-        4. 적절한 JOIN 사용
-        5. 집계 함수 사용 시 GROUP BY 포함
-        6. 한국어로 설명 제공
-        7. PostgreSQL INTERVAL 구문은 반드시 'INTERVAL ''3'' month' 형태 사용 (소문자, 작은따옴표 2개)
-        8. 날짜 계산 시 CURRENT_DATE 사용
-        9. INTERVAL 구문 예시: INTERVAL '3' month, INTERVAL '1' year, INTERVAL '7' day
-                
-        응답 형식:
-        SQL: [SQL 쿼리]
-        설명: [한국어 설명]"""
     
-    def _create_prompt(self, question: str, schema_info: Dict[str, Any]) -> str:
-        """프롬프트 생성"""
-        # 스키마 정보를 JSON 직렬화 가능한 형태로 변환
-        serializable_schema = self._make_serializable(schema_info)
+    def _build_messages(self, question: str, schema_info: Dict[str, Any], explanation_first: bool = False,
+                        examples: Sequence[SemanticMatch] = ()) -> List[Dict[str, str]]:
+        """
+        LLM 메시지 구성
         
-        return f"""다음 데이터베이스 스키마를 기반으로 질문에 답하는 SQL을 작성해주세요:
-
-스키마 정보:
-{json.dumps(serializable_schema, indent=2, ensure_ascii=False)}
-
-질문: {question}
+        시스템 메시지(규칙 + 질문 관련 스키마)는 스키마 버전과 선택된 테이블 조합별로
+        같은 문자열이라 제공자의 프롬프트 캐시가 적용되고, 질문과 응답 형식은 사용자
+        메시지로 보냅니다.
+        """
+        if settings.SCHEMA_PRUNE_ENABLED:
+            schema_info = self._get_schema_index(schema_info).prune(question)
+        return [
+            {"role": "system", "content": self.prompt_renderer.render_prefix(schema_info)},
+            {"role": "user", "content": self._create_prompt(question, explanation_first, examples)}
+        ]
+    
+    def _get_schema_index(self, schema_info: Dict[str, Any]) -> SchemaIndex:
+        """스키마 스냅샷이 바뀔 때만 색인 재구성"""
+        if self.schema_index is None or self.schema_index.schema_info is not schema_info:
+            self.schema_index = SchemaIndex(schema_info)
+        return self.schema_index
+    
+    def _create_prompt(self, question: str, explanation_first: bool = False, examples: Sequence[SemanticMatch] = ()) -> str:
+        """질문별 프롬프트 생성 (explanation_first면 설명을 SQL보다 먼저 요청, 유사 질문은 예제로)"""
+        if explanation_first:
+            response_format = "설명: [한국어 설명]\nSQL: [SQL 쿼리]"
+        else:
+            response_format = "SQL: [SQL 쿼리]\n설명: [한국어 설명]"
+        few_shot = ""
+        if examples:
+            pairs = "\n".join(f"-- Q: {example.question}\n{' '.join(example.sql.split())};" for example in examples)
+            few_shot = f"비슷한 과거 질문과 SQL:\n{pairs}\n\n"
+        return f"""{few_shot}질문: {question}
 
-위 스키마를 사용하여 정확한 SQL 쿼리를 작성하고, 한국어로 간단히 설명해주세요."""
+위 스키마를 사용하여 정확한 SQL 쿼리를 작성하고, 한국어로 간단히 설명해주세요.
 
+응답 형식:
+{response_format}"""
+    
     def _parse_response(self, content: str) -> Tuple[str, str]:
         """OpenAI 응답 파싱"""
         lines = content.strip().split('\n')
@@ -162,50 +272,176 @@ class TextToSQLService:
         
         return sql_query, explanation
     
-    async def execute_sql(self, sql: str, session: AsyncSession) -> Tuple[List[Dict[str, Any]], List[str]]:
+    async def execute_sql(self, sql: str, session: AsyncSession, use_cache: bool = True) -> Tuple[List[Dict[str, Any]], List[str], bool]:
         """
         SQL 실행
         
+        결과 캐시를 먼저 확인합니다. 캐시 키는 정규화된 AST 지문이므로
+        별칭/공백/키워드 대소문자/조건 순서만 다른 SQL은 결과를 공유합니다.
+        
         Args:
             sql: 실행할 SQL 쿼리
             session: 데이터베이스 세션
-            
+            use_cache: 결과 캐시 사용 여부
+        
+        Returns:
+            (rows, columns, cached): 결과 행들, 컬럼명들, 캐시 사용 여부
+        """
+        columns, values, cached, _ = await self.execute_columns(sql, session, use_cache)
+        return rows_from_columns(columns, values), columns, cached
+    
+    async def execute_columns(self, sql: str, session: AsyncSession, use_cache: bool = True) -> Tuple[List[str], List[List[Any]], bool, Optional[int]]:
+        """
+        SQL 실행 (컬럼별 배열로 반환)
+        
+        행별 dict를 만들지 않으므로 컬럼형 응답과 결과 캐시에 그대로 쓰입니다.
+        비용 점검으로 LIMIT이 축소된 결과는 원문 SQL의 결과가 아니므로 캐시하지 않습니다.
+        
         Returns:
-            (rows, columns): 결과 행들과 컬럼명들
+            (columns, values, cached, row_limit): 컬럼명들, 컬럼별 값 배열, 캐시 사용 여부,
+            LIMIT이 축소되었으면 적용된 행 한도 (아니면 None)
         """
+        if use_cache:
+            cached_result = await self.query_cache.get_result(sql)
+            if cached_result:
+                columns, values = cached_result
+                return columns, values, True, None
+        
         try:
-            result = await session.execute(text(sql))
-            rows = []
-            for row in result.fetchall():
-                row_dict = {}
-                for key, value in row._mapping.items():
-                    row_dict[key] = self._serialize_for_json(value)
-                rows.append(row_dict)
-            columns = list(result.keys()) if result.keys() else []
+            # 적합한 집계는 롤업으로 재작성한 뒤 EXPLAIN 비용 점검 (LIMIT 축소/대기열/거부)
+            # 결과 캐시 키는 원문 SQL 기준
+            planned_sql = self.rollups.rewrite(sql)
+            async with self.cost_gate.admit(planned_sql, session) as run_sql:
+                row_limit = self._downgraded_limit(planned_sql, run_sql)
+                if settings.ANALYTIC_ENGINE_ENABLED:
+                    columns, values = await run_with_timeout(self.query_engine.fetch_columns(run_sql))
+                else:
+                    result = await run_with_timeout(session.execute(text(run_sql)))
+                    columns = list(result.keys()) if result.keys() else []
+                    type_codes = column_type_codes(result)
+                    values = columns_from_rows(columns, result.fetchall())
+                    # 커서 타입 정보로 컬럼별 변환기를 한 번 정하고 컬럼 단위로 적용
+                    values = convert_columns(values, resolve_converters(values, type_codes))
+            
+            if use_cache and row_limit is None:
+                await self.query_cache.set_result(sql, columns, values)
             
-            return rows, columns
+            return columns, values, False, row_limit
             
         except Exception as e:
             logger.error(f"SQL 실행 실패: {e}")
             raise
     
-    def _serialize_for_json(self, obj):
-        """JSON 직렬화를 위해 날짜/시간 객체와 Decimal 객체를 문자열로 변환"""
-        if isinstance(obj, (date, datetime)):
-            return obj.isoformat()
-        elif hasattr(obj, '__class__') and obj.__class__.__name__ == 'Decimal':
-            return str(obj)
-        return obj
-    
-    def _make_serializable(self, obj):
-        """객체를 JSON 직렬화 가능한 형태로 변환"""
-        if isinstance(obj, dict):
-            return {key: self._make_serializable(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [self._make_serializable(item) for item in obj]
-        elif isinstance(obj, (date, datetime)):
-            return obj.isoformat()
-        elif hasattr(obj, '__class__') and obj.__class__.__name__ == 'Decimal':
-            return str(obj)
-        else:
-            return obj
+    def _downgraded_limit(self, planned_sql: str, run_sql: str) -> Optional[int]:
+        """비용 점검이 LIMIT을 축소했으면 적용된 행 한도 (점검은 LIMIT 축소 외에는 SQL을 바꾸지 않음)"""
+        return settings.QUERY_COST_DOWNGRADE_LIMIT if run_sql != planned_sql else None
+    
+    async def execute_page(self, sql: str, session: AsyncSession, cursor: Optional[str] = None) -> Tuple[List[str], List[List[Any]], bool, Optional[str], Optional[int]]:
+        """
+        SQL 결과의 한 페이지만 실행
+        
+        검증된 SQL에 페이지 범위의 LIMIT/OFFSET을 적용해 실행하므로 응답 크기,
+        직렬화 시간, 결과 캐시 크기가 전체 결과가 아닌 페이지 크기에 비례합니다.
+        
+        Args:
+            sql: 검증된 SQL 쿼리
+            session: 데이터베이스 세션
+            cursor: 이전 페이지에서 받은 커서 (첫 페이지는 None)
+        
+        Returns:
+            (columns, values, cached, next_cursor, row_limit): values는 컬럼별 배열, next_cursor는 마지막 페이지면 None,
+            row_limit은 비용 점검으로 LIMIT이 축소되었을 때의 행 한도
+        """
+        offset = self._decode_cursor(cursor) if cursor else 0
+        page_size = settings.RESULT_PAGE_SIZE
+        
+        # 다음 페이지 존재 여부를 알기 위해 한 행 더 읽음
+        try:
+            page_sql = self.guardrails.paginate_sql(sql, offset, page_size + 1)
+        except UnpageableQueryError:
+            if cursor:
+                raise
+            # 순서를 정할 수 없으면 커서 없이 전체 결과(검증된 LIMIT 이내)를 한 번에 반환
+            columns, values, cached, row_limit = await self.execute_columns(sql, session)
+            return columns, values, cached, None, row_limit
+        if page_sql is None:
+            return [], [], False, None, None
+        
+        columns, values, cached, row_limit = await self.execute_columns(page_sql, session)
+        next_cursor = None
+        if values and len(values[0]) > page_size:
+            values = [column[:page_size] for column in values]
+            next_cursor = self._encode_cursor(offset + page_size)
+        return columns, values, cached, next_cursor, row_limit
+    
+    def _encode_cursor(self, offset: int) -> str:
+        """페이지 위치를 불투명한 커서 문자열로 인코딩"""
+        payload = json.dumps({"o": offset}, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+    
+    def _decode_cursor(self, cursor: str) -> int:
+        """커서 문자열을 페이지 위치로 디코딩"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            offset = json.loads(base64.urlsafe_b64decode(padded))["o"]
+        except Exception:
+            raise ValueError("잘못된 결과 커서입니다")
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError("잘못된 결과 커서입니다")
+        return offset
+    
+    async def stream_sql_rows(self, sql: str, session: AsyncSession) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        SQL 실행 결과를 배치 단위로 스트리밍
+        
+        결과 캐시에 있으면 캐시에서, 없으면 서버 사이드 커서에서 읽는 대로 내보내고
+        끝까지 읽은 결과는 캐시에 저장합니다 (비용 점검으로 LIMIT이 축소된 결과는 제외).
+        
+        Yields:
+            ("columns", {"columns": [...], "cached": bool, "row_limit": int 또는 None}) 후
+            ("rows", [행 dict, ...]) 반복
+        """
+        batch_size = settings.STREAM_ROW_BATCH_SIZE
+        cached_result = await self.query_cache.get_result(sql)
+        if cached_result:
+            columns, values = cached_result
+            rows = rows_from_columns(columns, values)
+            yield "columns", {"columns": columns, "cached": True, "row_limit": None}
+            for index in range(0, len(rows), batch_size):
+                yield "rows", rows[index:index + batch_size]
+            return
+        
+        try:
+            planned_sql = self.rollups.rewrite(sql)
+            async with self.cost_gate.admit(planned_sql, session) as run_sql:
+                row_limit = self._downgraded_limit(planned_sql, run_sql)
+                if settings.ANALYTIC_ENGINE_ENABLED:
+                    result = await run_with_timeout(self.query_engine.stream(run_sql))
+                else:
+                    result = await run_with_timeout(session.stream(text(run_sql)))
+                columns = list(result.keys())
+                yield "columns", {"columns": columns, "cached": False, "row_limit": row_limit}
+                
+                values = [[] for _ in columns]
+                converters = None
+                partitions = result.partitions(batch_size)
+                try:
+                    # 배치(FETCH)마다 실행 시간 한도 적용
+                    while (partition := await run_with_timeout(anext(partitions, None))) is not None:
+                        batch_values = columns_from_rows(columns, partition)
+                        if converters is None:
+                            converters = resolve_converters(batch_values)
+                        batch_values = convert_columns(batch_values, converters)
+                        for column, batch_column in zip(values, batch_values):
+                            column.extend(batch_column)
+                        yield "rows", rows_from_columns(columns, batch_values)
+                finally:
+                    # 클라이언트 연결 끊김으로 취소되어도 커서/연결은 반환
+                    await asyncio.shield(result.close())
+            
+            if row_limit is None:
+                await self.query_cache.set_result(sql, columns, values)
+                
+        except Exception as e:
+            logger.error(f"SQL 실행 실패: {e}")
+            raise
@@ -0,0 +1,125 @@
+"""
+SQL 지문 정규화 검증 코퍼스
+
+동등한 쿼리 쌍은 같은 지문을, 동등하지 않은 쿼리 쌍은 다른 지문을
+가져야 합니다. DB 없이 실행됩니다.
+
+실행 (backend 디렉터리에서):
+    python -m benchmarks.fingerprint_corpus
+"""
+import sys
+
+from app.services.sql_guardrails import SQLGuardrails
+
+EQUIVALENT_PAIRS = [
+    # 별칭 이름
+    (
+        "SELECT f.revenue FROM fact_sales f",
+        "SELECT s.revenue FROM fact_sales AS s",
+    ),
+    # 공백/키워드 대소문자
+    (
+        "SELECT p.category, SUM(f.revenue) AS total_revenue FROM fact_sales f JOIN dim_product p ON f.product_id = p.product_id GROUP BY p.category",
+        "select  p.category,\n  sum(f.revenue) as total_revenue\nfrom fact_sales f\n  join dim_product p on f.product_id = p.product_id\ngroup by p.category",
+    ),
+    # 식별자 대소문자 (따옴표 없는 식별자)
+    (
+        "SELECT Revenue FROM Fact_Sales",
+        "SELECT revenue FROM fact_sales",
+    ),
+    # AND 조건 순서
+    (
+        "SELECT * FROM dim_date d WHERE d.year = 2024 AND d.quarter = 1",
+        "SELECT * FROM dim_date d WHERE d.quarter = 1 AND d.year = 2024",
+    ),
+    # 등호 양변 순서 (JOIN 조건)
+    (
+        "SELECT c.region FROM fact_sales f JOIN dim_customer c ON f.customer_id = c.customer_id",
+        "SELECT c.region FROM fact_sales f JOIN dim_customer c ON c.customer_id = f.customer_id",
+    ),
+    # 중첩 AND 괄호
+    (
+        "SELECT * FROM dim_date WHERE (year = 2024 AND month = 1) AND week = 2",
+        "SELECT * FROM dim_date WHERE week = 2 AND (month = 1 AND year = 2024)",
+    ),
+    # OR 조건 순서
+    (
+        "SELECT * FROM dim_product WHERE category = 'A' OR category = 'B'",
+        "SELECT * FROM dim_product WHERE category = 'B' OR category = 'A'",
+    ),
+    # 별칭 없는 테이블 참조와 별칭 참조
+    (
+        "SELECT fact_sales.quantity FROM fact_sales",
+        "SELECT x.quantity FROM fact_sales x",
+    ),
+]
+
+NON_EQUIVALENT_PAIRS = [
+    # 리터럴 값
+    (
+        "SELECT * FROM dim_product WHERE category = 'A'",
+        "SELECT * FROM dim_product WHERE category = 'a'",
+    ),
+    (
+        "SELECT * FROM dim_date WHERE year = 2023",
+        "SELECT * FROM dim_date WHERE year = 2024",
+    ),
+    # 출력 컬럼 별칭 (결과 키가 달라짐)
+    (
+        "SELECT SUM(revenue) AS total FROM fact_sales",
+        "SELECT SUM(revenue) AS revenue_sum FROM fact_sales",
+    ),
+    # 따옴표 식별자는 대소문자 구분
+    (
+        'SELECT "Revenue" FROM fact_sales',
+        "SELECT revenue FROM fact_sales",
+    ),
+    # 비교 연산 방향
+    (
+        "SELECT * FROM fact_sales WHERE quantity > 2",
+        "SELECT * FROM fact_sales WHERE quantity < 2",
+    ),
+    # AND 와 OR
+    (
+        "SELECT * FROM dim_date WHERE year = 2024 AND month = 1",
+        "SELECT * FROM dim_date WHERE year = 2024 OR month = 1",
+    ),
+    # 정렬 방향
+    (
+        "SELECT category FROM dim_product ORDER BY category",
+        "SELECT category FROM dim_product ORDER BY category DESC",
+    ),
+    # 다른 테이블
+    (
+        "SELECT * FROM dim_product",
+        "SELECT * FROM dim_customer",
+    ),
+    # LIMIT 값
+    (
+        "SELECT * FROM fact_sales LIMIT 10",
+        "SELECT * FROM fact_sales LIMIT 100",
+    ),
+]
+
+
+def main() -> int:
+    guardrails = SQLGuardrails()
+    failures = 0
+    
+    for left, right in EQUIVALENT_PAIRS:
+        if guardrails.fingerprint_sql(left) != guardrails.fingerprint_sql(right):
+            failures += 1
+            print(f"[FAIL] 동등해야 함:\n  {left}\n  {right}")
+    
+    for left, right in NON_EQUIVALENT_PAIRS:
+        if guardrails.fingerprint_sql(left) == guardrails.fingerprint_sql(right):
+            failures += 1
+            print(f"[FAIL] 달라야 함:\n  {left}\n  {right}")
+    
+    total = len(EQUIVALENT_PAIRS) + len(NON_EQUIVALENT_PAIRS)
+    print(f"{total - failures}/{total} 통과")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+SQL 가드레일 검증 처리량 벤치마크
+
+변경 전 검증기(호출마다 정규식 8회, 대문자 SQL 재생성 후 키워드 부분 문자열
+검사, Table/Join 별도 순회)와 현재 검증기(한 번 순회)를 비교합니다.
+현재 검증기는 메모이즈를 비운 상태(cold)와 같은 SQL 반복(warm, 다운로드 재검증
+경로)을 따로 측정합니다. DB 없이 실행됩니다.
+
+실행 (backend 디렉터리에서):
+    python -m benchmarks.guardrail_throughput [반복 횟수]
+"""
+import asyncio
+import logging
+import re
+import sys
+import time
+from typing import Callable, List
+
+from sqlglot import exp, parse_one
+
+from app.core.config import settings
+from app.services import sql_guardrails
+from app.services.sql_guardrails import SQLGuardrails
+
+logger = logging.getLogger("benchmarks.guardrail_throughput")
+
+CORPUS = [
+    "SELECT p.category, SUM(f.revenue) AS total_revenue FROM fact_sales f JOIN dim_product p ON f.product_id = p.product_id JOIN dim_date d ON f.date_key = d.date_key WHERE d.quarter = 4 AND d.year = 2023 GROUP BY p.category ORDER BY total_revenue DESC LIMIT 5",
+    "SELECT c.region, COUNT(*) AS orders FROM fact_sales f JOIN dim_customer c ON f.customer_id = c.customer_id GROUP BY c.region",
+    "SELECT d.month, SUM(f.revenue) FROM fact_sales f JOIN dim_date d ON f.date_key = d.date_key WHERE d.date >= CURRENT_DATE - INTERVAL '3' MONTHS GROUP BY d.month ORDER BY d.month",
+    "SELECT p.product_name, SUM(f.quantity) AS qty FROM fact_sales f JOIN dim_product p ON f.product_id = p.product_id WHERE p.category IN ('전자제품', '오피스') GROUP BY p.product_name ORDER BY qty DESC LIMIT 10",
+    "SELECT * FROM dim_date WHERE year BETWEEN 2022 AND 2024",
+    "SELECT c.segment, AVG(f.revenue) FROM fact_sales f JOIN dim_customer c ON f.customer_id = c.customer_id WHERE f.sale_id IN (SELECT sale_id FROM fact_sales WHERE revenue > 100000) GROUP BY c.segment",
+]
+
+
+class LegacyGuardrails:
+    """변경 전 SQLGuardrails.validate_and_clean_sql 경로"""
+    
+    def __init__(self):
+        self.forbidden_keywords = [
+            'INSERT', 'UPDATE', 'DELETE', 'DROP', 'CREATE', 'ALTER',
+            'TRUNCATE', 'GRANT', 'REVOKE', 'EXECUTE', 'EXEC'
+        ]
+        self.allowed_tables = settings.ALLOWED_TABLES
+        self.max_rows = settings.MAX_QUERY_ROWS
+    
+    def validate(self, sql: str) -> str:
+        sql = self._fix_interval_syntax(sql)
+        parsed = parse_one(sql, dialect="postgres")
+        self._validate_security(parsed)
+        self._validate_tables(parsed)
+        parsed.limit(self.max_rows, copy=False)
+        return parsed.sql()
+    
+    def _fix_interval_syntax(self, sql: str) -> str:
+        for pattern in (r"INTERVAL\s+'(\d+)'\s+", r"INTERVAL\s*'(\d+)'\s*"):
+            for unit in ("MONTHS", "YEARS", "DAYS", "WEEKS"):
+                sql = re.sub(pattern + unit, rf"INTERVAL '\1 {unit.lower()}'", sql, flags=re.IGNORECASE)
+            logger.info(f"INTERVAL 수정: {sql}")
+        return sql
+    
+    def _validate_security(self, parsed_sql):
+        sql_str = parsed_sql.sql().upper()
+        for keyword in self.forbidden_keywords:
+            if keyword in sql_str:
+                raise ValueError(f"금지된 키워드 사용: {keyword}")
+        if not isinstance(parsed_sql, exp.Select):
+            raise ValueError("SELECT 문만 허용됩니다")
+    
+    def _validate_tables(self, parsed_sql):
+        tables = set()
+        for from_expr in parsed_sql.find_all(exp.Table):
+            tables.add(from_expr.name.lower())
+        for join_expr in parsed_sql.find_all(exp.Join):
+            if hasattr(join_expr, 'this') and hasattr(join_expr.this, 'name'):
+                tables.add(join_expr.this.name.lower())
+        for table in tables:
+            if table not in [t.lower() for t in self.allowed_tables]:
+                raise ValueError(f"허용되지 않은 테이블: {table}")
+
+
+async def _throughput(validate: Callable, corpus: List[str], repeat: int, before_each=None) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for sql in corpus:
+            if before_each:
+                before_each()
+            await validate(sql)
+    return repeat * len(corpus) / (time.perf_counter() - start)
+
+
+def _clear_memos() -> None:
+    sql_guardrails._validation_memo.clear()
+    sql_guardrails._analysis_memo.clear()
+
+
+async def _run(repeat: int) -> None:
+    legacy = LegacyGuardrails()
+    guardrails = SQLGuardrails()
+    
+    async def validate_legacy(sql: str) -> None:
+        legacy.validate(sql)
+    
+    async def validate_legacy_with_fingerprint(sql: str) -> None:
+        # 변경 전에도 결과 캐시 키를 위해 실행 시점에 지문을 계산
+        guardrails.fingerprint_sql(legacy.validate(sql))
+    
+    legacy_qps = await _throughput(validate_legacy, CORPUS, repeat)
+    legacy_fp_qps = await _throughput(validate_legacy_with_fingerprint, CORPUS, repeat, before_each=_clear_memos)
+    cold_qps = await _throughput(guardrails.validate_and_clean_sql, CORPUS, repeat, before_each=_clear_memos)
+    warm_qps = await _throughput(guardrails.validate_and_clean_sql, CORPUS, repeat)
+    
+    print(f"legacy (검증만):          {legacy_qps:10.0f} 건/초")
+    print(f"legacy (+ 지문 계산):     {legacy_fp_qps:10.0f} 건/초")
+    print(f"current cold (+ 지문):    {cold_qps:10.0f} 건/초  ({cold_qps / legacy_fp_qps:.1f}x)")
+    print(f"current warm (재검증):    {warm_qps:10.0f} 건/초  ({warm_qps / legacy_fp_qps:.0f}x)")
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    asyncio.run(_run(repeat))
+
+
+if __name__ == "__main__":
+    main()
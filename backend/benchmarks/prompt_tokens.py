@@ -0,0 +1,242 @@
+"""
+스키마 프롬프트 토큰 벤치마크 (JSON 덤프 vs DDL 렌더링, 질문 관련 스키마 선택)
+
+기존 방식(시스템 프롬프트 + 스키마 정보 json.dumps(indent=2)를 질문마다 전송)과
+SchemaPromptRenderer의 DDL 형태 시스템 프롬프트의 토큰 수를 비교하고, 관련 없는
+테이블을 늘려가며 SchemaIndex로 선택한 스키마의 프롬프트 크기를 측정합니다.
+스키마 정보는 database/schema.sql과 SchemaService의 설명/예제로 구성하며 DB 없이
+실행됩니다. tiktoken이 설치되어 있으면 cl100k_base 토큰 수도 함께 출력합니다.
+
+실행 (backend 디렉터리에서):
+    python -m benchmarks.prompt_tokens
+"""
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.prompt_renderer import SchemaPromptRenderer, estimate_tokens
+from app.services.schema_index import SchemaIndex
+from app.services.schema_service import SchemaService
+
+# (컬럼, 타입, PK, FK) - database/schema.sql과 같은 정의
+TABLES = {
+    "dim_date": [
+        ("date_key", "integer", True, None),
+        ("date", "date", False, None),
+        ("year", "integer", False, None),
+        ("quarter", "integer", False, None),
+        ("month", "integer", False, None),
+        ("week", "integer", False, None),
+        ("dow", "integer", False, None),
+    ],
+    "dim_product": [
+        ("product_id", "integer", True, None),
+        ("product_name", "character varying(255)", False, None),
+        ("category", "character varying(100)", False, None),
+        ("subcategory", "character varying(100)", False, None),
+        ("sku", "character varying(50)", False, None),
+    ],
+    "dim_customer": [
+        ("customer_id", "integer", True, None),
+        ("customer_name", "character varying(255)", False, None),
+        ("segment", "character varying(100)", False, None),
+        ("region", "character varying(100)", False, None),
+    ],
+    "fact_sales": [
+        ("sales_id", "integer", True, None),
+        ("date_key", "integer", False, "dim_date.date_key"),
+        ("product_id", "integer", False, "dim_product.product_id"),
+        ("customer_id", "integer", False, "dim_customer.customer_id"),
+        ("quantity", "integer", False, None),
+        ("unit_price", "numeric(10,2)", False, None),
+        ("revenue", "numeric(12,2)", False, None),
+        ("currency", "character varying(3)", False, None),
+        ("created_at", "timestamp without time zone", False, None),
+    ],
+}
+
+SAMPLES = {
+    "dim_date": [
+        {"date_key": 20240101 + i, "date": f"2024-01-0{i + 1}", "year": 2024, "quarter": 1, "month": 1, "week": 1, "dow": i + 1}
+        for i in range(3)
+    ],
+    "dim_product": [
+        {"product_id": 1, "product_name": "노트북 A", "category": "전자제품", "subcategory": "노트북", "sku": "SKU_A"},
+        {"product_id": 2, "product_name": "사무용 의자", "category": "가구", "subcategory": "의자", "sku": "SKU_B"},
+        {"product_id": 3, "product_name": "복사용지", "category": "오피스", "subcategory": "용지", "sku": "SKU_C"},
+    ],
+    "dim_customer": [
+        {"customer_id": 1, "customer_name": "가나상사", "segment": "기업", "region": "서울"},
+        {"customer_id": 2, "customer_name": "다라마트", "segment": "소매", "region": "부산"},
+        {"customer_id": 3, "customer_name": "마바물산", "segment": "기업", "region": "경기"},
+    ],
+    "fact_sales": [
+        {"sales_id": i + 1, "date_key": 20240101, "product_id": i + 1, "customer_id": i + 1, "quantity": 2,
+         "unit_price": 150000.0, "revenue": 300000.0, "currency": "KRW", "created_at": "2024-01-01T09:00:00"}
+        for i in range(3)
+    ],
+}
+
+QUESTION = "지난 분기 카테고리별 매출 Top 5 보여줘"
+QUESTIONS = [
+    QUESTION,
+    "주간 트렌드(주차별 매출, 수량) 알려줘",
+    "SKU A의 지역별 매출 분포",
+    "서울 지역 기업 고객 매출",
+]
+EXTRA_TABLE_COUNTS = [0, 20, 80]
+
+# 변경 전 TextToSQLService의 시스템 프롬프트
+LEGACY_SYSTEM_PROMPT = """당신은 PostgreSQL 데이터베이스 전문가입니다.
+        자연어 질문을 정확한 SQL 쿼리로 변환해야 합니다.
+
+        규칙:
+        1. SELECT 문만 생성 (INSERT, UPDATE, DELETE 금지)
+        2. LIMIT 절을 항상 포함 (기본값: 1000)
+        3. 명확하고 읽기 쉬운 SQL 작성
+        4. 적절한 JOIN 사용
+        5. 집계 함수 사용 시 GROUP BY 포함
+        6. 한국어로 설명 제공
+        7. PostgreSQL INTERVAL 구문은 반드시 'INTERVAL ''3'' month' 형태 사용 (소문자, 작은따옴표 2개)
+        8. 날짜 계산 시 CURRENT_DATE 사용
+        9. INTERVAL 구문 예시: INTERVAL '3' month, INTERVAL '1' year, INTERVAL '7' day
+
+        응답 형식:
+        SQL: [SQL 쿼리]
+        설명: [한국어 설명]"""
+
+
+def _build_schema_info() -> Dict[str, Any]:
+    service = SchemaService()
+    tables = {}
+    relationships = []
+    for table_name, columns in TABLES.items():
+        tables[table_name] = {
+            "name": table_name,
+            "description": service._get_table_description(table_name),
+            "columns": [
+                {
+                    "name": name,
+                    "type": data_type,
+                    "nullable": name == "created_at",
+                    "default": "CURRENT_TIMESTAMP" if name == "created_at" else ("'KRW'::character varying" if name == "currency" else None),
+                    "primary_key": primary_key,
+                    "comment": None,
+                    "description": service._get_column_description(table_name, name),
+                    "foreign_key": foreign_key,
+                }
+                for name, data_type, primary_key, foreign_key in columns
+            ],
+            "sample_data": SAMPLES[table_name],
+        }
+        for name, _, _, foreign_key in columns:
+            if foreign_key:
+                to_table, to_column = foreign_key.split(".")
+                relationships.append({"from_table": table_name, "from_column": name, "to_table": to_table, "to_column": to_column})
+    return {
+        "tables": tables,
+        "relationships": relationships,
+        "examples": service._get_example_queries(),
+        "version": "bench",
+    }
+
+
+def _add_extra_tables(schema_info: Dict[str, Any], count: int) -> Dict[str, Any]:
+    """매출 질문과 관련 없는 운영 테이블을 추가한 스키마 정보"""
+    tables = dict(schema_info["tables"])
+    for index in range(count):
+        name = f"ops_log_{index}"
+        tables[name] = {
+            "name": name,
+            "description": f"운영 로그 테이블 {index} - 배치 작업 상태 기록",
+            "columns": [
+                {"name": "log_id", "type": "integer", "primary_key": True, "description": "로그 ID", "foreign_key": None},
+                {"name": "job_name", "type": "character varying(100)", "description": "작업명", "foreign_key": None},
+                {"name": "status", "type": "character varying(20)", "description": "상태 코드", "foreign_key": None},
+                {"name": "message", "type": "text", "description": "메시지", "foreign_key": None},
+            ],
+            "sample_data": [],
+        }
+    return {**schema_info, "tables": tables, "version": f"bench-{count}"}
+
+
+def _legacy_messages(schema_info: Dict[str, Any]) -> List[str]:
+    schema = {key: value for key, value in schema_info.items() if key != "version"}
+    user = f"""다음 데이터베이스 스키마를 기반으로 질문에 답하는 SQL을 작성해주세요:
+
+스키마 정보:
+{json.dumps(schema, indent=2, ensure_ascii=False)}
+
+질문: {QUESTION}
+
+위 스키마를 사용하여 정확한 SQL 쿼리를 작성하고, 한국어로 간단히 설명해주세요."""
+    return [LEGACY_SYSTEM_PROMPT, user]
+
+
+def _rendered_messages(renderer: SchemaPromptRenderer, schema_info: Dict[str, Any]) -> List[str]:
+    from app.services.text_to_sql import TextToSQLService
+    service = TextToSQLService.__new__(TextToSQLService)
+    service.prompt_renderer = renderer
+    service.schema_index = None
+    return [message["content"] for message in service._build_messages(QUESTION, schema_info)]
+
+
+def _tiktoken_counter() -> Optional[Callable[[str], int]]:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text))
+
+
+def main() -> None:
+    schema_info = _build_schema_info()
+    renderer = SchemaPromptRenderer()
+    counters = {"estimate": estimate_tokens}
+    tiktoken_count = _tiktoken_counter()
+    if tiktoken_count:
+        counters["cl100k"] = tiktoken_count
+
+    legacy = _legacy_messages(schema_info)
+    rendered = _rendered_messages(renderer, schema_info)
+
+    print(f"{'counter':>9} {'legacy':>8} {'rendered':>9} {'static prefix':>14} {'per question':>13} {'reduction':>10}")
+    for name, count in counters.items():
+        legacy_tokens = sum(count(message) for message in legacy)
+        prefix_tokens = count(rendered[0])
+        question_tokens = count(rendered[1])
+        rendered_tokens = prefix_tokens + question_tokens
+        print(
+            f"{name:>9} {legacy_tokens:>8} {rendered_tokens:>9} {prefix_tokens:>14} {question_tokens:>13} "
+            f"{1 - rendered_tokens / legacy_tokens:>9.0%}"
+        )
+
+    print(f"\n{'extra tables':>12} {'full prefix':>12} {'pruned prefix (avg)':>20} {'prune us':>9}")
+    for count in EXTRA_TABLE_COUNTS:
+        grown = _add_extra_tables(schema_info, count)
+        full_tokens = estimate_tokens(SchemaPromptRenderer().render_prefix(grown))
+        index = SchemaIndex(grown)
+        pruned_renderer = SchemaPromptRenderer()
+        pruned_tokens = [estimate_tokens(pruned_renderer.render_prefix(index.prune(question))) for question in QUESTIONS]
+        start = time.perf_counter()
+        for question in QUESTIONS * 100:
+            index.prune(question)
+        prune_us = (time.perf_counter() - start) / (len(QUESTIONS) * 100) * 1e6
+        print(f"{count:>12} {full_tokens:>12} {sum(pruned_tokens) / len(pruned_tokens):>20.0f} {prune_us:>9.0f}")
+
+    # 같은 스키마 버전에서는 바이트 단위로 같은 프리픽스 (제공자 프롬프트 캐시 대상)
+    assert renderer.render_prefix(schema_info) is renderer.render_prefix(schema_info)
+    start = time.perf_counter()
+    for _ in range(10000):
+        renderer.render_prefix(schema_info)
+    memo_us = (time.perf_counter() - start) / 10000 * 1e6
+    start = time.perf_counter()
+    for _ in range(100):
+        renderer.render_schema(schema_info)
+    render_us = (time.perf_counter() - start) / 100 * 1e6
+    print(f"\nprefix render: {render_us:.0f}us, memoized: {memo_us:.2f}us")
+
+
+if __name__ == "__main__":
+    main()
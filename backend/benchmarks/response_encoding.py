@@ -0,0 +1,88 @@
+"""
+응답 인코딩 벤치마크 (행별 dict vs 컬럼형 + orjson)
+
+/chat 응답 본문을 만드는 CPU 시간과 전송 크기를 비교합니다.
+행별 형식은 FastAPI가 response_model로 하는 일(pydantic 검증 →
+jsonable_encoder → json.dumps)을 그대로 재현합니다. DB 없이 실행됩니다.
+
+실행 (backend 디렉터리에서):
+    python -m benchmarks.response_encoding [행 수 ...]
+"""
+import random
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.models.schemas import ChatResponse
+from app.services.result_encoding import encode_columnar, rows_from_columns
+
+CATEGORIES = ["전자제품", "오피스", "가구", "의류", "식품", "도서"]
+REGIONS = ["서울", "경기", "부산", "대구", "인천", "광주", "대전"]
+COLUMNS = ["sale_date", "category", "region", "quantity", "revenue"]
+
+
+def _make_values(row_count: int) -> List[List[Any]]:
+    rng = random.Random(42)
+    return [
+        [f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" for _ in range(row_count)],
+        [rng.choice(CATEGORIES) for _ in range(row_count)],
+        [rng.choice(REGIONS) for _ in range(row_count)],
+        [rng.randint(1, 50) for _ in range(row_count)],
+        [round(rng.uniform(1000, 500000), 2) for _ in range(row_count)],
+    ]
+
+
+def _common_fields(row_count: int) -> Dict[str, Any]:
+    return dict(
+        answer_text="카테고리별 매출을 조회했습니다.",
+        sql="SELECT ...",
+        columns=COLUMNS,
+        row_count=row_count,
+        chart_suggestion="table",
+        execution_time=0.1,
+        cached=False,
+    )
+
+
+def _encode_rows(values: List[List[Any]]) -> bytes:
+    rows = rows_from_columns(COLUMNS, values)
+    response = ChatResponse(rows=rows, **_common_fields(len(rows)))
+    return JSONResponse(jsonable_encoder(response)).body
+
+
+def _encode_columnar(values: List[List[Any]]) -> bytes:
+    return ORJSONResponse({
+        **_common_fields(len(values[0])),
+        "result_format": "columnar",
+        "data": encode_columnar(COLUMNS, values),
+    }).body
+
+
+def _measure(func, values: List[List[Any]], repeat: int = 5) -> Tuple[float, int]:
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(values)
+        best = min(best, time.perf_counter() - start)
+    return best, len(body)
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000]
+    print(f"{'rows':>8} {'rows ms':>9} {'columnar ms':>12} {'speedup':>8} {'rows KB':>9} {'columnar KB':>12}")
+    for size in sizes:
+        values = _make_values(size)
+        rows_time, rows_size = _measure(_encode_rows, values)
+        columnar_time, columnar_size = _measure(_encode_columnar, values)
+        print(
+            f"{size:>8} {rows_time * 1000:>9.1f} {columnar_time * 1000:>12.1f} "
+            f"{rows_time / columnar_time:>7.1f}x {rows_size / 1024:>9.1f} {columnar_size / 1024:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+결과 행 디코딩 벤치마크 (셀별 변환 루프 vs 컬럼별 변환기)
+
+기존 execute_sql 루프(행마다 dict 생성, 셀마다 isinstance/클래스명 비교)와
+타입 OID로 한 번 정한 컬럼 변환기를 컬럼 단위로 적용하는 방식을 비교합니다.
+fetchall() 결과와 같은 튜플 목록을 합성해 DB 없이 실행됩니다.
+
+실행 (backend 디렉터리에서):
+    python -m benchmarks.row_decoding [행 수 ...]
+"""
+import random
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Tuple
+
+from app.services.result_encoding import (
+    columns_from_rows, convert_columns, resolve_converters, rows_from_columns
+)
+
+COLUMNS = ["sale_date", "category", "region", "quantity", "revenue", "created_at"]
+# date, varchar, varchar, int4, numeric, timestamp
+TYPE_CODES = [1082, 1043, 1043, 23, 1700, 1114]
+
+
+def _make_rows(row_count: int) -> List[Tuple[Any, ...]]:
+    rng = random.Random(42)
+    return [
+        (
+            date(2024, rng.randint(1, 12), rng.randint(1, 28)),
+            rng.choice(["전자제품", "오피스", "가구", "의류"]),
+            rng.choice(["서울", "경기", "부산", "대구"]),
+            rng.randint(1, 50),
+            Decimal(f"{rng.uniform(1000, 500000):.2f}"),
+            datetime(2024, 1, 1, rng.randint(0, 23), rng.randint(0, 59)),
+        )
+        for _ in range(row_count)
+    ]
+
+
+def _serialize_for_json(obj):
+    # 변경 전 TextToSQLService._serialize_for_json
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    elif hasattr(obj, '__class__') and obj.__class__.__name__ == 'Decimal':
+        return str(obj)
+    return obj
+
+
+def _legacy_decode(rows: List[Tuple[Any, ...]]) -> List[dict]:
+    decoded = []
+    for row in rows:
+        row_dict = {}
+        for key, value in zip(COLUMNS, row):
+            row_dict[key] = _serialize_for_json(value)
+        decoded.append(row_dict)
+    return decoded
+
+
+def _columnar_decode(rows: List[Tuple[Any, ...]]) -> List[List[Any]]:
+    values = columns_from_rows(COLUMNS, rows)
+    return convert_columns(values, resolve_converters(values, TYPE_CODES))
+
+
+def _columnar_decode_to_rows(rows: List[Tuple[Any, ...]]) -> List[dict]:
+    return rows_from_columns(COLUMNS, _columnar_decode(rows))
+
+
+def _measure(func: Callable, rows: List[Tuple[Any, ...]], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    print(f"{'rows':>8} {'legacy us/row':>14} {'columnar us/row':>16} {'+row dicts':>11} {'speedup':>8}")
+    for size in sizes:
+        rows = _make_rows(size)
+        legacy = _measure(_legacy_decode, rows)
+        columnar = _measure(_columnar_decode, rows)
+        columnar_rows = _measure(_columnar_decode_to_rows, rows)
+        print(
+            f"{size:>8} {legacy / size * 1e6:>14.2f} {columnar / size * 1e6:>16.2f} "
+            f"{columnar_rows / size * 1e6:>11.2f} {legacy / columnar:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
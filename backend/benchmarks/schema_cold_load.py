@@ -0,0 +1,111 @@
+"""
+스키마 콜드 로드 벤치마크
+
+테이블 수를 늘려가며 기존 테이블별(N+1) information_schema 조회와
+SchemaService의 pg_catalog 일괄 조회 지연 시간을 비교합니다.
+
+실행 (backend 디렉터리에서, DATABASE_URL의 DB에 임시 테이블을 생성/삭제함):
+    python -m benchmarks.schema_cold_load --counts 4 16 64 --repeat 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.services.schema_service import SchemaService
+
+TABLE_PREFIX = "bench_schema_t"
+
+
+async def _create_tables(count: int) -> List[str]:
+    names = [f"{TABLE_PREFIX}{i}" for i in range(count)]
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {TABLE_PREFIX}_root (id INTEGER PRIMARY KEY, name VARCHAR(50))"
+        ))
+        for name in names:
+            await conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {name} (
+                    id INTEGER PRIMARY KEY,
+                    root_id INTEGER REFERENCES {TABLE_PREFIX}_root(id),
+                    label VARCHAR(100) NOT NULL DEFAULT 'x',
+                    amount DECIMAL(12,2),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """))
+            await conn.execute(text(f"INSERT INTO {name} (id, label, amount) VALUES (1, 'a', 1.5) ON CONFLICT DO NOTHING"))
+    return [f"{TABLE_PREFIX}_root"] + names
+
+
+async def _drop_tables(names: List[str]) -> None:
+    async with engine.begin() as conn:
+        for name in reversed(names):
+            await conn.execute(text(f"DROP TABLE IF EXISTS {name} CASCADE"))
+
+
+async def _legacy_load(session, tables: List[str]) -> None:
+    """기존 구현과 같은 테이블별 조회 (비교 기준)"""
+    await session.execute(text("""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_schema = 'public' AND table_name = ANY(:tables)
+    """), {"tables": tables})
+    for table_name in tables:
+        await session.execute(text("""
+            SELECT column_name, data_type, is_nullable, column_default
+            FROM information_schema.columns
+            WHERE table_name = :table_name AND table_schema = 'public'
+            ORDER BY ordinal_position
+        """), {"table_name": table_name})
+        result = await session.execute(text(f"SELECT * FROM {table_name} LIMIT 3"))
+        result.fetchall()
+    await session.execute(text("""
+        SELECT tc.table_name, kcu.column_name, ccu.table_name, ccu.column_name
+        FROM information_schema.table_constraints AS tc
+        JOIN information_schema.key_column_usage AS kcu
+            ON tc.constraint_name = kcu.constraint_name AND tc.table_schema = kcu.table_schema
+        JOIN information_schema.constraint_column_usage AS ccu
+            ON ccu.constraint_name = tc.constraint_name AND ccu.table_schema = tc.table_schema
+        WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_schema = 'public'
+    """))
+
+
+async def _time(coro_factory, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as session:
+            started = time.perf_counter()
+            await coro_factory(session)
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def main(counts: List[int], repeat: int) -> None:
+    service = SchemaService()
+    original_tables = settings.ALLOWED_TABLES
+    print(f"{'tables':>8} {'legacy_ms':>12} {'bulk_ms':>12} {'speedup':>9}")
+    try:
+        for count in counts:
+            tables = await _create_tables(count)
+            try:
+                settings.ALLOWED_TABLES = tables
+                legacy = await _time(lambda s: _legacy_load(s, tables), repeat)
+                bulk = await _time(service._build_schema_info, repeat)
+                print(f"{len(tables):>8} {legacy:>12.1f} {bulk:>12.1f} {legacy / bulk:>8.1f}x")
+            finally:
+                await _drop_tables(tables)
+    finally:
+        settings.ALLOWED_TABLES = original_tables
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.counts, args.repeat))
@@ -0,0 +1,133 @@
+"""
+유사 질문 캐시 벤치마크 (LLM 호출 수, 조회 지연)
+
+같은 의도를 다르게 표현한 질문이 반복되는 작업 부하를 재생하면서
+SemanticQuestionCache가 LLM 호출을 얼마나 줄이는지 세고, 저장된 질문 수를
+늘려가며 조회 지연(p50/p99)을 측정합니다. LLM은 호출하지 않고 캐시 미스일 때
+정답 SQL을 저장하는 것으로 대신하며 DB 없이 실행됩니다.
+
+실행 (backend 디렉터리에서):
+    python -m benchmarks.semantic_cache
+"""
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from app.services.semantic_cache import SemanticQuestionCache
+from benchmarks.prompt_tokens import _build_schema_info
+
+# (의도별 SQL, 표현들) - 같은 의도의 표현끼리는 SQL을 재사용해도 됨
+INTENTS: List[Tuple[str, List[str]]] = [
+    (
+        "SELECT p.category, SUM(f.revenue) FROM fact_sales f JOIN dim_product p ON f.product_id = p.product_id GROUP BY p.category LIMIT 1000",
+        ["카테고리별 매출", "카테고리 별 매출 합계 보여줘", "category revenue", "카테고리별 매출 알려줘"],
+    ),
+    (
+        "SELECT c.region, SUM(f.revenue) FROM fact_sales f JOIN dim_customer c ON f.customer_id = c.customer_id GROUP BY c.region LIMIT 1000",
+        ["지역별 매출", "지역 별 매출 합계", "region revenue", "지역별 매출 보여줘"],
+    ),
+    (
+        "SELECT d.year, d.month, SUM(f.revenue) FROM fact_sales f JOIN dim_date d ON f.date_key = d.date_key WHERE d.year = 2024 GROUP BY d.year, d.month LIMIT 1000",
+        ["2024년 월별 매출 추이", "2024년 월별 매출 추이 보여줘", "2024년 월 별 매출 추이 알려줘"],
+    ),
+    (
+        "SELECT d.year, d.month, SUM(f.revenue) FROM fact_sales f JOIN dim_date d ON f.date_key = d.date_key WHERE d.year = 2023 GROUP BY d.year, d.month LIMIT 1000",
+        ["2023년 월별 매출 추이", "2023년 월별 매출 추이 보여줘"],
+    ),
+    (
+        "SELECT p.product_name, SUM(f.quantity) FROM fact_sales f JOIN dim_product p ON f.product_id = p.product_id GROUP BY p.product_name ORDER BY 2 DESC LIMIT 5",
+        ["판매량 상위 5개 제품", "판매량 상위 5개 제품 보여줘", "판매량 상위 5개 제품 알려줘"],
+    ),
+    (
+        "SELECT p.product_name, SUM(f.quantity) FROM fact_sales f JOIN dim_product p ON f.product_id = p.product_id GROUP BY p.product_name ORDER BY 2 ASC LIMIT 5",
+        ["판매량 하위 5개 제품", "판매량 하위 5개 제품 보여줘"],
+    ),
+]
+# 한 단어만 바꾼 긴 질문은 n-gram 점수가 일치 기준(0.9)을 넘음
+LONG_QUESTION = "2023년 전자제품 카테고리 온라인 채널에서 고객 등급별 월별 매출 추이를 전년 동기 대비 증감률과 함께 보여줘"
+# (저장된 질문, 다른 SQL이 필요한 질문) - 점수가 높아도 재사용하면 안 되는 쌍
+GUARD_CASES: List[Tuple[str, str]] = [
+    (LONG_QUESTION, LONG_QUESTION.replace("월별", "분기별")),
+    (LONG_QUESTION, LONG_QUESTION.replace("온라인", "오프라인")),
+    (LONG_QUESTION, LONG_QUESTION.replace("매출", "판매량")),
+    ("2024년 지역별 월별 매출", "2024년 지역별 주별 매출"),
+    ("카테고리별 매출", "카테고리별 단가"),
+]
+WORKLOAD_SIZE = 2000
+ENTRY_COUNTS = [100, 1000, 5000]
+LLM_LATENCY_MS = 2000  # 비교용 LLM 왕복 가정치
+
+
+def _replay(schema_info: Dict) -> Dict[str, float]:
+    """반복 작업 부하 재생: LLM 호출 수와 잘못 재사용된 SQL 수"""
+    cache = SemanticQuestionCache()
+    phrasings = [(sql, question) for sql, questions in INTENTS for question in questions]
+    rng = random.Random(0)
+    llm_calls = wrong = 0
+    for _ in range(WORKLOAD_SIZE):
+        sql, question = rng.choice(phrasings)
+        match, _ = cache.lookup(question, schema_info)
+        if match is None:
+            llm_calls += 1
+            cache.add(question, sql, "")
+        elif match.sql != sql:
+            wrong += 1
+    return {"llm_calls": llm_calls, "wrong": wrong, **cache.get_stats()}
+
+
+def _guard_cases(schema_info: Dict) -> List[Tuple[str, float]]:
+    """GUARD_CASES 중 SQL을 잘못 재사용한 질문과 점수"""
+    reused = []
+    for cached_question, question in GUARD_CASES:
+        cache = SemanticQuestionCache()
+        cache.add(cached_question, "SELECT 1", "")
+        match, _ = cache.lookup(question, schema_info)
+        if match is not None:
+            reused.append((question, match.score))
+    return reused
+
+
+def _lookup_latency(schema_info: Dict, entries: int) -> Tuple[float, float]:
+    """저장된 질문 수별 조회 지연 (p50, p99 밀리초)"""
+    cache = SemanticQuestionCache()
+    cache.max_entries = entries
+    for index in range(entries):
+        cache.add(f"{index}번 제품 {index % 12 + 1}월 지역별 매출", "SELECT 1", "")
+    cache.lookup("카테고리별 매출", schema_info)
+    timings = []
+    for index in range(500):
+        start = time.perf_counter()
+        cache.lookup(f"{index}번 제품 카테고리별 매출 보여줘", schema_info)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def main() -> None:
+    schema_info = _build_schema_info()
+    
+    result = _replay(schema_info)
+    distinct = sum(len(questions) for _, questions in INTENTS)
+    print(f"workload: {WORKLOAD_SIZE} questions, {len(INTENTS)} intents, {distinct} phrasings")
+    print(
+        f"LLM calls: {result['llm_calls']} (without cache: {WORKLOAD_SIZE}), "
+        f"wrong SQL reused: {result['wrong']}, guarded: {result['guarded']}"
+    )
+    # 캐시 히트는 조회 시간, 미스는 LLM 왕복으로 가정한 p50
+    latencies = sorted([0.0] * (WORKLOAD_SIZE - result["llm_calls"]) + [LLM_LATENCY_MS] * result["llm_calls"])
+    print(f"p50 latency (LLM {LLM_LATENCY_MS}ms assumed): {statistics.median(latencies):.0f}ms (without cache: {LLM_LATENCY_MS}ms)")
+    
+    reused = _guard_cases(schema_info)
+    print(f"near-duplicate questions reused: {len(reused)}/{len(GUARD_CASES)}")
+    for question, score in reused:
+        print(f"  {score:.3f} {question}")
+    
+    print(f"\n{'entries':>8} {'lookup p50 ms':>14} {'lookup p99 ms':>14}")
+    for entries in ENTRY_COUNTS:
+        p50, p99 = _lookup_latency(schema_info, entries)
+        print(f"{entries:>8} {p50:>14.3f} {p99:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
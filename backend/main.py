@@ -6,8 +6,11 @@ import os
 from dotenv import load_dotenv
 
 from app.routers import chat, schema, download
+from app.routers.errors import register_exception_handlers
 from app.core.config import settings
-from app.core.database import init_db
+from app.core.database import close_db, init_db
+from app.services.pool_monitor import PoolMonitor
+from app.services.chat_retention_service import ChatRetentionService
 
 load_dotenv()
 
@@ -26,6 +29,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 연결 풀 사전 연결/상태 확인
+pool_monitor = PoolMonitor([
+    chat.text_to_sql_service.query_engine,
+    download.export_service.query_engine
+])
+
+# 채팅 기록 파티션 생성/보존 기간 관리
+chat_retention_service = ChatRetentionService()
+
+# 질문/쿼리 처리 예외 → 상태 코드 (모든 라우터 공통)
+register_exception_handlers(app)
+
 # 라우터 등록
 app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
 app.include_router(schema.router, prefix="/api/v1", tags=["schema"])
@@ -35,6 +50,24 @@ app.include_router(download.router, prefix="/api/v1", tags=["download"])
 async def startup_event():
     """애플리케이션 시작 시 초기화"""
     await init_db()
+    await pool_monitor.start()
+    await chat.chat_history_service.start()
+    await chat_retention_service.start()
+    await chat.text_to_sql_service.rollups.start()
+    await chat.text_to_sql_service.semantic_cache.start()
+    await chat.data_change_detector.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """애플리케이션 종료 시 정리"""
+    await chat.data_change_detector.stop()
+    await chat.text_to_sql_service.semantic_cache.stop()
+    await chat.text_to_sql_service.query_engine.close()
+    await download.export_service.query_engine.close()
+    await chat_retention_service.stop()
+    await chat.chat_history_service.stop()
+    await pool_monitor.stop()
+    await close_db()
 
 @app.get("/")
 async def root():
@@ -47,8 +80,12 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """헬스 체크 엔드포인트"""
-    return {"status": "healthy"}
+    """헬스 체크 엔드포인트 (연결 풀 사용률, 채팅 기록 대기열 포함)"""
+    return {
+        "status": "healthy",
+        "db": pool_monitor.get_stats(),
+        "chat_history": chat.chat_history_service.get_stats()
+    }
 
 if __name__ == "__main__":
     uvicorn.run(
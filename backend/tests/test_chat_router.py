@@ -0,0 +1,116 @@
+"""
+/chat, /chat/stream 질문/유사 질문 캐시 저장 시점 테스트 (DB/Redis/LLM 없이 서비스 메서드를 대체)
+
+실행 (backend 디렉터리에서):
+    python -m pytest -q tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import get_analytic_db
+from app.routers import chat
+from main import app
+
+SQL = "SELECT product_id FROM fact_sales LIMIT 10"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    saved = []
+
+    async def get_sql(question):
+        return None
+
+    async def set_sql(question, sql, explanation):
+        saved.append(("question", question, sql))
+        return True
+
+    async def save_handle(sql):
+        return "result-id"
+
+    async def generate_sql(question, session):
+        return SQL, "설명"
+
+    async def generate_sql_stream(question, session):
+        yield "sql", (SQL, "설명")
+
+    async def no_session():
+        yield None
+
+    monkeypatch.setattr(chat.query_cache, "get_sql", get_sql)
+    monkeypatch.setattr(chat.query_cache, "set_sql", set_sql)
+    monkeypatch.setattr(chat.query_cache, "save_handle", save_handle)
+    monkeypatch.setattr(chat.text_to_sql_service, "generate_sql", generate_sql)
+    monkeypatch.setattr(chat.text_to_sql_service, "generate_sql_stream", generate_sql_stream)
+    monkeypatch.setattr(
+        chat.text_to_sql_service, "remember_sql",
+        lambda question, sql, explanation: saved.append(("semantic", question, sql))
+    )
+    monkeypatch.setattr(chat.chat_history_service, "record_message", lambda **kwargs: None)
+    app.dependency_overrides[get_analytic_db] = no_session
+    yield TestClient(app, raise_server_exceptions=False), saved, monkeypatch
+    app.dependency_overrides.clear()
+
+
+def _fail_execution(monkeypatch):
+    async def execute_page(sql, session, cursor=None):
+        raise RuntimeError("column \"x\" does not exist")
+
+    async def stream_sql_rows(sql, session):
+        raise RuntimeError("column \"x\" does not exist")
+        yield
+
+    monkeypatch.setattr(chat.text_to_sql_service, "execute_page", execute_page)
+    monkeypatch.setattr(chat.text_to_sql_service, "stream_sql_rows", stream_sql_rows)
+
+
+def _succeed_execution(monkeypatch):
+    async def execute_page(sql, session, cursor=None):
+        return ["product_id"], [[1, 2]], False, None, None
+
+    async def stream_sql_rows(sql, session):
+        yield "columns", {"columns": ["product_id"], "cached": False, "row_limit": None}
+        yield "rows", [[1], [2]]
+
+    monkeypatch.setattr(chat.text_to_sql_service, "execute_page", execute_page)
+    monkeypatch.setattr(chat.text_to_sql_service, "stream_sql_rows", stream_sql_rows)
+
+
+def test_chat_does_not_cache_sql_that_failed(client):
+    http, saved, monkeypatch = client
+    _fail_execution(monkeypatch)
+
+    response = http.post("/api/v1/chat", json={"question": "제품별 매출"})
+
+    assert response.status_code == 500
+    assert saved == []
+
+
+def test_chat_caches_sql_after_success(client):
+    http, saved, monkeypatch = client
+    _succeed_execution(monkeypatch)
+
+    response = http.post("/api/v1/chat", json={"question": "제품별 매출"})
+
+    assert response.status_code == 200
+    assert saved == [("question", "제품별 매출", SQL), ("semantic", "제품별 매출", SQL)]
+
+
+def test_chat_stream_does_not_cache_sql_that_failed(client):
+    http, saved, monkeypatch = client
+    _fail_execution(monkeypatch)
+
+    response = http.post("/api/v1/chat/stream", json={"question": "제품별 매출"})
+
+    assert "event: error" in response.text
+    assert saved == []
+
+
+def test_chat_stream_caches_sql_after_success(client):
+    http, saved, monkeypatch = client
+    _succeed_execution(monkeypatch)
+
+    response = http.post("/api/v1/chat/stream", json={"question": "제품별 매출"})
+
+    assert "event: summary" in response.text
+    assert saved == [("question", "제품별 매출", SQL), ("semantic", "제품별 매출", SQL)]
@@ -0,0 +1,33 @@
+"""
+RollupService 집계 재작성 테스트
+
+실행 (backend 디렉터리에서):
+    python -m pytest -q tests
+"""
+from app.services.rollup_service import ROLLUPS, RollupService
+
+
+def _service() -> RollupService:
+    service = RollupService()
+    service.row_estimates = {spec.name: 100 for spec in ROLLUPS}
+    return service
+
+
+def test_ungrouped_count_is_zero_without_rows():
+    sql = _service().rewrite("SELECT COUNT(*) FROM fact_sales f WHERE f.product_id = 3")
+    assert sql == (
+        "SELECT CAST(COALESCE(SUM(r.sales_count), 0) AS BIGINT) AS count "
+        "FROM rollup_sales_product_monthly AS r WHERE r.product_id = 3"
+    )
+
+
+def test_nested_aggregates_keep_postgres_output_names():
+    sql = _service().rewrite(
+        "SELECT COUNT(*)::int, AVG(f.revenue)::int, (SUM(f.quantity)), SUM(f.revenue) + 1 FROM fact_sales f"
+    )
+    assert sql == (
+        "SELECT CAST(CAST(COALESCE(SUM(r.sales_count), 0) AS BIGINT) AS INT) AS count, "
+        "CAST((CAST(SUM(r.revenue) AS DECIMAL) / NULLIF(SUM(r.sales_count), 0)) AS INT) AS avg, "
+        "(CAST(SUM(r.quantity) AS BIGINT)) AS sum, SUM(r.revenue) + 1 "
+        "FROM rollup_sales_monthly AS r"
+    )
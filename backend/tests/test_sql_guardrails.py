@@ -0,0 +1,31 @@
+"""
+SQLGuardrails.paginate_sql 정렬 키 테스트
+
+실행 (backend 디렉터리에서):
+    python -m pytest -q tests
+"""
+import pytest
+
+from app.services.sql_guardrails import SQLGuardrails, UnpageableQueryError
+
+
+def test_count_star_is_ordered_by_ordinal():
+    sql = SQLGuardrails().paginate_sql("SELECT COUNT(*) FROM fact_sales", 0, 51)
+    assert sql == "SELECT COUNT(*) FROM fact_sales ORDER BY 1 LIMIT 51"
+
+
+def test_grouped_count_star_is_pageable():
+    sql = SQLGuardrails().paginate_sql(
+        "SELECT category, COUNT(*) FROM dim_product GROUP BY category", 0, 51
+    )
+    assert sql.endswith("GROUP BY category ORDER BY 1, 2 LIMIT 51")
+
+
+def test_star_projection_is_ordered_by_source_rows():
+    sql = SQLGuardrails().paginate_sql("SELECT f.* FROM fact_sales AS f", 0, 51)
+    assert sql == "SELECT f.* FROM fact_sales AS f ORDER BY ROW(f.*) LIMIT 51"
+
+
+def test_distinct_star_projection_is_unpageable():
+    with pytest.raises(UnpageableQueryError):
+        SQLGuardrails().paginate_sql("SELECT DISTINCT * FROM dim_product", 0, 51)
@@ -0,0 +1,51 @@
+"""
+TextToSQLService.execute_page 반환 형태 테스트
+
+실행 (backend 디렉터리에서):
+    python -m pytest -q tests
+"""
+import asyncio
+
+from app.core.config import settings
+from app.services.text_to_sql import TextToSQLService
+
+
+def _stub_execute_columns(service: TextToSQLService, rows: int, row_limit=None) -> list:
+    """DB 대신 rows개 행을 돌려주는 execute_columns (실행된 SQL 기록)"""
+    executed = []
+
+    async def execute_columns(sql, session):
+        executed.append(sql)
+        return ["id"], [list(range(rows))], False, row_limit
+
+    service.execute_columns = execute_columns
+    return executed
+
+
+def test_execute_page_unpacks_like_chat_router():
+    service = TextToSQLService()
+    executed = _stub_execute_columns(service, settings.RESULT_PAGE_SIZE + 1)
+
+    columns, values, result_cached, next_cursor, row_limit = asyncio.run(
+        service.execute_page("SELECT product_id AS id FROM fact_sales LIMIT 1000", None)
+    )
+
+    assert columns == ["id"]
+    assert len(values[0]) == settings.RESULT_PAGE_SIZE
+    assert result_cached is False
+    assert next_cursor is not None
+    assert row_limit is None
+    assert "ORDER BY" in executed[0]
+
+
+def test_execute_page_last_page_keeps_row_limit():
+    service = TextToSQLService()
+    _stub_execute_columns(service, 3, row_limit=settings.QUERY_COST_DOWNGRADE_LIMIT)
+
+    columns, values, result_cached, next_cursor, row_limit = asyncio.run(
+        service.execute_page("SELECT product_id AS id FROM fact_sales LIMIT 1000", None)
+    )
+
+    assert values == [[0, 1, 2]]
+    assert next_cursor is None
+    assert row_limit == settings.QUERY_COST_DOWNGRADE_LIMIT
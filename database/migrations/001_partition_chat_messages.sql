@@ -0,0 +1,83 @@
+-- chat_messages 월별 파티션 전환 마이그레이션
+--
+-- schema.sql의 CREATE TABLE IF NOT EXISTS는 기존 배포의 일반 테이블을 바꾸지 않으므로
+-- 파티션 도입 이전에 만든 DB는 이 파일을 한 번 실행해야 합니다.
+--     psql -v ON_ERROR_STOP=1 -f database/migrations/001_partition_chat_messages.sql
+-- 기존 테이블을 이름만 바꿔 두고 파티션 테이블과 기존 행이 속한 달부터 다음 두 달까지의
+-- 월 파티션을 만든 뒤 행을 옮기고 기존 테이블을 삭제합니다. message_id 시퀀스는 그대로
+-- 이어 쓰며, 이미 파티션 테이블이면 아무것도 하지 않습니다.
+-- 한 트랜잭션으로 실행되는 동안 chat_messages 쓰기는 대기합니다.
+
+BEGIN;
+
+DO $$
+DECLARE
+    first_month DATE;
+    last_month DATE := date_trunc('month', CURRENT_DATE) + INTERVAL '2 months';
+    month_start DATE;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_partitioned_table
+        WHERE partrelid = 'chat_messages'::regclass
+    ) THEN
+        RAISE NOTICE 'chat_messages는 이미 파티션 테이블입니다';
+        RETURN;
+    END IF;
+
+    LOCK TABLE chat_messages IN ACCESS EXCLUSIVE MODE;
+    ALTER TABLE chat_messages RENAME TO chat_messages_legacy;
+    -- 새 테이블과 이름이 겹치는 제약/인덱스는 정리
+    ALTER TABLE chat_messages_legacy DROP CONSTRAINT IF EXISTS chat_messages_pkey;
+    DROP INDEX IF EXISTS idx_chat_messages_session_id;
+    DROP INDEX IF EXISTS idx_chat_messages_created_at;
+    DROP INDEX IF EXISTS idx_chat_messages_session_keyset;
+
+    -- 기존 SERIAL 시퀀스를 새 테이블이 이어 사용
+    ALTER SEQUENCE chat_messages_message_id_seq AS BIGINT;
+
+    CREATE TABLE chat_messages (
+        message_id BIGINT NOT NULL DEFAULT nextval('chat_messages_message_id_seq'),
+        session_id VARCHAR(255) NOT NULL,
+        message_type VARCHAR(10) NOT NULL CHECK (message_type IN ('user', 'ai')),
+        content TEXT NOT NULL,
+        sql_query TEXT,
+        execution_time DECIMAL(10,3),
+        cached BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+        PRIMARY KEY (message_id, created_at),
+        FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id) ON DELETE CASCADE
+    ) PARTITION BY RANGE (created_at);
+    ALTER SEQUENCE chat_messages_message_id_seq OWNED BY chat_messages.message_id;
+
+    SELECT date_trunc('month', COALESCE(MIN(created_at), CURRENT_DATE))
+    INTO first_month
+    FROM chat_messages_legacy;
+
+    month_start := first_month;
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+            'chat_messages_p' || to_char(month_start, 'YYYYMM'),
+            month_start,
+            month_start + INTERVAL '1 month'
+        );
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+    CREATE TABLE chat_messages_default PARTITION OF chat_messages DEFAULT;
+
+    -- created_at이 비어 있던 행은 소속 세션 생성 시각으로 채움
+    INSERT INTO chat_messages (message_id, session_id, message_type, content, sql_query, execution_time, cached, created_at)
+    SELECT m.message_id, m.session_id, m.message_type, m.content, m.sql_query, m.execution_time, m.cached,
+           COALESCE(m.created_at, s.created_at, CURRENT_TIMESTAMP)
+    FROM chat_messages_legacy m
+    LEFT JOIN chat_sessions s ON s.session_id = m.session_id;
+
+    DROP TABLE chat_messages_legacy;
+
+    CREATE INDEX idx_chat_messages_session_keyset ON chat_messages(session_id, created_at, message_id);
+    GRANT SELECT ON chat_messages TO PUBLIC;
+    GRANT INSERT, UPDATE, DELETE ON chat_messages TO PUBLIC;
+END $$;
+
+COMMIT;
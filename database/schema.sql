@@ -89,6 +89,9 @@ JOIN dim_date d ON f.date_key = d.date_key
 JOIN dim_product p ON f.product_id = p.product_id
 JOIN dim_customer c ON f.customer_id = c.customer_id;
 
+-- 집계 롤업(rollup_sales_monthly, rollup_sales_product_monthly, rollup_sales_daily) 구체화 뷰는
+-- 백엔드 시작 시 RollupService가 생성하고 데이터 변경 감지 후 CONCURRENTLY 갱신합니다.
+
 -- 채팅 기록 테이블
 CREATE TABLE IF NOT EXISTS chat_sessions (
     session_id VARCHAR(255) PRIMARY KEY,
@@ -96,22 +99,43 @@ CREATE TABLE IF NOT EXISTS chat_sessions (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- 월별 파티션 테이블 (보존 기간이 지난 달은 파티션 단위로 삭제/보관)
+-- 파티션 도입 이전에 만든 DB는 migrations/001_partition_chat_messages.sql로 전환
 CREATE TABLE IF NOT EXISTS chat_messages (
-    message_id SERIAL PRIMARY KEY,
+    message_id BIGSERIAL,
     session_id VARCHAR(255) NOT NULL,
     message_type VARCHAR(10) NOT NULL CHECK (message_type IN ('user', 'ai')),
     content TEXT NOT NULL,
     sql_query TEXT,
     execution_time DECIMAL(10,3),
     cached BOOLEAN DEFAULT FALSE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     
+    PRIMARY KEY (message_id, created_at),
     FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id) ON DELETE CASCADE
-);
+) PARTITION BY RANGE (created_at);
+
+-- 이번 달부터 3개월 파티션 (이후 달은 ChatRetentionService가 미리 생성)
+DO $$
+DECLARE
+    month_start DATE := date_trunc('month', CURRENT_DATE);
+BEGIN
+    FOR i IN 0..2 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+            'chat_messages_p' || to_char(month_start + make_interval(months => i), 'YYYYMM'),
+            month_start + make_interval(months => i),
+            month_start + make_interval(months => i + 1)
+        );
+    END LOOP;
+END $$;
+
+-- 월 파티션이 없는 시각의 행을 받는 기본 파티션
+CREATE TABLE IF NOT EXISTS chat_messages_default PARTITION OF chat_messages DEFAULT;
 
 -- 채팅 관련 인덱스
-CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages(session_id);
-CREATE INDEX IF NOT EXISTS idx_chat_messages_created_at ON chat_messages(created_at);
+-- 세션별 keyset 페이지네이션 (session_id, created_at, message_id) 역순 조회용
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session_keyset ON chat_messages(session_id, created_at, message_id);
 CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated_at ON chat_sessions(updated_at);
 
 -- 권한 설정
@@ -10,8 +10,8 @@ export async function GET(request: NextRequest, context: { params: Promise<{ ses
     if (!sessionId) {
       return NextResponse.json({ error: 'sessionId가 필요합니다.' }, { status: 400 });
     }
-    // 백엔드 API 호출
-    const response = await fetch(`${BACKEND_URL}/api/v1/chat/history/${sessionId}`, {
+    // 백엔드 API 호출 (cursor/limit 페이지 파라미터 전달)
+    const response = await fetch(`${BACKEND_URL}/api/v1/chat/history/${sessionId}${request.nextUrl.search}`, {
       method: 'GET',
       headers: {
         'Content-Type': 'application/json',
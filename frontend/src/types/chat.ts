@@ -3,6 +3,7 @@ export interface ChatRequest {
   wants_visualization?: boolean;
   chart_type?: string;
   session_id?: string;
+  result_format?: 'rows' | 'columnar';
 }
 
 export interface ChatResponse {
@@ -14,6 +15,8 @@ export interface ChatResponse {
   chart_suggestion?: string;
   execution_time: number;
   cached: boolean;
+  result_id?: string;
+  next_cursor?: string | null;
 }
 
 export interface ChatMessage {